@@ -1,9 +1,12 @@
-import json
 import hashlib
-import os
-from utils import log_event, create_directory_if_not_exists, COLOR_RED, COLOR_GREEN
+from utils import log_event, COLOR_RED, COLOR_GREEN
+from metrics import REGISTRY
+from user_store import UserStore
 
 USERS_FILE = 'users.json'
+LOGINS_TOTAL = REGISTRY.counter('logins_total', 'Liczba udanych logowań.')
+LOGIN_FAILURES_TOTAL = REGISTRY.counter('login_failures_total', 'Liczba nieudanych logowań.')
+REGISTRATIONS_TOTAL = REGISTRY.counter('registrations_total', 'Liczba rejestracji.')
 class User:
     def __init__(self, username, password_hash):
         self.username = username
@@ -17,46 +20,36 @@ class User:
         return User(data["username"], data["password_hash"])
 
 class AuthService:
-    def __init__(self):
-        self.users = self._load_users()
-        log_event(f"AuthService zainicjalizowany, załadowano {len(self.users)} użytkowników.", level="DEBUG")
+    def __init__(self, store=None):
+        # magazyn współdzielony przez wszystkie procesy korzystające z tego samego pliku
+        self.store = store or UserStore(USERS_FILE)
+        self.active_sessions = set()
+        REGISTRY.gauge('active_sessions', 'Liczba zalogowanych użytkowników.', lambda: len(self.active_sessions))
+        log_event(f"AuthService zainicjalizowany, załadowano {len(self.store)} użytkowników.", level="DEBUG")
+
+    @property
+    def users(self):
+        return self.store.users
 
     def _hash_password(self, password):
         return hashlib.sha256(password.encode()).hexdigest()
 
-    def _load_users(self):
-        if not os.path.exists(USERS_FILE):
-            log_event(f"Plik użytkowników {USERS_FILE} nie istnieje. Zwracam pusty słownik.", level="INFO")
-            return {}
-        try:
-            with open(USERS_FILE, 'r') as f:
-                users_data = json.load(f)
-                log_event(f"Załadowano dane użytkowników z {USERS_FILE}.", level="DEBUG")
-                return users_data
-        except (json.JSONDecodeError, FileNotFoundError) as e:
-            log_event(f"Błąd podczas ładowania pliku użytkowników {USERS_FILE}: {e}", level="ERROR", color=COLOR_RED)
-            return {}
-
-    def _save_users(self):
-        try:
-            with open(USERS_FILE, 'w') as f:
-                json.dump(self.users, f, indent=4)
-            log_event(f"Zapisano dane użytkowników do {USERS_FILE}.", level="DEBUG")
-        except IOError as e:
-            log_event(f"Błąd podczas zapisywania danych użytkowników do {USERS_FILE}: {e}", level="ERROR", color=COLOR_RED)
-
 
     def register(self, username, password):
         if not username or not password:
             log_event(f"Próba rejestracji z pustą nazwą użytkownika lub hasłem.", level="WARNING")
             return False, "Nazwa użytkownika i hasło nie mogą być puste."
-        if username in self.users:
+        hashed_password = self._hash_password(password)
+        try:
+            # sprawdzenie i dopisanie pod blokadą pliku - dwa procesy nie zarejestrują tej samej nazwy
+            added = self.store.add(username, hashed_password)
+        except OSError as e:
+            log_event(f"Błąd podczas zapisywania danych użytkowników do {USERS_FILE}: {e}", level="ERROR", color=COLOR_RED)
+            return False, "Nie udało się zapisać danych użytkownika."
+        if not added:
             log_event(f"Nieudana próba rejestracji: użytkownik '{username}' już istnieje.", level="INFO")
             return False, "Użytkownik o tej nazwie już istnieje."
-        
-        hashed_password = self._hash_password(password)
-        self.users[username] = hashed_password
-        self._save_users()
+        REGISTRATIONS_TOTAL.inc()
         log_event(f"Użytkownik '{username}' zarejestrowany pomyślnie.", level="INFO", color=COLOR_GREEN)
         return True, "Rejestracja zakończona sukcesem."
 
@@ -65,15 +58,24 @@ class AuthService:
             log_event(f"Próba logowania z pustą nazwą użytkownika lub hasłem.", level="WARNING")
             return False, "Nazwa użytkownika i hasło nie mogą być puste."
         
-        stored_password_hash = self.users.get(username)
+        stored_password_hash = self.store.get(username)
         if not stored_password_hash:
+            LOGIN_FAILURES_TOTAL.inc()
             log_event(f"Nieudana próba logowania: użytkownik '{username}' nie znaleziony.", level="INFO")
             return False, "Nieprawidłowa nazwa użytkownika lub hasło."
         
         hashed_password = self._hash_password(password)
         if hashed_password == stored_password_hash:
+            LOGINS_TOTAL.inc()
+            self.active_sessions.add(username)
             log_event(f"Użytkownik '{username}' zalogowany pomyślnie.", level="INFO", color=COLOR_GREEN)
             return True, "Logowanie zakończone sukcesem."
         else:
+            LOGIN_FAILURES_TOTAL.inc()
             log_event(f"Nieudana próba logowania dla użytkownika '{username}': nieprawidłowe hasło.", level="INFO", color=COLOR_RED)
-            return False, "Nieprawidłowa nazwa użytkownika lub hasło."
\ No newline at end of file
+            return False, "Nieprawidłowa nazwa użytkownika lub hasło."
+
+    def logout(self, username):
+        if username in self.active_sessions:
+            self.active_sessions.discard(username)
+            log_event(f"Użytkownik '{username}' wylogowany.", level="INFO")
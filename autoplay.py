@@ -0,0 +1,119 @@
+import time
+from collections import Counter
+from items import Potion
+from utils import log_event, format_currency, COLOR_CYAN
+
+class AutoPlayPolicy:
+
+    def __init__(self, potion_below_hp_ratio=0.4, flee_below_hp_ratio=0.2, rest_below_hp_ratio=0.5):
+        self.potion_below_hp_ratio = potion_below_hp_ratio
+        self.flee_below_hp_ratio = flee_below_hp_ratio
+        self.rest_below_hp_ratio = rest_below_hp_ratio
+
+    def find_healing_potion(self, player):
+        for item in player.inventory.of_type(Potion):
+            if item.heal_amount > 0:
+                return item
+        return None
+
+    def choose_combat_action(self, player, enemy):
+        hp_ratio = player.hp / player.max_hp
+        if hp_ratio < self.potion_below_hp_ratio:
+            potion = self.find_healing_potion(player)
+            if potion:
+                return ('use_potion', potion.name)
+        if hp_ratio < self.flee_below_hp_ratio:
+            return ('flee', None)
+        return ('attack', None)
+
+    def needs_rest(self, player):
+        return player.hp / player.max_hp < self.rest_below_hp_ratio
+
+class AutoPlayer:
+
+    def __init__(self, game, policy=None, max_actions_per_fight=200):
+        self.game = game
+        self.policy = policy if policy else AutoPlayPolicy()
+        self.max_actions_per_fight = max_actions_per_fight
+        self.stats = Counter()
+        self.stop_reason = None
+        # stan początkowy czytany przy pierwszym run() - AutoPlayer może powstać poza wątkiem gry
+        self._start_gold = self._start_level = self._start_inventory_size = None
+
+    def can_continue(self):
+        return self.stop_reason is None and self.game.player is not None and self.game.player.is_alive()
+
+    def run(self, cycles, time_budget=None):
+        deadline = time.perf_counter() + time_budget if time_budget else None
+        if self._start_gold is None:
+            player = self.game.player
+            self._start_gold = player.gold if player else 0
+            self._start_level = player.level if player else 0
+            self._start_inventory_size = len(player.inventory) if player else 0
+        completed = 0
+        with self.game.batched_gui_updates(forward_messages=False):
+            while completed < cycles and self.can_continue():
+                self._run_cycle()
+                completed += 1
+                if deadline and time.perf_counter() >= deadline:
+                    break
+        self.stats['cycles'] += completed
+        return completed
+
+    def _run_cycle(self):
+        game = self.game
+        if not game.is_in_combat:
+            if self.policy.needs_rest(game.player) and (not self._drink_potion_outside_combat()):
+                self.stop_reason = 'Za mało HP i brak mikstur leczniczych.'
+                return
+            game.explore()
+            self.stats['explores'] += 1
+        if game.is_in_combat:
+            self._fight()
+
+    def _drink_potion_outside_combat(self):
+        potion = self.policy.find_healing_potion(self.game.player)
+        if potion is None:
+            return False
+        self.game.use_inventory_item(str(self.game.player.inventory.index(potion) + 1))
+        self.stats['potions_used'] += 1
+        return True
+
+    def _fight(self):
+        game = self.game
+        enemy = game.current_enemy
+        self.stats['fights'] += 1
+        actions = 0
+        while game.is_in_combat and actions < self.max_actions_per_fight:
+            action, param = self.policy.choose_combat_action(game.player, enemy)
+            if action == 'flee':
+                game.flee_combat()
+            else:
+                game.player_action_combat(action, param)
+                if action == 'use_potion':
+                    self.stats['potions_used'] += 1
+            actions += 1
+        if game.is_in_combat:
+            self.stop_reason = f'Walka z {enemy.name} trwa zbyt długo.'
+        elif game.player is None:
+            self.stats['fights_lost'] += 1
+            self.stop_reason = f'Pokonany przez {enemy.name}.'
+        elif not enemy.is_alive():
+            self.stats['fights_won'] += 1
+        else:
+            self.stats['fights_fled'] += 1
+
+    def get_summary(self):
+        player = self.game.player
+        summary = f"Auto-eksploracja: {self.stats['cycles']} cykli, walki: {self.stats['fights']} (wygrane {self.stats['fights_won']}, ucieczki {self.stats['fights_fled']}, porażki {self.stats['fights_lost']}), mikstury użyte: {self.stats['potions_used']}."
+        if player:
+            summary += f' Złoto: {format_currency(player.gold - self._start_gold)}, poziomy: +{player.level - self._start_level}, przedmioty: {len(player.inventory) - self._start_inventory_size:+d}.'
+        if self.stop_reason:
+            summary += f' Przerwano: {self.stop_reason}'
+        return summary
+
+def run_auto_play(game, cycles, policy=None):
+    auto_player = AutoPlayer(game, policy)
+    auto_player.run(cycles)
+    log_event(auto_player.get_summary(), level='INFO', color=COLOR_CYAN)
+    return auto_player
@@ -1,19 +1,35 @@
 
 import random
-from items import Item, Weapon, Armor, Potion, ALL_DEFAULT_ITEMS
+from collections import defaultdict
+from operator import attrgetter
+from items import Item, Weapon, Armor, Potion, ALL_DEFAULT_ITEMS, item_key_for, overlay_of, item_from_data
+from loot import LootTable
+from inventory import Inventory
+from status_effects import StatusEffects
+from messages import GameMessage, join_messages
+from dice import compile_dice
 from utils import (
-    log_event, roll_dice_expression, clamp, calculate_level_xp_threshold, 
+    log_event, clamp, calculate_level_xp_threshold, 
     COLOR_RED, COLOR_GREEN, COLOR_YELLOW, safe_nested_get, generate_random_syllabic_name
 )
 
+DEFAULT_SPEED = 10
+UNARMED_ROLLER = compile_dice("1d3")
+DEFAULT_ENEMY_ROLLER = compile_dice("1d4")
+
 class Character:
-    def __init__(self, name, hp, attack, defense):
+    SNAPSHOT_FIELDS = ("hp", "max_hp", "attack_power", "defense_power", "is_blocking")
+    _snapshot_getter = attrgetter(*SNAPSHOT_FIELDS)
+
+    def __init__(self, name, hp, attack, defense, speed=DEFAULT_SPEED):
         self.name = name if name else generate_random_syllabic_name(min_syl=2, max_syl=3)
         self.max_hp = hp
         self.hp = hp
         self.attack_power = attack 
         self.defense_power = defense
+        self.speed = speed
         self.is_blocking = False
+        self.status_effects = StatusEffects(self)
 
     def take_damage(self, damage):
         actual_damage_taken = 0
@@ -23,76 +39,95 @@ class Character:
             effective_defense = self.get_total_defense() * 2 
             reduced_damage = clamp(damage - effective_defense, 0, damage)
             actual_damage_taken = reduced_damage
-            msg = f"{self.name} blokuje atak! Obrona: {effective_defense}. Otrzymuje {actual_damage_taken} obrażeń (z {damage})."
-            log_event(msg, level="DEBUG", color=COLOR_YELLOW)
-            log_message_parts.append(f"{self.name} blokuje i otrzymuje {actual_damage_taken} obrażeń!")
+            log_event(GameMessage("damage.blocked_detail", target=self.name, defense=effective_defense, amount=actual_damage_taken, damage=damage), level="DEBUG", color=COLOR_YELLOW)
+            log_message_parts.append(GameMessage("damage.blocked", target=self.name, amount=actual_damage_taken))
             self.is_blocking = False
         else:
             effective_defense = self.get_total_defense()
             reduced_damage = clamp(damage - effective_defense, 0, damage)
             actual_damage_taken = reduced_damage
-            msg = f"{self.name} otrzymuje {actual_damage_taken} obrażeń (z {damage}, obrona: {effective_defense})."
-            log_event(msg, level="DEBUG", color=COLOR_RED)
-            log_message_parts.append(f"{self.name} otrzymuje {actual_damage_taken} obrażeń.")
+            log_event(GameMessage("damage.taken_detail", target=self.name, amount=actual_damage_taken, damage=damage, defense=effective_defense), level="DEBUG", color=COLOR_RED)
+            log_message_parts.append(GameMessage("damage.taken", target=self.name, amount=actual_damage_taken))
         
         self.hp = clamp(self.hp - actual_damage_taken, 0, self.max_hp)
         
         if self.hp == 0:
-            log_event(f"{self.name} został pokonany!", level="INFO", color=COLOR_RED)
-            log_message_parts.append(f"{self.name} pada nieprzytomny!")
+            log_event(GameMessage("character.defeated", target=self.name), level="DEBUG", color=COLOR_RED)
+            log_message_parts.append(GameMessage("damage.knocked_out", target=self.name))
             
-        return actual_damage_taken, " ".join(log_message_parts)
+        return actual_damage_taken, join_messages(*log_message_parts)
 
 
     def is_alive(self):
         return self.hp > 0
 
+    def snapshot(self):
+        return (self._snapshot_getter(self), self.status_effects.snapshot())
+
+    def restore(self, state):
+        values, effects_state = state[0], state[1]
+        for field, value in zip(self.SNAPSHOT_FIELDS, values):
+            setattr(self, field, value)
+        self.status_effects.restore(effects_state)
+
     def get_total_attack(self):
-        return self.attack_power
+        return self.attack_power + self.status_effects.bonus("attack_power")
 
     def get_total_defense(self):
-        return self.defense_power
+        return self.defense_power + self.status_effects.bonus("defense_power")
 
     def attack_target(self, target):
         if not self.is_alive():
-            return None, f"{self.name} nie może atakować, jest nieprzytomny."
+            return None, GameMessage("attack.cannot_act", attacker=self.name)
 
         base_damage = self.get_total_attack()
         weapon_damage_roll = 0
         
-        if hasattr(self, 'equipped_weapon') and self.equipped_weapon and self.equipped_weapon.damage_dice:
-            try:
-                weapon_damage_roll = roll_dice_expression(self.equipped_weapon.damage_dice)
-                log_event(f"{self.name} rzuca {self.equipped_weapon.damage_dice} dla broni: {weapon_damage_roll}", level="DEBUG")
-            except ValueError as e:
-                log_event(f"Błąd w notacji kości dla broni {self.equipped_weapon.name}: {e}", level="ERROR", color=COLOR_RED)
-                weapon_damage_roll = self.equipped_weapon.damage
+        if hasattr(self, 'equipped_weapon') and self.equipped_weapon and self.equipped_weapon.damage_roller:
+            weapon_damage_roll = self.equipped_weapon.damage_roller.roll()
+            log_event("%s rzuca %s dla broni: %s", self.name, self.equipped_weapon.damage_dice, weapon_damage_roll, level="DEBUG")
         elif hasattr(self, 'equipped_weapon') and self.equipped_weapon:
              weapon_damage_roll = self.equipped_weapon.damage
         else:
-            weapon_damage_roll = roll_dice_expression("1d3")
+            weapon_damage_roll = UNARMED_ROLLER.roll()
 
         potential_damage = base_damage + weapon_damage_roll + random.randint(-1,1)
         potential_damage = max(1, potential_damage)
 
-        log_event(f"{self.name} (Atk:{base_damage}) atakuje {target.name} z potencjalnymi obrażeniami: {potential_damage} (broń: {weapon_damage_roll}).", level="INFO")
+        log_event("%s (Atk:%s) atakuje %s z potencjalnymi obrażeniami: %s (broń: %s).", self.name, base_damage, target.name, potential_damage, weapon_damage_roll, level="DEBUG")
         
         actual_damage_inflicted, damage_message = target.take_damage(potential_damage)
         
-        attack_log_message = f"{self.name} atakuje {target.name}. {damage_message}"
+        attack_log_message = GameMessage("attack.hit", attacker=self.name, target=target.name, damage=damage_message)
         return actual_damage_inflicted, attack_log_message
 
+    def get_damage_distribution(self):
+        base_damage = self.get_total_attack()
+        weapon = getattr(self, 'equipped_weapon', None)
+        if weapon and weapon.damage_roller:
+            weapon_distribution = weapon.damage_roller.distribution()
+        elif weapon:
+            weapon_distribution = {weapon.damage: 1.0}
+        else:
+            weapon_distribution = UNARMED_ROLLER.distribution()
+        distribution = defaultdict(float)
+        for roll, chance in weapon_distribution.items():
+            for jitter in (-1, 0, 1):
+                distribution[max(1, base_damage + roll + jitter)] += chance / 3
+        return dict(distribution)
+
     def block(self):
-        log_event(f"{self.name} przygotowuje się do bloku!", level="INFO", color=COLOR_YELLOW)
+        msg = GameMessage("block.prepare", character=self.name)
+        log_event(msg, level="DEBUG", color=COLOR_YELLOW)
         self.is_blocking = True
-        return f"{self.name} przygotowuje się do bloku!"
+        return msg
 
     def heal(self, amount):
         hp_before = self.hp
         self.hp = clamp(self.hp + amount, 0, self.max_hp)
         healed_amount = self.hp - hp_before
-        msg = f"{self.name} leczy się o {healed_amount} HP (do {self.hp}/{self.max_hp})."
-        log_event(msg, level="INFO", color=COLOR_GREEN)
+        msg = GameMessage("heal.done", character=self.name, amount=healed_amount, hp=self.hp, max_hp=self.max_hp)
+        log_event(msg, level="DEBUG", color=COLOR_GREEN)
         return healed_amount, msg
 
 
@@ -100,6 +135,9 @@ class Character:
         return f"{self.name} (HP: {self.hp}/{self.max_hp}, Baz.Atk: {self.attack_power}, Baz.Def: {self.defense_power})"
 
 class Player(Character):
+    SNAPSHOT_FIELDS = Character.SNAPSHOT_FIELDS + ("gold", "xp", "level", "equipped_weapon", "equipped_armor")
+    _snapshot_getter = attrgetter(*SNAPSHOT_FIELDS)
+
     def __init__(self, name, chosen_class="Wojownik"):
         if chosen_class == "Wojownik":
             super().__init__(name, hp=100, attack=10, defense=5)
@@ -114,96 +152,86 @@ class Player(Character):
             self.equipped_weapon = ALL_DEFAULT_ITEMS["old_sword"]
             self.equipped_armor = ALL_DEFAULT_ITEMS["leather_vest_worn"]
 
-        self.inventory = []
+        self.inventory = Inventory()
         self.gold = 20
         self.xp = 0
         self.level = 1
         self.chosen_class = chosen_class
 
     def get_total_attack(self):
-        return self.attack_power + (self.equipped_weapon.damage if self.equipped_weapon else 0)
+        return self.attack_power + self.status_effects.bonus("attack_power") + (self.equipped_weapon.damage if self.equipped_weapon else 0)
 
 
     def get_total_defense(self):
-        base_defense = self.defense_power
+        base_defense = self.defense_power + self.status_effects.bonus("defense_power")
         armor_bonus = self.equipped_armor.defense if self.equipped_armor else 0
         return base_defense + armor_bonus
     
+    def snapshot(self):
+        return super().snapshot() + (self.inventory.snapshot(),)
+
+    def restore(self, state):
+        super().restore(state)
+        self.inventory.restore(state[2])
+
     def add_item(self, item):
         self.inventory.append(item)
         log_event(f"Przedmiot '{item.name}' dodany do ekwipunku gracza '{self.name}'.", level="DEBUG")
         return f"{item.name} dodany do ekwipunku."
 
     def remove_item(self, item_name):
-        for i, item in enumerate(self.inventory):
-            if item.name.lower() == item_name.lower():
-                removed_item = self.inventory.pop(i)
-                log_event(f"Przedmiot '{removed_item.name}' usunięty z ekwipunku gracza '{self.name}'.", level="DEBUG")
-                return removed_item
-        return None
+        removed_item = self.inventory.find(item_name)
+        if removed_item:
+            self.inventory.remove(removed_item)
+            log_event(f"Przedmiot '{removed_item.name}' usunięty z ekwipunku gracza '{self.name}'.", level="DEBUG")
+        return removed_item
 
     def equip_item(self, item_name):
-        item_to_equip = None
-        item_index = -1
-        for i, item_obj in enumerate(self.inventory):
-            if item_obj.name.lower() == item_name.lower():
-                item_to_equip = item_obj
-                item_index = i
-                break
-        
+        item_to_equip = self.inventory.find(item_name)
         if not item_to_equip:
-            return f"Nie masz przedmiotu {item_name} w ekwipunku."
+            return GameMessage("equip.missing", item=item_name)
 
-        log_msg = ""
+        removed_msg = None
         if isinstance(item_to_equip, Weapon):
             if self.equipped_weapon: 
                 self.add_item(self.equipped_weapon) 
-                log_msg += f" Zdjęto {self.equipped_weapon.name}."
+                removed_msg = GameMessage("equip.removed", item=self.equipped_weapon.name)
             self.equipped_weapon = item_to_equip
-            self.inventory.pop(item_index)
-            log_msg = f"Wyposażono {item_to_equip.name}." + log_msg
-            log_event(f"Gracz '{self.name}' wyposażył broń: {item_to_equip.name}.", level="INFO")
+            self.inventory.remove(item_to_equip)
+            log_event("Gracz '%s' wyposażył broń: %s.", self.name, item_to_equip.name, level="INFO")
         elif isinstance(item_to_equip, Armor):
             if self.equipped_armor:
                 self.add_item(self.equipped_armor)
-                log_msg += f" Zdjęto {self.equipped_armor.name}."
+                removed_msg = GameMessage("equip.removed", item=self.equipped_armor.name)
             self.equipped_armor = item_to_equip
-            self.inventory.pop(item_index)
-            log_msg = f"Wyposażono {item_to_equip.name}." + log_msg
-            log_event(f"Gracz '{self.name}' wyposażył zbroję: {item_to_equip.name}.", level="INFO")
+            self.inventory.remove(item_to_equip)
+            log_event("Gracz '%s' wyposażył zbroję: %s.", self.name, item_to_equip.name, level="INFO")
         else:
-            log_msg = f"{item_to_equip.name} nie jest bronią ani zbroją."
+            return GameMessage("equip.not_equipment", item=item_to_equip.name)
         
-        return log_msg
+        return join_messages(GameMessage("equip.done", item=item_to_equip.name), removed_msg)
 
     def use_potion(self, potion_name):
-        potion_to_use = None
-        potion_index = -1
-        for i, item in enumerate(self.inventory):
-            if isinstance(item, Potion) and item.name.lower() == potion_name.lower():
-                potion_to_use = item
-                potion_index = i
-                break
-        
+        potion_to_use = self.inventory.find(potion_name, Potion)
         if potion_to_use:
             success, message = potion_to_use.use(self) 
             if success:
-                self.inventory.pop(potion_index)
-                log_event(f"Gracz '{self.name}' użył mikstury '{potion_name}'. {message}", level="INFO")
+                self.inventory.remove(potion_to_use)
+                log_event("Gracz '%s' użył mikstury '%s'. %s", self.name, potion_name, message, level="DEBUG")
                 return True, message
             else:
-                log_event(f"Nie udało się użyć mikstury '{potion_name}' przez gracza '{self.name}'. {message}", level="WARNING")
+                log_event("Nie udało się użyć mikstury '%s' przez gracza '%s'. %s", potion_name, self.name, message, level="DEBUG")
                 return False, message
         else:
-            msg = f"Nie masz mikstury {potion_name}."
+            msg = GameMessage("potion.missing", potion=potion_name)
             log_event(msg, level="INFO")
             return False, msg
 
 
     def add_xp(self, amount):
         self.xp += amount
-        log_event(f"Gracz '{self.name}' zdobywa {amount} XP. Total XP: {self.xp}", level="INFO")
-        gui_message = [f"Zdobywasz {amount} XP."]
+        log_event("Gracz '%s' zdobywa %s XP. Total XP: %s", self.name, amount, self.xp, level="DEBUG")
+        gui_message = [GameMessage("character.xp_gained", amount=amount)]
         
         xp_needed_for_next_level = calculate_level_xp_threshold(self.level, base_xp=100, factor=1.2, exponent=1.5)
         
@@ -216,24 +244,22 @@ class Player(Character):
             self.attack_power += random.randint(1,2)
             self.defense_power += random.randint(0,1)
 
-            level_up_msg = f"Awans na {self.level} poziom! Statystyki wzrosły. HP do {self.max_hp}, Atk do {self.attack_power}, Def do {self.defense_power}."
-            log_event(f"Gracz '{self.name}' awansował na poziom {self.level}!", level="INFO", color=COLOR_GREEN)
+            level_up_msg = GameMessage("character.level_up", level=self.level, max_hp=self.max_hp, attack=self.attack_power, defense=self.defense_power)
+            log_event("Gracz '%s' awansował na poziom %s!", self.name, self.level, level="INFO", color=COLOR_GREEN)
             gui_message.append(level_up_msg)
             
             xp_needed_for_next_level = calculate_level_xp_threshold(self.level, base_xp=100, factor=1.2, exponent=1.5)
         
-        return " ".join(gui_message)
+        return join_messages(*gui_message)
             
     def to_dict(self):
         inventory_data = []
         for item in self.inventory:
-            item_key = None
-            for key, default_item in ALL_DEFAULT_ITEMS.items():
-                if default_item.name == item.name:
-                    item_key = key
-                    break
+            item_key = item_key_for(item)
             if item_key:
-                inventory_data.append({"item_key": item_key})
+                # zapisujemy tylko klucz prototypu i ewentualną nakładkę egzemplarza
+                overlay = overlay_of(item)
+                inventory_data.append({"item_key": item_key, "overlay": overlay} if overlay else {"item_key": item_key})
             else:
                 item_data = {"name": item.name, "type": item.__class__.__name__}
                 if isinstance(item, Weapon): item_data.update({"damage": item.damage, "damage_dice": item.damage_dice})
@@ -246,19 +272,17 @@ class Player(Character):
 
         equipped_weapon_key = None
         if self.equipped_weapon:
-            for key, item_obj in ALL_DEFAULT_ITEMS.items():
-                if item_obj.name == self.equipped_weapon.name and isinstance(item_obj, Weapon):
-                    equipped_weapon_key = key
-                    break
+            item_key = item_key_for(self.equipped_weapon)
+            if isinstance(ALL_DEFAULT_ITEMS.get(item_key), Weapon):
+                equipped_weapon_key = item_key
         
         equipped_armor_key = None
         if self.equipped_armor:
-            for key, item_obj in ALL_DEFAULT_ITEMS.items():
-                if item_obj.name == self.equipped_armor.name and isinstance(item_obj, Armor):
-                    equipped_armor_key = key
-                    break
+            item_key = item_key_for(self.equipped_armor)
+            if isinstance(ALL_DEFAULT_ITEMS.get(item_key), Armor):
+                equipped_armor_key = item_key
 
-        return {
+        data = {
             "name": self.name,
             "chosen_class": self.chosen_class,
             "hp": self.hp,
@@ -272,6 +296,11 @@ class Player(Character):
             "equipped_weapon_key": equipped_weapon_key,
             "equipped_armor_key": equipped_armor_key,
         }
+        if equipped_weapon_key and overlay_of(self.equipped_weapon):
+            data["equipped_weapon_overlay"] = overlay_of(self.equipped_weapon)
+        if equipped_armor_key and overlay_of(self.equipped_armor):
+            data["equipped_armor_overlay"] = overlay_of(self.equipped_armor)
+        return data
 
     @classmethod
     def from_dict(cls, data, all_items_reference):
@@ -287,11 +316,15 @@ class Player(Character):
         player.xp = safe_nested_get(data, "xp", player.xp)
         player.level = safe_nested_get(data, "level", player.level)
 
-        player.inventory = []
+        player.inventory = Inventory()
         for item_data_entry in safe_nested_get(data, "inventory", []):
             item_key = safe_nested_get(item_data_entry, "item_key")
             if item_key and item_key in all_items_reference:
-                player.add_item(all_items_reference[item_key])
+                try:
+                    player.add_item(item_from_data(item_key, safe_nested_get(item_data_entry, "overlay", {}), all_items_reference))
+                except (ValueError, TypeError) as e:
+                    log_event(f"Nieprawidłowa nakładka przedmiotu {item_key}: {e}", level="WARNING")
+                    player.add_item(all_items_reference[item_key])
             else:
                 log_event(f"Nie można odtworzyć przedmiotu z ekwipunku: {item_data_entry}", level="WARNING")
 
@@ -300,7 +333,7 @@ class Player(Character):
         if equipped_weapon_key and equipped_weapon_key in all_items_reference:
             item_obj = all_items_reference[equipped_weapon_key]
             if isinstance(item_obj, Weapon):
-                 player.equipped_weapon = item_obj
+                 player.equipped_weapon = cls._equipped_from_data(data, "equipped_weapon_overlay", equipped_weapon_key, all_items_reference)
             else:
                 log_event(f"Próba wyposażenia '{equipped_weapon_key}' jako broń, ale to nie broń.", level="ERROR")
         elif not player.equipped_weapon:
@@ -311,7 +344,7 @@ class Player(Character):
         if equipped_armor_key and equipped_armor_key in all_items_reference:
             item_obj = all_items_reference[equipped_armor_key]
             if isinstance(item_obj, Armor):
-                 player.equipped_armor = item_obj
+                 player.equipped_armor = cls._equipped_from_data(data, "equipped_armor_overlay", equipped_armor_key, all_items_reference)
             else:
                 log_event(f"Próba wyposażenia '{equipped_armor_key}' jako zbroja, ale to nie zbroja.", level="ERROR")
         elif not player.equipped_armor:
@@ -320,50 +353,64 @@ class Player(Character):
         
         return player
 
+    @staticmethod
+    def _equipped_from_data(data, overlay_field, item_key, all_items_reference):
+        try:
+            return item_from_data(item_key, safe_nested_get(data, overlay_field, {}), all_items_reference)
+        except (ValueError, TypeError) as e:
+            log_event(f"Nieprawidłowa nakładka przedmiotu {item_key}: {e}", level="WARNING")
+            return all_items_reference[item_key]
+
 
 class Enemy(Character):
-    def __init__(self, name, hp, attack, defense, xp_reward, gold_reward, loot_table=None, attack_dice="1d4"):
-        super().__init__(name, hp, attack, defense)
+    def __init__(self, name, hp, attack, defense, xp_reward, gold_reward, loot_table=None, attack_dice="1d4", speed=DEFAULT_SPEED):
+        super().__init__(name, hp, attack, defense, speed)
         self.xp_reward = xp_reward
         self.gold_reward = gold_reward
-        self.loot_table = loot_table if loot_table else []
+        self.loot_table = loot_table if isinstance(loot_table, LootTable) else LootTable(loot_table, name=name)
         self.attack_dice = attack_dice
 
-    def attack_target(self, target):
-        if not self.is_alive():
-            return None, f"{self.name} nie może atakować, jest pokonany."
+    @property
+    def attack_dice(self):
+        return self._attack_dice
 
-        base_damage = self.get_total_attack()
+    @attack_dice.setter
+    def attack_dice(self, expression):
+        self._attack_dice = expression
         try:
-            weapon_damage_roll = roll_dice_expression(self.attack_dice)
+            self.attack_roller = compile_dice(expression)
         except ValueError as e:
             log_event(f"Błąd w notacji kości dla ataku wroga {self.name}: {e}", level="ERROR", color=COLOR_RED)
-            weapon_damage_roll = random.randint(1, 4)
+            self.attack_roller = DEFAULT_ENEMY_ROLLER
+
+    def attack_target(self, target):
+        if not self.is_alive():
+            return None, GameMessage("attack.enemy_cannot_act", attacker=self.name)
+
+        base_damage = self.get_total_attack()
+        weapon_damage_roll = self.attack_roller.roll()
 
         potential_damage = base_damage + weapon_damage_roll
         potential_damage = max(1, potential_damage)
 
-        log_event(f"Wróg {self.name} (Atk:{base_damage}) atakuje {target.name} z potencjalnymi obrażeniami: {potential_damage} (kość: {self.attack_dice} -> {weapon_damage_roll}).", level="INFO")
+        log_event("Wróg %s (Atk:%s) atakuje %s z potencjalnymi obrażeniami: %s (kość: %s -> %s).", self.name, base_damage, target.name, potential_damage, self.attack_dice, weapon_damage_roll, level="DEBUG")
         
         actual_damage_inflicted, damage_message = target.take_damage(potential_damage)
         
-        attack_log_message = f"{self.name} atakuje {target.name}. {damage_message}"
+        attack_log_message = GameMessage("attack.hit", attacker=self.name, target=target.name, damage=damage_message)
         return actual_damage_inflicted, attack_log_message
 
+    def get_damage_distribution(self):
+        base_damage = self.get_total_attack()
+        roll_distribution = self.attack_roller.distribution()
+        distribution = defaultdict(float)
+        for roll, chance in roll_distribution.items():
+            distribution[max(1, base_damage + roll)] += chance
+        return dict(distribution)
+
 
     def drop_loot(self):
-        dropped_items = []
-        if self.loot_table:
-            for loot_entry in self.loot_table:
-                item_ref, chance = loot_entry 
-                if random.randint(1, 100) <= chance:
-                    if isinstance(item_ref, str) and item_ref in ALL_DEFAULT_ITEMS:
-                        dropped_items.append(ALL_DEFAULT_ITEMS[item_ref])
-                    elif isinstance(item_ref, Item):
-                        dropped_items.append(item_ref)
-                    else:
-                        log_event(f"Nieznany format łupu dla {self.name}: {item_ref}", level="WARNING")
-            
+        dropped_items = self.loot_table.roll()
         if dropped_items:
             log_event(f"{self.name} upuszcza łup: {[item.name for item in dropped_items]}", level="INFO", color=COLOR_GREEN)
         return dropped_items
\ No newline at end of file
@@ -0,0 +1,132 @@
+from collections import defaultdict
+from functools import lru_cache
+from characters import Player
+from enemy_ai import ENEMY_BLOCK_HP_THRESHOLD, ENEMY_BLOCK_CHANCE
+from game_logic import DEFAULT_ENEMY_DEFINITIONS, FLEE_CHANCE, create_enemy_from_definition
+from utils import log_event, COLOR_CYAN
+PLAYER_CLASSES = ('Wojownik', 'Mag')
+_NO_OUTCOME = (0.0, 0.0, 0.0)
+
+def _apply_defense(distribution, defense):
+    hits = defaultdict(float)
+    miss_chance = 0.0
+    for damage, chance in distribution:
+        taken = max(0, damage - defense)
+        if taken > 0:
+            hits[taken] += chance
+        else:
+            miss_chance += chance
+    return (tuple(sorted(hits.items())), miss_chance)
+
+@lru_cache(maxsize=256)
+def _solve_tables(player_hp, player_damage, enemy_hp, enemy_max_hp, enemy_defense, enemy_damage, player_defense, flee_below_hp):
+    # stan: (HP gracza, HP wroga, czy wróg blokuje) na początku tury gracza
+    # wynik: (wygrana, ucieczka, śmierć); brakująca masa to walka bez końca
+    open_hits, open_miss = _apply_defense(player_damage, enemy_defense)
+    blocked_hits, blocked_miss = _apply_defense(player_damage, enemy_defense * 2)
+    enemy_hits, enemy_miss = _apply_defense(enemy_damage, player_defense)
+    block_below = enemy_max_hp * ENEMY_BLOCK_HP_THRESHOLD
+    enemy_block_chance = ENEMY_BLOCK_CHANCE / 100
+    flee_chance = FLEE_CHANCE / 100
+    width = enemy_hp + 1
+    value_open = [[_NO_OUTCOME] * width for _ in range(player_hp + 1)]
+    value_blocked = [[_NO_OUTCOME] * width for _ in range(player_hp + 1)]
+    after_attack = [[_NO_OUTCOME] * width for _ in range(player_hp + 1)]
+    for p in range(1, player_hp + 1):
+        row_open = value_open[p]
+        row_blocked = value_blocked[p]
+        row_after = after_attack[p]
+        fleeing = p < flee_below_hp
+        for e in range(1, enemy_hp + 1):
+            b = enemy_block_chance if e < block_below else 0.0
+            kw_open = kf_open = kd_open = 0.0
+            kw_blocked = kf_blocked = kd_blocked = 0.0
+            for damage, chance in enemy_hits:
+                if p - damage <= 0:
+                    kd_open += chance
+                    kd_blocked += chance
+                else:
+                    w, f, d = value_open[p - damage][e]
+                    kw_open += chance * w
+                    kf_open += chance * f
+                    kd_open += chance * d
+                    w, f, d = value_blocked[p - damage][e]
+                    kw_blocked += chance * w
+                    kf_blocked += chance * f
+                    kd_blocked += chance * d
+            attack_share = 1 - b
+            if fleeing:
+                stay = 1 - flee_chance
+                denominator = 1 - stay * (b + attack_share * enemy_miss)
+                y = ((stay * attack_share * kw_blocked) / denominator, (flee_chance + stay * attack_share * kf_blocked) / denominator, (stay * attack_share * kd_blocked) / denominator)
+                denominator = 1 - stay * attack_share * enemy_miss
+                x = ((stay * (b * y[0] + attack_share * kw_open)) / denominator, (flee_chance + stay * (b * y[1] + attack_share * kf_open)) / denominator, (stay * (b * y[2] + attack_share * kd_open)) / denominator)
+                row_after[e] = (b * y[0] + attack_share * (kw_open + enemy_miss * x[0]), b * y[1] + attack_share * (kf_open + enemy_miss * x[1]), b * y[2] + attack_share * (kd_open + enemy_miss * x[2]))
+            else:
+                sw_open = sf_open = sd_open = 0.0
+                for damage, chance in open_hits:
+                    if e - damage <= 0:
+                        sw_open += chance
+                    else:
+                        w, f, d = row_after[e - damage]
+                        sw_open += chance * w
+                        sf_open += chance * f
+                        sd_open += chance * d
+                sw_blocked = sf_blocked = sd_blocked = 0.0
+                for damage, chance in blocked_hits:
+                    if e - damage <= 0:
+                        sw_blocked += chance
+                    else:
+                        w, f, d = row_after[e - damage]
+                        sw_blocked += chance * w
+                        sf_blocked += chance * f
+                        sd_blocked += chance * d
+                loop_open = attack_share * enemy_miss
+                denominator = 1 - b * blocked_miss - loop_open * open_miss
+                if denominator <= 1e-12:
+                    a = _NO_OUTCOME
+                else:
+                    a = ((b * sw_blocked + loop_open * sw_open + attack_share * kw_open) / denominator, (b * sf_blocked + loop_open * sf_open + attack_share * kf_open) / denominator, (b * sd_blocked + loop_open * sd_open + attack_share * kd_open) / denominator)
+                x = (sw_open + open_miss * a[0], sf_open + open_miss * a[1], sd_open + open_miss * a[2])
+                y = (sw_blocked + blocked_miss * a[0], sf_blocked + blocked_miss * a[1], sd_blocked + blocked_miss * a[2])
+                row_after[e] = a
+            row_open[e] = x
+            row_blocked[e] = y
+    return (value_open, value_blocked)
+
+def solve_fight(player, enemy, flee_below_hp=0):
+    if not player.is_alive():
+        return {'win': 0.0, 'flee': 0.0, 'death': 1.0, 'stalemate': 0.0}
+    if not enemy.is_alive():
+        return {'win': 1.0, 'flee': 0.0, 'death': 0.0, 'stalemate': 0.0}
+    player_damage = tuple(sorted(player.get_damage_distribution().items()))
+    enemy_damage = tuple(sorted(enemy.get_damage_distribution().items()))
+    value_open, value_blocked = _solve_tables(player.hp, player_damage, enemy.hp, enemy.max_hp, enemy.get_total_defense(), enemy_damage, player.get_total_defense(), flee_below_hp)
+    tables = value_blocked if enemy.is_blocking else value_open
+    win, fled, death = tables[player.hp][enemy.hp]
+    return {'win': win, 'flee': fled, 'death': death, 'stalemate': max(0.0, 1 - win - fled - death)}
+
+def win_probability_matrix(classes=PLAYER_CLASSES, enemy_definitions=None, flee_below_hp=0):
+    enemy_definitions = enemy_definitions if enemy_definitions is not None else DEFAULT_ENEMY_DEFINITIONS
+    matrix = {}
+    for chosen_class in classes:
+        player = Player(chosen_class, chosen_class)
+        for enemy_key, enemy_def in enemy_definitions.items():
+            enemy = create_enemy_from_definition(enemy_key, enemy_def)
+            matrix[chosen_class, enemy_key] = solve_fight(player, enemy, flee_below_hp)
+    return matrix
+
+def format_matrix(matrix):
+    lines = [f"{'Klasa':<10} {'Wróg':<15} {'Wygrana':>8} {'Ucieczka':>9} {'Śmierć':>8}"]
+    for (chosen_class, enemy_key), result in matrix.items():
+        lines.append(f"{chosen_class:<10} {enemy_key:<15} {result['win']:>8.2%} {result['flee']:>9.2%} {result['death']:>8.2%}")
+    return '\n'.join(lines)
+if __name__ == '__main__':
+    import time
+    start_time = time.perf_counter()
+    matrix = win_probability_matrix()
+    elapsed = time.perf_counter() - start_time
+    log_event(f'Macierz prawdopodobieństw policzona w {elapsed * 1000:.1f} ms.', color=COLOR_CYAN)
+    print(format_matrix(matrix))
+    print()
+    print(format_matrix(win_probability_matrix(flee_below_hp=25)))
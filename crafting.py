@@ -0,0 +1,181 @@
+import math
+from collections import OrderedDict, defaultdict
+from items import ALL_DEFAULT_ITEMS
+from utils import log_event, COLOR_GREEN
+PLAN_CACHE_SIZE = 256
+DEFAULT_RECIPES = {
+    'iron_ingot': {'ingredients': {'iron_ore': 2}},
+    'leather_strip': {'ingredients': {'wolf_pelt': 1}, 'quantity': 2},
+    'silk_thread': {'ingredients': {'spider_silk': 2}},
+    'healing_essence': {'ingredients': {'herbs_common': 3}},
+    'alchemical_base': {'ingredients': {'healing_essence': 1, 'glowing_mushroom': 1}},
+    'small_health_potion': {'ingredients': {'healing_essence': 1, 'waterskin': 1}},
+    'medium_health_potion': {'ingredients': {'healing_essence': 2, 'alchemical_base': 1}},
+    'troll_blood_potion': {'ingredients': {'alchemical_base': 2, 'rare_flower_petal': 1}},
+    'antidote_weak': {'ingredients': {'herbs_common': 2, 'spider_silk': 1}},
+    'iron_dagger': {'ingredients': {'iron_ingot': 2, 'leather_strip': 1}},
+    'iron_sword': {'ingredients': {'iron_ingot': 4, 'leather_strip': 2}},
+    'studded_leather_jerkin': {'ingredients': {'leather_strip': 4, 'iron_ingot': 1}},
+    'chainmail_shirt': {'ingredients': {'iron_ingot': 6, 'leather_strip': 2}},
+    'mages_apprentice_robe': {'ingredients': {'silk_thread': 3, 'rare_flower_petal': 1}},
+    'enchanted_robe': {'ingredients': {'mages_apprentice_robe': 1, 'silk_thread': 2, 'alchemical_base': 1}},
+}
+
+class Recipe:
+    __slots__ = ('output', 'ingredients', 'quantity')
+
+    def __init__(self, output, ingredients, quantity=1):
+        self.output = output
+        self.ingredients = ingredients
+        self.quantity = quantity
+
+class CraftingPlan:
+
+    def __init__(self, target, quantity, steps, consumed, missing, produced):
+        self.target = target
+        self.quantity = quantity
+        # kroki w kolejności wykonania (składniki przed produktami): (klucz przepisu, liczba powtórzeń)
+        self.steps = steps
+        self.consumed = consumed
+        self.missing = missing
+        self.produced = produced
+
+    @property
+    def can_craft(self):
+        return not self.missing
+
+class RecipeBook:
+
+    def __init__(self, definitions=None, items=ALL_DEFAULT_ITEMS, plan_cache_size=PLAN_CACHE_SIZE):
+        self.items = items
+        self.recipes = {}
+        for output, definition in (definitions or DEFAULT_RECIPES).items():
+            unknown = [key for key in (output, *definition['ingredients']) if key not in items]
+            if unknown:
+                raise ValueError(f"Przepis '{output}' odwołuje się do nieznanych przedmiotów: {', '.join(unknown)}")
+            if definition.get('quantity', 1) <= 0 or any((amount <= 0 for amount in definition['ingredients'].values())):
+                raise ValueError(f"Przepis '{output}' ma niedodatnie ilości.")
+            self.recipes[output] = Recipe(output, dict(definition['ingredients']), definition.get('quantity', 1))
+        self.order = self._topological_order()
+        self._rank = {key: rank for rank, key in enumerate(self.order)}
+        self._requirements = {}
+        self.plan_cache_size = plan_cache_size
+        self._plans = OrderedDict()
+
+    def _topological_order(self):
+        # DFS iteracyjnie (głębokie łańcuchy przepisów nie wyczerpią stosu); wynik: produkty przed składnikami
+        post_order = []
+        state = {}
+        for root in self.recipes:
+            if root in state:
+                continue
+            state[root] = 'visiting'
+            stack = [(root, iter(self._ingredients_of(root)))]
+            while stack:
+                key, pending = stack[-1]
+                ingredient = next(pending, None)
+                if ingredient is None:
+                    stack.pop()
+                    state[key] = 'done'
+                    post_order.append(key)
+                elif state.get(ingredient) == 'visiting':
+                    raise ValueError(f"Cykl w przepisach: '{ingredient}' wymaga pośrednio samego siebie.")
+                elif ingredient not in state:
+                    state[ingredient] = 'visiting'
+                    stack.append((ingredient, iter(self._ingredients_of(ingredient))))
+        post_order.reverse()
+        return post_order
+
+    def _ingredients_of(self, item_key):
+        recipe = self.recipes.get(item_key)
+        return recipe.ingredients if recipe else ()
+
+    def requirements(self, target):
+        # podgraf osiągalny z celu, w kolejności topologicznej - przepisy się nie zmieniają, więc liczony raz
+        required = self._requirements.get(target)
+        if required is None:
+            reachable = {target}
+            stack = [target]
+            while stack:
+                for ingredient in self._ingredients_of(stack.pop()):
+                    if ingredient not in reachable:
+                        reachable.add(ingredient)
+                        stack.append(ingredient)
+            required = sorted(reachable, key=self._rank.__getitem__)
+            self._requirements[target] = required
+        return required
+
+    def recipe_for(self, item_key):
+        return self.recipes.get(item_key)
+
+    def plan(self, target, inventory, quantity=1):
+        if target not in self.recipes:
+            raise ValueError(f"Brak przepisu na '{target}'.")
+        # wersja ekwipunku zmienia się przy każdej modyfikacji, więc jest wystarczającym kluczem
+        cache_key = (target, quantity, inventory.version)
+        plan = self._plans.get(cache_key)
+        if plan is not None:
+            self._plans.move_to_end(cache_key)
+            return plan
+        plan = self._solve(target, inventory, quantity)
+        self._plans[cache_key] = plan
+        if len(self._plans) > self.plan_cache_size:
+            self._plans.popitem(last=False)
+        return plan
+
+    def _solve(self, target, inventory, quantity):
+        # każdy przedmiot odwiedzany raz: wszystkie zapotrzebowania na niego są znane, zanim do niego dojdziemy
+        needed = defaultdict(int)
+        needed[target] = quantity
+        steps, consumed, missing, produced = ([], {}, {}, {})
+        for key in self.requirements(target):
+            need = needed.get(key, 0)
+            if not need:
+                continue
+            if key != target:
+                used = min(need, inventory.count(self.items[key].name))
+                if used:
+                    consumed[key] = used
+                    need -= used
+                if not need:
+                    continue
+            recipe = self.recipes.get(key)
+            if recipe is None:
+                missing[key] = need
+                continue
+            times = math.ceil(need / recipe.quantity)
+            steps.append((key, times))
+            leftover = times * recipe.quantity - need
+            if key == target or leftover:
+                produced[key] = times * recipe.quantity if key == target else leftover
+            for ingredient, amount in recipe.ingredients.items():
+                needed[ingredient] += amount * times
+        steps.reverse()
+        return CraftingPlan(target, quantity, steps, consumed, missing, produced)
+
+    def describe_missing(self, plan):
+        return ', '.join((f'{self.items[key].name} x{amount}' for key, amount in plan.missing.items()))
+
+    def craft(self, player, target, quantity=1):
+        plan = self.plan(target, player.inventory, quantity)
+        target_name = self.items[target].name
+        if not plan.can_craft:
+            return (False, f'Nie możesz wytworzyć {target_name}. Brakuje: {self.describe_missing(plan)}.')
+        for key, amount in plan.consumed.items():
+            for _ in range(amount):
+                player.remove_item(self.items[key].name)
+        for key, amount in plan.produced.items():
+            for _ in range(amount):
+                player.add_item(self.items[key])
+        log_event(f"Gracz '{player.name}' wytworzył {target_name} x{plan.produced[target]} ({sum((times for _, times in plan.steps))} kroków).", level='INFO', color=COLOR_GREEN)
+        return (True, f'Wytwarzasz {target_name} x{plan.produced[target]}.')
+
+    def describe_recipes(self, inventory):
+        lines = ['Przepisy:']
+        for output, recipe in self.recipes.items():
+            ingredients = ', '.join((f'{self.items[key].name} x{amount}' for key, amount in recipe.ingredients.items()))
+            plan = self.plan(output, inventory)
+            status = 'gotowe' if plan.can_craft else f'brakuje: {self.describe_missing(plan)}'
+            lines.append(f'  {self.items[output].name} x{recipe.quantity} <- {ingredients} [{status}]')
+        return '\n'.join(lines)
+RECIPE_BOOK = RecipeBook()
@@ -0,0 +1,291 @@
+import math
+import random
+import re
+from collections import defaultdict
+from functools import lru_cache
+from itertools import combinations_with_replacement
+DICE_CACHE_SIZE = 512
+MAX_DICE_COUNT = 1000
+MAX_DIE_SIDES = 10000
+MAX_EXPLOSIONS = 10
+KEEP_ENUMERATION_LIMIT = 50000
+DISTRIBUTION_SAMPLES = 20000
+_TOKEN_PATTERN = re.compile('(\\d+)|(d%|d|kh|kl|k|!|[-+*x()])')
+
+def _tokenize(expression):
+    tokens = []
+    position = 0
+    while position < len(expression):
+        match = _TOKEN_PATTERN.match(expression, position)
+        if not match:
+            raise ValueError(f'Nieprawidłowy format rzutu kostką: nieoczekiwany znak {expression[position]!r} w {expression!r}')
+        number, symbol = match.groups()
+        tokens.append(('num', int(number)) if number is not None else ('sym', symbol))
+        position = match.end()
+    return tokens
+
+class _Parser:
+    # gramatyka:
+    #   wyrażenie := składnik (('+' | '-') składnik)*
+    #   składnik  := czynnik (('*' | 'x') czynnik)*
+    #   czynnik   := '-' czynnik | '(' wyrażenie ')' | kości | liczba
+    #   kości     := [liczba] 'd' (liczba | '%') ['!'] [('kh' | 'kl' | 'k') liczba]
+
+    def __init__(self, expression):
+        self.expression = expression
+        self.tokens = _tokenize(expression)
+        self.position = 0
+
+    def error(self, reason):
+        return ValueError(f'Nieprawidłowy format rzutu kostką: {self.expression} ({reason})')
+
+    def peek(self):
+        return self.tokens[self.position] if self.position < len(self.tokens) else (None, None)
+
+    def take(self, symbol=None):
+        token = self.peek()
+        if token[0] is None or (symbol is not None and token != ('sym', symbol)):
+            raise self.error(f"oczekiwano '{symbol}'" if symbol else 'niespodziewany koniec')
+        self.position += 1
+        return token
+
+    def take_number(self):
+        kind, value = self.peek()
+        if kind != 'num':
+            raise self.error('oczekiwano liczby')
+        self.position += 1
+        return value
+
+    def parse(self):
+        if not self.tokens:
+            raise self.error('puste wyrażenie')
+        node = self.parse_expression()
+        if self.position != len(self.tokens):
+            raise self.error(f'nadmiarowe znaki od pozycji {self.position + 1}')
+        return node
+
+    def parse_expression(self):
+        node = self.parse_term()
+        while self.peek() in (('sym', '+'), ('sym', '-')):
+            operator = self.take()[1]
+            node = ('add' if operator == '+' else 'sub', node, self.parse_term())
+        return node
+
+    def parse_term(self):
+        node = self.parse_factor()
+        while self.peek() in (('sym', '*'), ('sym', 'x')):
+            self.take()
+            right = self.parse_factor()
+            if right[0] == 'const':
+                node = ('mul', node, right[1])
+            elif node[0] == 'const':
+                node = ('mul', right, node[1])
+            else:
+                raise self.error('mnożyć można tylko przez stałą')
+        return node
+
+    def parse_factor(self):
+        kind, value = self.peek()
+        if (kind, value) == ('sym', '-'):
+            self.take()
+            return ('mul', self.parse_factor(), -1)
+        if (kind, value) == ('sym', '('):
+            self.take()
+            node = self.parse_expression()
+            self.take(')')
+            return node
+        count = self.take_number() if kind == 'num' else 1
+        if self.peek() not in (('sym', 'd'), ('sym', 'd%')):
+            if kind != 'num':
+                raise self.error('oczekiwano liczby lub kości')
+            return ('const', count)
+        sides = 100 if self.take()[1] == 'd%' else self.take_number()
+        if not 0 < count <= MAX_DICE_COUNT or not 0 < sides <= MAX_DIE_SIDES:
+            raise ValueError('Liczba kości i typ kości muszą być dodatnie.' if count <= 0 or sides <= 0 else f'Za duży rzut kostką: {count}d{sides}.')
+        exploding = self.peek() == ('sym', '!')
+        if exploding:
+            self.take()
+            if sides == 1:
+                raise self.error('kość d1 nie może eksplodować')
+        keep_mode, keep_count = (None, count)
+        if self.peek() in (('sym', 'kh'), ('sym', 'kl'), ('sym', 'k')):
+            keep_mode = 'low' if self.take()[1] == 'kl' else 'high'
+            keep_count = self.take_number()
+            if not 0 < keep_count <= count:
+                raise self.error(f'można zatrzymać od 1 do {count} kości')
+            if keep_count == count:
+                keep_mode = None
+        return ('dice', count, sides, exploding, keep_mode, keep_count)
+
+def parse_dice(expression):
+    return _Parser(expression.lower().replace(' ', '')).parse()
+
+def _flatten_sum(node, sign=1, constant=0, terms=None):
+    # drzewo sum/różnic spłaszczone do: stała + lista (znak, węzeł)
+    terms = [] if terms is None else terms
+    kind = node[0]
+    if kind == 'const':
+        constant += sign * node[1]
+    elif kind in ('add', 'sub'):
+        constant, terms = _flatten_sum(node[1], sign, constant, terms)
+        constant, terms = _flatten_sum(node[2], -sign if kind == 'sub' else sign, constant, terms)
+    else:
+        terms.append((sign, node))
+    return (constant, terms)
+
+def _compile_die(sides, exploding, random_function):
+    if not exploding:
+        return lambda: int(random_function() * sides) + 1
+
+    def roll_exploding():
+        total = 0
+        for _ in range(MAX_EXPLOSIONS):
+            face = int(random_function() * sides) + 1
+            total += face
+            if face != sides:
+                return total
+        return total + int(random_function() * sides) + 1
+    return roll_exploding
+
+def _compile_node(node, random_function):
+    kind = node[0]
+    if kind == 'const':
+        value = node[1]
+        return lambda: value
+    if kind == 'mul':
+        inner = _compile_node(node[1], random_function)
+        factor = node[2]
+        return lambda: inner() * factor
+    if kind == 'dice':
+        _, count, sides, exploding, keep_mode, keep_count = node
+        if keep_mode is None and (not exploding):
+            if count == 1:
+                return lambda: int(random_function() * sides) + 1
+            dice_range = range(count)
+            return lambda: sum([int(random_function() * sides) for _ in dice_range]) + count
+        roll_die = _compile_die(sides, exploding, random_function)
+        dice_range = range(count)
+        if keep_mode is None:
+            return lambda: sum([roll_die() for _ in dice_range])
+        if keep_mode == 'high':
+            return lambda: sum(sorted([roll_die() for _ in dice_range])[count - keep_count:])
+        return lambda: sum(sorted([roll_die() for _ in dice_range])[:keep_count])
+    constant, terms = _flatten_sum(node)
+    rollers = [(sign, _compile_node(term, random_function)) for sign, term in terms]
+    if len(rollers) == 1:
+        sign, roller = rollers[0]
+        if sign > 0:
+            return lambda: roller() + constant
+        return lambda: constant - roller()
+    positive = [roller for sign, roller in rollers if sign > 0]
+    negative = [roller for sign, roller in rollers if sign < 0]
+    return lambda: constant + sum([roller() for roller in positive]) - sum([roller() for roller in negative])
+
+def _convolve(left, right, sign=1):
+    result = defaultdict(float)
+    for left_value, left_chance in left.items():
+        for right_value, right_chance in right.items():
+            result[left_value + sign * right_value] += left_chance * right_chance
+    return result
+
+def _die_distribution(sides, exploding):
+    chance = 1 / sides
+    if not exploding:
+        return {face: chance for face in range(1, sides + 1)}
+    # eksplozje ucięte na MAX_EXPLOSIONS, tak samo jak w skompilowanym rzucie
+    distribution = {}
+    for explosions in range(MAX_EXPLOSIONS):
+        for face in range(1, sides):
+            distribution[explosions * sides + face] = chance ** (explosions + 1)
+    for face in range(1, sides + 1):
+        distribution[MAX_EXPLOSIONS * sides + face] = chance ** (MAX_EXPLOSIONS + 1)
+    return distribution
+
+def _sampled_distribution(node):
+    # przybliżenie dla rzutów, których nie da się tanio policzyć dokładnie
+    roll = _compile_node(node, random.Random(0).random)
+    counts = defaultdict(int)
+    for _ in range(DISTRIBUTION_SAMPLES):
+        counts[roll()] += 1
+    return {value: count / DISTRIBUTION_SAMPLES for value, count in counts.items()}
+
+def _keep_distribution(node, single_die):
+    _, count, sides, exploding, keep_mode, keep_count = node
+    faces = sorted(single_die)
+    if math.comb(len(faces) + count - 1, count) > KEEP_ENUMERATION_LIMIT:
+        return _sampled_distribution(node)
+    distribution = defaultdict(float)
+    count_factorial = math.factorial(count)
+    for combination in combinations_with_replacement(faces, count):
+        # prawdopodobieństwo multizbioru = współczynnik wielomianowy * iloczyn szans
+        chance = count_factorial
+        repeats = defaultdict(int)
+        for face in combination:
+            chance *= single_die[face]
+            repeats[face] += 1
+        for repeat in repeats.values():
+            chance /= math.factorial(repeat)
+        kept = combination[count - keep_count:] if keep_mode == 'high' else combination[:keep_count]
+        distribution[sum(kept)] += chance
+    return distribution
+
+def _node_distribution(node):
+    kind = node[0]
+    if kind == 'const':
+        return {node[1]: 1.0}
+    if kind == 'mul':
+        return {value * node[2]: chance for value, chance in _node_distribution(node[1]).items()}
+    if kind == 'dice':
+        _, count, sides, exploding, keep_mode, _ = node
+        single_die = _die_distribution(sides, exploding)
+        if keep_mode is not None:
+            return dict(_keep_distribution(node, single_die))
+        distribution = {0: 1.0}
+        for _ in range(count):
+            distribution = _convolve(distribution, single_die)
+        return dict(distribution)
+    constant, terms = _flatten_sum(node)
+    distribution = {constant: 1.0}
+    for sign, term in terms:
+        distribution = _convolve(distribution, _node_distribution(term), sign)
+    return dict(distribution)
+
+class DiceRoller:
+    __slots__ = ('expression', 'tree', 'roll', '_distribution')
+
+    def __init__(self, expression, tree):
+        self.expression = expression
+        self.tree = tree
+        self.roll = _compile_node(tree, random.random)
+        self._distribution = None
+
+    def __call__(self):
+        return self.roll()
+
+    def distribution(self):
+        # liczone leniwie i zapamiętywane; słownika nie należy modyfikować
+        if self._distribution is None:
+            self._distribution = _node_distribution(self.tree)
+        return self._distribution
+
+    @property
+    def min_value(self):
+        return min(self.distribution())
+
+    @property
+    def max_value(self):
+        return max(self.distribution())
+
+    def __repr__(self):
+        return f'DiceRoller({self.expression!r})'
+
+    def __reduce__(self):
+        # domknięć nie da się serializować - po drugiej stronie kompilujemy ponownie (z cache)
+        return (compile_dice, (self.expression,))
+
+@lru_cache(maxsize=DICE_CACHE_SIZE)
+def _compile_normalized(expression):
+    return DiceRoller(expression, _Parser(expression).parse())
+
+def compile_dice(expression):
+    return _compile_normalized(expression.lower().replace(' ', ''))
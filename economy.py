@@ -0,0 +1,141 @@
+from bisect import bisect_left, bisect_right, insort
+from heapq import merge
+from items import ALL_DEFAULT_ITEMS, Item
+from utils import log_event, format_currency, clamp, COLOR_GREEN, COLOR_YELLOW
+PRICE_ELASTICITY = 0.05
+MIN_DEMAND = 0.5
+MAX_DEMAND = 3.0
+DEFAULT_MERCHANTS = {'village_trader': {'name': 'Handlarz z Wioski', 'buy_markup': 1.25, 'sell_ratio': 0.5, 'stock': {'small_health_potion': 5, 'medium_health_potion': 2, 'antidote_weak': 3, 'stale_bread': 10, 'apple_red': 10, 'waterskin': 4, 'rusty_dagger': 2}}, 'blacksmith': {'name': 'Kowal', 'buy_markup': 1.4, 'sell_ratio': 0.6, 'stock': {'iron_sword': 2, 'rusty_dagger': 3, 'iron_ore': 6}}}
+
+class CatalogIndex:
+
+    def __init__(self, items):
+        self.items = items
+        self.key_by_name = {}
+        self._all = []
+        self._by_type = {}
+        for item_key, item in items.items():
+            self.key_by_name[item.name.casefold()] = item_key
+            self._all.append((item.value, item_key))
+            self._by_type.setdefault(type(item), []).append((item.value, item_key))
+        self._all.sort()
+        for entries in self._by_type.values():
+            entries.sort()
+
+    def key_for(self, item_name):
+        return self.key_by_name.get(item_name.casefold())
+
+    def add(self, item_key, item):
+        if item_key in self.items:
+            return
+        entry = (item.value, item_key)
+        self.items[item_key] = item
+        self.key_by_name[item.name.casefold()] = item_key
+        insort(self._all, entry)
+        insort(self._by_type.setdefault(type(item), []), entry)
+
+    def discard(self, item_key):
+        item = self.items.pop(item_key, None)
+        if item is None:
+            return
+        entry = (item.value, item_key)
+        self.key_by_name.pop(item.name.casefold(), None)
+        del self._all[bisect_left(self._all, entry)]
+        entries = self._by_type[type(item)]
+        del entries[bisect_left(entries, entry)]
+        if not entries:
+            del self._by_type[type(item)]
+
+    def _range(self, entries, min_value, max_value):
+        lo = 0 if min_value is None else bisect_left(entries, (min_value,))
+        # klucze są tekstowe, więc (max_value, chr(0x10FFFF)) leży za wszystkimi wpisami o tej wartości
+        hi = len(entries) if max_value is None else bisect_right(entries, (max_value, chr(0x10FFFF)))
+        return entries[lo:hi]
+
+    def in_range(self, min_value=None, max_value=None, item_type=None):
+        if item_type is None or item_type is Item:
+            entries = self._range(self._all, min_value, max_value)
+        else:
+            matching = [self._range(entries, min_value, max_value) for cls, entries in self._by_type.items() if issubclass(cls, item_type)]
+            entries = list(merge(*matching))
+        return [item_key for _, item_key in entries]
+ITEM_CATALOG = CatalogIndex(ALL_DEFAULT_ITEMS)
+
+class Merchant:
+
+    def __init__(self, name, stock=None, buy_markup=1.25, sell_ratio=0.5, catalog=ITEM_CATALOG):
+        self.name = name
+        self.catalog = catalog
+        self.buy_markup = buy_markup
+        self.sell_ratio = sell_ratio
+        self.stock = {item_key: quantity for item_key, quantity in (stock or {}).items() if item_key in catalog.items}
+        # indeks wartości tylko przedmiotów na stanie - lista oferty nie przegląda całego katalogu
+        self._stock_index = CatalogIndex({item_key: catalog.items[item_key] for item_key, quantity in self.stock.items() if quantity > 0})
+        self.demand = {}
+
+    def _change_stock(self, item_key, delta):
+        quantity = self.stock[item_key] = self.stock.get(item_key, 0) + delta
+        if quantity > 0:
+            self._stock_index.add(item_key, self.catalog.items[item_key])
+        else:
+            self._stock_index.discard(item_key)
+
+    def _base_value(self, item_key):
+        return self.catalog.items[item_key].value
+
+    def buy_price(self, item_key):
+        return max(1, round(self._base_value(item_key) * self.buy_markup * self.demand.get(item_key, 1.0)))
+
+    def sell_price(self, item_key):
+        return max(0, round(self._base_value(item_key) * self.sell_ratio * self.demand.get(item_key, 1.0)))
+
+    def _adjust_demand(self, item_key, direction):
+        self.demand[item_key] = clamp(self.demand.get(item_key, 1.0) * (1 + direction * PRICE_ELASTICITY), MIN_DEMAND, MAX_DEMAND)
+
+    def list_stock(self, min_value=None, max_value=None, item_type=None):
+        return [(item_key, self.stock[item_key], self.buy_price(item_key)) for item_key in self._stock_index.in_range(min_value, max_value, item_type)]
+
+    def restock(self, quantity=1, min_value=None, max_value=None, item_type=None):
+        restocked = self.catalog.in_range(min_value, max_value, item_type)
+        for item_key in restocked:
+            self._change_stock(item_key, quantity)
+        log_event(f'{self.name} uzupełnia zapasy: {len(restocked)} rodzajów przedmiotów.', level='DEBUG')
+        return restocked
+
+    def buy(self, player, item_key):
+        if self.stock.get(item_key, 0) <= 0:
+            return (False, f'{self.name} nie ma tego przedmiotu na stanie.')
+        item = self.catalog.items[item_key]
+        price = self.buy_price(item_key)
+        if player.gold < price:
+            return (False, f'Nie stać cię na {item.name} (cena: {format_currency(price)}, masz: {format_currency(player.gold)}).')
+        player.gold -= price
+        self._change_stock(item_key, -1)
+        self._adjust_demand(item_key, 1)
+        player.add_item(item)
+        log_event(f"Gracz '{player.name}' kupił {item.name} u {self.name} za {price} złota.", level='INFO', color=COLOR_GREEN)
+        return (True, f'Kupujesz {item.name} za {format_currency(price)}.')
+
+    def sell(self, player, item_name):
+        item_key = self.catalog.key_for(item_name)
+        if item_key is None or not player.inventory.find(item_name):
+            return (False, f'Nie masz przedmiotu {item_name}, który {self.name} mógłby kupić.')
+        price = self.sell_price(item_key)
+        item = player.remove_item(item_name)
+        player.gold += price
+        self._change_stock(item_key, 1)
+        self._adjust_demand(item_key, -1)
+        log_event(f"Gracz '{player.name}' sprzedał {item.name} u {self.name} za {price} złota.", level='INFO', color=COLOR_YELLOW)
+        return (True, f'Sprzedajesz {item.name} za {format_currency(price)}.')
+
+    def describe_stock(self):
+        lines = [f'{self.name} oferuje:']
+        for item_key, quantity, price in self.list_stock():
+            lines.append(f'  {self.catalog.items[item_key].name} x{quantity} - {format_currency(price)}')
+        if len(lines) == 1:
+            lines.append('  (nic)')
+        return '\n'.join(lines)
+
+def create_merchant(merchant_key, definitions=None):
+    definition = (definitions or DEFAULT_MERCHANTS)[merchant_key]
+    return Merchant(definition['name'], stock=definition.get('stock'), buy_markup=definition.get('buy_markup', 1.25), sell_ratio=definition.get('sell_ratio', 0.5))
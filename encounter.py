@@ -0,0 +1,104 @@
+import heapq
+import random
+from enemy_ai import DefaultEnemyPolicy
+from utils import log_event, COLOR_YELLOW
+ACTION_TIME = 100.0
+ALLIES = 'allies'
+ENEMIES = 'enemies'
+
+class _Team:
+
+    def __init__(self, members):
+        self.alive = []
+        self._positions = {}
+        for member in members:
+            if member.is_alive():
+                self._positions[id(member)] = len(self.alive)
+                self.alive.append(member)
+
+    def __len__(self):
+        return len(self.alive)
+
+    def remove(self, member):
+        position = self._positions.pop(id(member), None)
+        if position is None:
+            return
+        last_member = self.alive.pop()
+        if last_member is not member:
+            self.alive[position] = last_member
+            self._positions[id(last_member)] = position
+
+    def random_member(self, rng):
+        return self.alive[rng.randrange(len(self.alive))]
+
+class Encounter:
+
+    def __init__(self, allies, enemies, enemy_policy=None, rng=random, record_log=True):
+        self.teams = {ALLIES: _Team(allies), ENEMIES: _Team(enemies)}
+        self.side_of = {}
+        self.enemy_policy = enemy_policy if enemy_policy else DefaultEnemyPolicy()
+        self.rng = rng
+        self.record_log = record_log
+        self.messages = []
+        self.clock = 0.0
+        self.actions_taken = 0
+        self.defeated = {ALLIES: [], ENEMIES: []}
+        self._queue = []
+        self._sequence = 0
+        for side, members in ((ALLIES, allies), (ENEMIES, enemies)):
+            for member in members:
+                self.side_of[id(member)] = side
+                if member.is_alive():
+                    # losowe przesunięcie inicjatywy w obrębie pierwszej tury
+                    self._schedule(member, self._action_delay(member) * rng.random())
+
+    def _action_delay(self, combatant):
+        return ACTION_TIME / max(1, getattr(combatant, 'speed', 10))
+
+    def _schedule(self, combatant, at_time):
+        self._sequence += 1
+        heapq.heappush(self._queue, (at_time, self._sequence, combatant))
+
+    def is_over(self):
+        return not self.teams[ALLIES] or (not self.teams[ENEMIES])
+
+    def winner(self):
+        if not self.teams[ENEMIES]:
+            return ALLIES
+        if not self.teams[ALLIES]:
+            return ENEMIES
+        return None
+
+    def step(self):
+        while self._queue and (not self.is_over()):
+            at_time, _, combatant = heapq.heappop(self._queue)
+            if not combatant.is_alive():
+                continue
+            self.clock = at_time
+            self._act(combatant)
+            self.actions_taken += 1
+            if combatant.is_alive():
+                self._schedule(combatant, at_time + self._action_delay(combatant))
+            return True
+        return False
+
+    def _act(self, combatant):
+        side = self.side_of[id(combatant)]
+        opposing_side = ENEMIES if side == ALLIES else ALLIES
+        target = self.teams[opposing_side].random_member(self.rng)
+        if side == ENEMIES and self.enemy_policy.choose_action(combatant, target) == 'block':
+            message = combatant.block()
+        else:
+            _, message = combatant.attack_target(target)
+            if not target.is_alive():
+                self.teams[opposing_side].remove(target)
+                self.defeated[opposing_side].append(target)
+        if self.record_log and message:
+            self.messages.append(message)
+
+    def run(self, max_actions=100000):
+        while self.actions_taken < max_actions and self.step():
+            pass
+        winner = self.winner()
+        log_event(f'Starcie grupowe zakończone po {self.actions_taken} akcjach (czas {self.clock:.0f}), zwycięzca: {winner}.', level='INFO', color=COLOR_YELLOW)
+        return winner
@@ -0,0 +1,165 @@
+import time
+from collections import OrderedDict, defaultdict
+from itertools import count
+from utils import get_percentage_chance, log_event
+ENEMY_BLOCK_HP_THRESHOLD = 0.3
+ENEMY_BLOCK_CHANCE = 30
+ENEMY_ACTIONS = ('attack', 'block')
+
+class EnemyPolicy:
+
+    def choose_action(self, enemy, player):
+        return 'attack'
+
+class DefaultEnemyPolicy(EnemyPolicy):
+
+    def choose_action(self, enemy, player):
+        if enemy.hp < enemy.max_hp * ENEMY_BLOCK_HP_THRESHOLD and get_percentage_chance(ENEMY_BLOCK_CHANCE):
+            return 'block'
+        return 'attack'
+
+def bucket_hit_distribution(distribution, defense, buckets):
+    merged = defaultdict(float)
+    for damage, chance in distribution.items():
+        merged[max(0, damage - defense)] += chance
+    outcomes = sorted(merged.items())
+    if len(outcomes) <= buckets:
+        return tuple(outcomes)
+    # grupy o zbliżonym prawdopodobieństwie, reprezentowane przez średnią ważoną
+    grouped = defaultdict(float)
+    cumulative = 0.0
+    group_index = 1
+    group_chance = group_weighted = 0.0
+    for damage, chance in outcomes:
+        cumulative += chance
+        group_chance += chance
+        group_weighted += damage * chance
+        if cumulative >= group_index / buckets - 1e-09:
+            grouped[round(group_weighted / group_chance)] += group_chance
+            group_index += 1
+            group_chance = group_weighted = 0.0
+    if group_chance > 0:
+        grouped[round(group_weighted / group_chance)] += group_chance
+    return tuple(sorted(grouped.items()))
+
+class _CombatModel:
+    __slots__ = ('index', 'player_max_hp', 'enemy_max_hp', 'player_hits_open', 'player_hits_blocked', 'enemy_hits_open', 'enemy_hits_blocked')
+
+    def __init__(self, index, enemy, player, buckets):
+        self.index = index
+        self.player_max_hp = player.max_hp
+        self.enemy_max_hp = enemy.max_hp
+        player_damage = player.get_damage_distribution()
+        enemy_damage = enemy.get_damage_distribution()
+        enemy_defense = enemy.get_total_defense()
+        player_defense = player.get_total_defense()
+        self.player_hits_open = bucket_hit_distribution(player_damage, enemy_defense, buckets)
+        self.player_hits_blocked = bucket_hit_distribution(player_damage, enemy_defense * 2, buckets)
+        self.enemy_hits_open = bucket_hit_distribution(enemy_damage, player_defense, buckets)
+        self.enemy_hits_blocked = bucket_hit_distribution(enemy_damage, player_defense * 2, buckets)
+
+class _SearchBudgetExceeded(Exception):
+    pass
+
+class ExpectimaxEnemyPolicy(EnemyPolicy):
+    WIN_SCORE = 2.0
+    LOSS_SCORE = -2.0
+
+    # budżet 0,6 ms zostawia zapas do 1 ms na budowę modelu i odwinięcie przerwanego przeszukiwania; mała tablica
+    # transpozycji, bo jej czyszczenie i powiększanie liczy się do czasu decyzji
+    def __init__(self, depth=3, buckets=4, time_budget=0.0006, max_table_size=8192, max_models=256):
+        self.depth = depth
+        self.buckets = buckets
+        self.time_budget = time_budget
+        self.max_table_size = max_table_size
+        self.max_models = max_models
+        self.transposition_table = {}
+        # LRU modeli - serwer z wieloma sesjami nie trzyma modelu każdej walki na zawsze;
+        # numery modeli nie są używane ponownie, więc wpisy tablicy transpozycji usuniętych modeli nie kolidują
+        self.models = OrderedDict()
+        self._model_ids = count()
+        self._deadline = 0.0
+        self._nodes = 0
+        self.last_search_depth = 0
+
+    def _get_model(self, enemy, player):
+        weapon = getattr(player, 'equipped_weapon', None)
+        signature = (enemy.max_hp, enemy.get_total_attack(), enemy.get_total_defense(), enemy.attack_dice, player.max_hp, player.get_total_attack(), player.get_total_defense(), weapon.damage_dice if weapon else None)
+        model = self.models.get(signature)
+        if model is not None:
+            self.models.move_to_end(signature)
+        else:
+            model = _CombatModel(next(self._model_ids), enemy, player, self.buckets)
+            self.models[signature] = model
+            if len(self.models) > self.max_models:
+                self.models.popitem(last=False)
+            log_event(f"Enemy AI: nowy model walki '{enemy.name}' vs '{player.name}' (#{model.index}).", level='DEBUG')
+        return model
+
+    def choose_action(self, enemy, player):
+        started = time.perf_counter()
+        self._deadline = started + self.time_budget
+        model = self._get_model(enemy, player)
+        if len(self.transposition_table) > self.max_table_size:
+            self.transposition_table.clear()
+        self._nodes = 0
+        best_action = 'attack'
+        self.last_search_depth = 0
+        player_blocking = bool(getattr(player, 'is_blocking', False))
+        for depth in range(1, self.depth + 1):
+            iteration_start = time.perf_counter()
+            try:
+                attack_value = self._attack_value(model, player.hp, enemy.hp, enemy.is_blocking, player_blocking, depth)
+                block_value = self._block_value(model, player.hp, enemy.hp, depth)
+            except _SearchBudgetExceeded:
+                break
+            best_action = 'block' if block_value > attack_value else 'attack'
+            self.last_search_depth = depth
+            # kolejny poziom jest ok. 'buckets' razy droższy - nie zaczynamy go, jeśli i tak nie zdąży
+            now = time.perf_counter()
+            if now + (now - iteration_start) * self.buckets > self._deadline:
+                break
+        return best_action
+
+    def _evaluate(self, model, player_hp, enemy_hp):
+        return enemy_hp / model.enemy_max_hp - player_hp / model.player_max_hp
+
+    def _enemy_node(self, model, player_hp, enemy_hp, enemy_blocking, player_blocking, depth):
+        key = (model.index, player_hp, enemy_hp, enemy_blocking, player_blocking, depth)
+        cached = self.transposition_table.get(key)
+        if cached is not None:
+            return cached
+        self._nodes += 1
+        value = max(self._attack_value(model, player_hp, enemy_hp, enemy_blocking, player_blocking, depth), self._block_value(model, player_hp, enemy_hp, depth))
+        self.transposition_table[key] = value
+        return value
+
+    def _attack_value(self, model, player_hp, enemy_hp, enemy_blocking, player_blocking, depth):
+        hits = model.enemy_hits_blocked if player_blocking else model.enemy_hits_open
+        value = 0.0
+        for damage, chance in hits:
+            if player_hp - damage <= 0:
+                value += chance * self.WIN_SCORE
+            else:
+                value += chance * self._player_node(model, player_hp - damage, enemy_hp, enemy_blocking, depth)
+        return value
+
+    def _block_value(self, model, player_hp, enemy_hp, depth):
+        return self._player_node(model, player_hp, enemy_hp, True, depth)
+
+    def _player_node(self, model, player_hp, enemy_hp, enemy_blocking, depth):
+        # gracz modelowany jako atakujący; trafienie zawsze zdejmuje blok wroga
+        # termin sprawdzany w każdym węźle losowym - rzadsze sprawdzanie przekraczało budżet o kilkaset µs
+        if time.perf_counter() > self._deadline:
+            raise _SearchBudgetExceeded()
+        hits = model.player_hits_blocked if enemy_blocking else model.player_hits_open
+        value = 0.0
+        for damage, chance in hits:
+            remaining_hp = enemy_hp - damage
+            if remaining_hp <= 0:
+                value += chance * self.LOSS_SCORE
+            elif depth <= 1:
+                value += chance * self._evaluate(model, player_hp, remaining_hp)
+            else:
+                value += chance * self._enemy_node(model, player_hp, remaining_hp, False, False, depth - 1)
+        return value
@@ -0,0 +1,124 @@
+import queue
+import threading
+import time
+from collections import deque
+from utils import log_event, COLOR_RED, COLOR_YELLOW
+from metrics import REGISTRY
+from render_scheduler import RenderScheduler
+ACTION_SECONDS = REGISTRY.histogram('game_action_seconds', 'Czas wykonania komendy gry w wątku roboczym.')
+REJECTED_COMMANDS_TOTAL = REGISTRY.counter('rejected_commands_total', 'Komendy odrzucone przy pełnej kolejce.')
+_STOP = object()
+
+class GameCommandExecutor:
+
+    def __init__(self, root, game, max_pending=16, poll_interval_ms=30):
+        self.root = root
+        self.game = game
+        self.poll_interval_ms = poll_interval_ms
+        self._commands = queue.Queue(maxsize=max_pending)
+        self._ui_events = deque()
+        self.render_scheduler = RenderScheduler(root)
+        self._pending_keys = set()
+        self._lock = threading.Lock()
+        self._worker = threading.Thread(target=self._worker_loop, name='GameWorker', daemon=True)
+        self._poll_job = None
+        self._running = False
+        REGISTRY.gauge('command_queue_depth', 'Komendy czekające w kolejce wątku roboczego.', self._commands.qsize)
+        REGISTRY.gauge('ui_event_queue_depth', 'Zdarzenia czekające na obsługę w wątku GUI.', lambda: len(self._ui_events))
+
+    def start(self):
+        if self._running:
+            return
+        self._running = True
+        self._worker.start()
+        self._poll_job = self.root.after(self.poll_interval_ms, self._poll)
+        log_event('GameCommandExecutor uruchomiony.', level='DEBUG')
+
+    def shutdown(self, timeout=2.0):
+        if not self._running:
+            return
+        self._running = False
+        if self._poll_job:
+            self.root.after_cancel(self._poll_job)
+            self._poll_job = None
+        self.render_scheduler.cancel()
+        try:
+            self._commands.put(_STOP, timeout=timeout)
+        except queue.Full:
+            log_event('Kolejka komend pełna podczas zamykania, wątek roboczy zostanie porzucony.', level='WARNING', color=COLOR_YELLOW)
+        self._worker.join(timeout)
+        log_event('GameCommandExecutor zatrzymany.', level='DEBUG')
+
+    def is_worker_thread(self):
+        return threading.current_thread() is self._worker
+
+    def submit(self, command, *args, on_done=None, coalesce=True):
+        coalesce_key = (command, args) if coalesce and isinstance(command, str) else None
+        with self._lock:
+            if coalesce_key is not None and coalesce_key in self._pending_keys:
+                log_event(f'Pominięto zduplikowaną komendę: {command}', level='DEBUG')
+                return False
+            try:
+                self._commands.put_nowait((command, args, on_done, coalesce_key))
+            except queue.Full:
+                REJECTED_COMMANDS_TOTAL.inc()
+                log_event(f'Kolejka komend pełna, odrzucono: {command}', level='WARNING', color=COLOR_YELLOW)
+                return False
+            if coalesce_key is not None:
+                self._pending_keys.add(coalesce_key)
+        return True
+
+    def dispatch_to_ui(self, event_key, callback, *args):
+        if not self.is_worker_thread():
+            if event_key is not None:
+                self.render_scheduler.request(event_key, callback, *args)
+            else:
+                callback(*args)
+            return
+        self._ui_events.append((event_key, callback, args))
+
+    def _worker_loop(self):
+        while True:
+            item = self._commands.get()
+            if item is _STOP:
+                break
+            command, args, on_done, coalesce_key = item
+            if coalesce_key is not None:
+                with self._lock:
+                    self._pending_keys.discard(coalesce_key)
+            command_start = time.perf_counter()
+            try:
+                handler = getattr(self.game, command) if isinstance(command, str) else command
+                result = handler(*args)
+            except Exception as e:
+                # on_done dostaje wyjątek zamiast wyniku - GUI nie może czekać na odpowiedź, która nie przyjdzie
+                log_event(f'Błąd podczas wykonywania komendy {command}: {e}', level='ERROR', color=COLOR_RED)
+                result = e
+            finally:
+                self._flush_game_view()
+                ACTION_SECONDS.observe(time.perf_counter() - command_start)
+            if on_done:
+                self._ui_events.append((None, on_done, (result,)))
+
+    def _flush_game_view(self):
+        # stan widoku liczony raz na komendę, niezależnie od liczby zmian w jej trakcie
+        try:
+            self.game.flush_gui()
+        except Exception as e:
+            log_event(f'Błąd podczas odświeżania widoku gry: {e}', level='ERROR', color=COLOR_RED)
+
+    def _poll(self):
+        events = []
+        while self._ui_events:
+            events.append(self._ui_events.popleft())
+        for key, callback, args in events:
+            # odświeżenia widoków (zdarzenia z kluczem) idą do planisty - wykona tylko ostatnie, raz na klatkę
+            if key is not None:
+                self.render_scheduler.request(key, callback, *args)
+            else:
+                try:
+                    callback(*args)
+                except Exception as e:
+                    log_event(f'Błąd podczas obsługi zdarzenia GUI: {e}', level='ERROR', color=COLOR_RED)
+        if self._running:
+            self._poll_job = self.root.after(self.poll_interval_ms, self._poll)
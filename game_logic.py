@@ -1,14 +1,55 @@
+import copy
 import random
 import json
 import os
-from utils import calculate_level_xp_threshold, log_event, create_directory_if_not_exists, get_weighted_random_choice, roll_dice_expression, format_currency, safe_nested_get, get_percentage_chance, COLOR_RED, COLOR_GREEN, COLOR_YELLOW, COLOR_CYAN
-from characters import Player, Enemy
-from items import ALL_DEFAULT_ITEMS, Potion, Weapon, Armor, Item
+import time
+from collections import namedtuple
+from contextlib import contextmanager
+from utils import calculate_level_xp_threshold, log_event, create_directory_if_not_exists, get_weighted_random_choice, format_currency, safe_nested_get, get_percentage_chance, COLOR_RED, COLOR_GREEN, COLOR_YELLOW, COLOR_CYAN
+from characters import Player, Enemy, DEFAULT_SPEED
+from items import ALL_DEFAULT_ITEMS, DEFAULT_CRAFTING_MATERIALS, Potion, Weapon, Armor, Item
+from loot import get_loot_table
+from enemy_ai import DefaultEnemyPolicy
+from status_effects import EffectScheduler
+from encounter import Encounter, ALLIES, ENEMIES
+from world import WorldMap
+from economy import ITEM_CATALOG, create_merchant
+from crafting import RECIPE_BOOK
+from leaderboard import Leaderboard, LEADERBOARD_FILE
+from metrics import REGISTRY
+from messages import GameMessage, render_message
+from dice import compile_dice
 SAVE_GAME_DIR = 'savegames'
+SAVE_FORMAT_VERSION = '1.2'
+DEFAULT_ENEMY_DEFINITIONS = {'goblin_scout': {'name': 'Goblin Zwiadowca', 'hp': 30, 'attack': 3, 'defense': 2, 'xp': 25, 'gold': 10, 'attack_dice': '1d4+1', 'speed': 12, 'loot_table': [('small_health_potion', 30), ('rusty_dagger', 15)]}, 'orc_grunt': {'name': 'Orkowy Tępak', 'hp': 60, 'attack': 5, 'defense': 4, 'xp': 50, 'gold': 20, 'attack_dice': '1d8+2', 'speed': 8, 'loot_table': [('iron_sword', 10), ('medium_health_potion', 20), ('wolf_pelt', 40)]}, 'dark_wolf': {'name': 'Mroczny Wilk', 'hp': 45, 'attack': 4, 'defense': 3, 'xp': 35, 'gold': 15, 'attack_dice': '2d4', 'speed': 14, 'loot_table': [('wolf_pelt', 60), ('chipped_gemstone', 10)]}, 'forest_spider': {'name': 'Leśny Pająk', 'hp': 25, 'attack': 3, 'defense': 1, 'xp': 20, 'gold': 5, 'attack_dice': '1d6', 'speed': 11, 'loot_table': [('spider_silk', 50), ('antidote_weak', 10)]}}
+FLEE_CHANCE = 50
+DEFAULT_ENEMY_SPAWN_WEIGHTS = {'goblin_scout': 40, 'orc_grunt': 20, 'dark_wolf': 30, 'forest_spider': 35}
+WORLD_MOVES = [(0, -1), (1, 0), (0, 1), (-1, 0)]
+EVENT_ROLLER = compile_dice('1d100')
+GOLD_FIND_ROLLER = compile_dice('2d10')
+EXPLORATION_MAX_GEAR_VALUE = 49
+BASE_EXPLORATION_FINDS = {item_key: 1 for item_key, item_obj in ALL_DEFAULT_ITEMS.items() if not isinstance(item_obj, (Weapon, Armor)) and item_key not in DEFAULT_CRAFTING_MATERIALS}
+BASE_EXPLORATION_FINDS.update({item_key: 1 for item_key in ITEM_CATALOG.in_range(max_value=EXPLORATION_MAX_GEAR_VALUE, item_type=(Weapon, Armor))})
+BASE_EXPLORATION_FINDS.update({'small_health_potion': 10, 'iron_ore': 5, 'stale_bread': 8})
+EXPLORES_TOTAL = REGISTRY.counter('explores_total', 'Liczba wykonanych eksploracji.')
+FIGHTS_STARTED_TOTAL = REGISTRY.counter('fights_started_total', 'Liczba rozpoczętych walk.')
+FIGHTS_WON_TOTAL = REGISTRY.counter('fights_won_total', 'Liczba wygranych walk.')
+FIGHTS_LOST_TOTAL = REGISTRY.counter('fights_lost_total', 'Liczba przegranych walk.')
+SAVES_TOTAL = REGISTRY.counter('saves_total', 'Liczba udanych zapisów gry.')
+SAVE_FAILURES_TOTAL = REGISTRY.counter('save_failures_total', 'Liczba nieudanych zapisów gry.')
+LOADS_TOTAL = REGISTRY.counter('loads_total', 'Liczba wczytanych zapisów gry.')
+SAVE_SECONDS = REGISTRY.histogram('save_seconds', 'Czas zapisu gry na dysk.')
+GameSnapshot = namedtuple('GameSnapshot', ['player', 'player_state', 'enemy', 'enemy_state', 'is_in_combat', 'position', 'location_description'])
+# niezmienny stan dla GUI, liczony w wątku roboczym - wątek Tk nie czyta obiektów gry
+GameViewState = namedtuple('GameViewState', ['has_player', 'alive', 'in_combat', 'potions'])
+EMPTY_VIEW_STATE = GameViewState(False, False, False, {})
+
+def create_enemy_from_definition(enemy_key, enemy_def):
+    return Enemy(name=enemy_def['name'], hp=enemy_def['hp'], attack=enemy_def['attack'], defense=enemy_def['defense'], xp_reward=enemy_def['xp'], gold_reward=enemy_def['gold'], loot_table=get_loot_table(enemy_key, enemy_def.get('loot_table', [])), attack_dice=enemy_def.get('attack_dice', '1d4'), speed=enemy_def.get('speed', DEFAULT_SPEED))
 
 class Game:
 
-    def __init__(self, gui_callback_log, gui_callback_update_stats, gui_callback_combat_buttons):
+    def __init__(self, gui_callback_log, gui_callback_update_stats, gui_callback_combat_buttons, enemy_policy=None, deferred_rendering=False, leaderboard=None):
         if not create_directory_if_not_exists(SAVE_GAME_DIR):
             log_event(f'Nie udało się utworzyć katalogu zapisu: {SAVE_GAME_DIR}. Zapis może nie działać.', level='ERROR', color=COLOR_RED)
         self.player = None
@@ -17,132 +58,342 @@ class Game:
         self.gui_update_stats = gui_callback_update_stats
         self.gui_update_combat_buttons = gui_callback_combat_buttons
         self.is_in_combat = False
-        self.available_enemies_definitions = {'goblin_scout': {'name': 'Goblin Zwiadowca', 'hp': 30, 'attack': 3, 'defense': 2, 'xp': 25, 'gold': 10, 'attack_dice': '1d4+1', 'loot_table': [('small_health_potion', 30), ('rusty_dagger', 15)]}, 'orc_grunt': {'name': 'Orkowy Tępak', 'hp': 60, 'attack': 5, 'defense': 4, 'xp': 50, 'gold': 20, 'attack_dice': '1d8+2', 'loot_table': [('iron_sword', 10), ('medium_health_potion', 20), ('wolf_pelt', 40)]}, 'dark_wolf': {'name': 'Mroczny Wilk', 'hp': 45, 'attack': 4, 'defense': 3, 'xp': 35, 'gold': 15, 'attack_dice': '2d4', 'loot_table': [('wolf_pelt', 60), ('chipped_gemstone', 10)]}, 'forest_spider': {'name': 'Leśny Pająk', 'hp': 25, 'attack': 3, 'defense': 1, 'xp': 20, 'gold': 5, 'attack_dice': '1d6', 'loot_table': [('spider_silk', 50), ('antidote_weak', 10)]}}
-        self.enemy_spawn_weights = {'goblin_scout': 40, 'orc_grunt': 20, 'dark_wolf': 30, 'forest_spider': 35}
+        self._gui_batch_depth = 0
+        self._gui_batched_messages = []
+        self._gui_stale = False
+        self._gui_pending_combat_buttons = None
+        # przy odroczonym renderowaniu komendy tylko oznaczają widok jako nieaktualny, a flush_gui wysyła go raz
+        self.deferred_rendering = deferred_rendering
+        # własne kopie - zmiany definicji lub wag w jednej grze nie przeciekają do modułowych domyślnych
+        self.available_enemies_definitions = copy.deepcopy(DEFAULT_ENEMY_DEFINITIONS)
+        self.item_catalog = ALL_DEFAULT_ITEMS
+        self.enemy_spawn_weights = dict(DEFAULT_ENEMY_SPAWN_WEIGHTS)
+        self.enemy_policy = enemy_policy if enemy_policy else DefaultEnemyPolicy()
+        self.effect_scheduler = EffectScheduler()
+        self.world = WorldMap()
+        self.position = (0, 0)
+        self.merchant = create_merchant('village_trader')
+        self.recipe_book = RECIPE_BOOK
+        # wiele gier w jednym procesie (router sesji) dzieli jeden ranking zamiast wczytywać własną kopię
+        self.leaderboard = leaderboard if leaderboard is not None else Leaderboard.load(os.path.join(SAVE_GAME_DIR, LEADERBOARD_FILE))
         self.current_location_description = 'Stoisz na rozstaju dróg. Co robisz?'
         log_event('GameService zainicjalizowany.', level='DEBUG')
 
     def _get_save_path(self, username):
         return os.path.join(SAVE_GAME_DIR, f'{username}_save.json')
 
+    def _get_world_dir(self, username):
+        return os.path.join(SAVE_GAME_DIR, f'{username}_world')
+
     def _log_to_gui(self, message):
+        if self._gui_batch_depth:
+            self._gui_batched_messages.append(message)
+            return
         if self.gui_log_message:
             self.gui_log_message(message)
 
+    def _update_combat_buttons(self, is_active):
+        if self._gui_batch_depth or self.deferred_rendering:
+            self._gui_pending_combat_buttons = is_active
+            return
+        if self.gui_update_combat_buttons:
+            self.gui_update_combat_buttons(is_active)
+
+    @contextmanager
+    def batched_gui_updates(self, forward_messages=True):
+        self._gui_batch_depth += 1
+        messages_start = len(self._gui_batched_messages)
+        try:
+            yield self._gui_batched_messages
+        finally:
+            self._gui_batch_depth -= 1
+            if not self._gui_batch_depth:
+                self._flush_gui_batch(forward_messages)
+            elif not forward_messages:
+                del self._gui_batched_messages[messages_start:]
+
+    def _flush_gui_batch(self, forward_messages):
+        messages = self._gui_batched_messages
+        self._gui_batched_messages = []
+        if forward_messages and messages and self.gui_log_message:
+            self.gui_log_message('\n'.join(map(render_message, messages)))
+        if self._gui_pending_combat_buttons is not None:
+            pending_combat_buttons = self._gui_pending_combat_buttons
+            self._gui_pending_combat_buttons = None
+            self._update_combat_buttons(pending_combat_buttons)
+        if self._gui_stale:
+            self._gui_stale = False
+            self.update_gui()
+
+    def flush_gui(self):
+        if self._gui_batch_depth:
+            return
+        if self._gui_pending_combat_buttons is not None:
+            pending_combat_buttons = self._gui_pending_combat_buttons
+            self._gui_pending_combat_buttons = None
+            if self.gui_update_combat_buttons:
+                self.gui_update_combat_buttons(pending_combat_buttons)
+        if self._gui_stale:
+            self._gui_stale = False
+            self._render_gui()
+
+    def snapshot(self):
+        return GameSnapshot(self.player, self.player.snapshot() if self.player else None, self.current_enemy, self.current_enemy.snapshot() if self.current_enemy else None, self.is_in_combat, self.position, self.current_location_description)
+
+    def restore(self, snapshot, refresh_gui=False):
+        # obiekty gracza i wroga są te same, przywracamy tylko ich stan
+        self.player = snapshot.player
+        if self.player:
+            self.player.restore(snapshot.player_state)
+        self.current_enemy = snapshot.enemy
+        if self.current_enemy:
+            self.current_enemy.restore(snapshot.enemy_state)
+        self.is_in_combat = snapshot.is_in_combat
+        self.position = snapshot.position
+        self.current_location_description = snapshot.location_description
+        if refresh_gui:
+            self._update_combat_buttons(self.is_in_combat)
+            self.update_gui()
+
+    @contextmanager
+    def simulate(self):
+        snapshot = self.snapshot()
+        gui_state = (self._gui_stale, self._gui_pending_combat_buttons)
+        with self.batched_gui_updates(forward_messages=False):
+            try:
+                yield snapshot
+            finally:
+                self.restore(snapshot)
+                self._gui_stale, self._gui_pending_combat_buttons = gui_state
+
+    def _advance_turn(self):
+        for message in self.effect_scheduler.tick():
+            self._log_to_gui(message)
+
+    def _start_session(self, player):
+        # nowy harmonogram: efekty poprzedniej postaci (i jej wroga) nie mogą tykać w nowej grze
+        self.effect_scheduler = EffectScheduler()
+        self.player = player
+        if player is not None:
+            player.status_effects.bind(self.effect_scheduler)
+        self.current_enemy = None
+        self.is_in_combat = False
+
+    def reset_session(self):
+        self._start_session(None)
+        self.world = WorldMap()
+        self.position = (0, 0)
+        self.update_gui()
+
     def create_new_player(self, player_name, player_class):
-        self.player = Player(player_name, player_class)
-        self._log_to_gui(f'Witaj, {self.player.name}, {self.player.chosen_class}!')
+        self._start_session(Player(player_name, player_class))
+        self.world = WorldMap()
+        self.position = (0, 0)
+        self.world.mark_explored(0, 0)
+        self._log_to_gui(GameMessage('game.welcome', name=self.player.name, character_class=self.player.chosen_class))
         log_event(f'Utworzono nowego gracza: {player_name}, klasa: {player_class}', color=COLOR_GREEN)
         if player_class == 'Wojownik':
-            self.player.add_item(ALL_DEFAULT_ITEMS['small_health_potion'])
+            self.player.add_item(self.item_catalog['small_health_potion'])
         elif player_class == 'Mag':
-            self.player.add_item(ALL_DEFAULT_ITEMS['medium_health_potion'])
+            self.player.add_item(self.item_catalog['medium_health_potion'])
         self.update_gui()
         return True
 
+    def export_state(self, username=None):
+        if username:
+            # odkryte fragmenty świata trafiają na dysk, stan gry wskazuje tylko ziarno i pozycję
+            self.world.flush(self._get_world_dir(username))
+        return {'player': self.player.to_dict(), 'current_location_description': self.current_location_description, 'world': {'seed': self.world.seed, 'x': self.position[0], 'y': self.position[1]}, 'version': SAVE_FORMAT_VERSION}
+
+    def import_state(self, game_state, username):
+        self._start_session(Player.from_dict(safe_nested_get(game_state, 'player', {}), self.item_catalog))
+        self.current_location_description = safe_nested_get(game_state, 'current_location_description', 'Nieznane miejsce.')
+        # zapisy sprzed wersji 1.2 nie mają świata - gracz zaczyna w nowym
+        self.world = WorldMap(safe_nested_get(game_state, 'world.seed'), save_dir=self._get_world_dir(username))
+        self.position = (safe_nested_get(game_state, 'world.x', 0), safe_nested_get(game_state, 'world.y', 0))
+
     def save_game(self, username):
         if not self.player:
-            self._log_to_gui('Nie ma aktywnej gry do zapisania.')
+            self._log_to_gui(GameMessage('game.nothing_to_save'))
             log_event('Próba zapisu gry bez aktywnego gracza.', level='WARNING')
             return False
         save_path = self._get_save_path(username)
+        save_start = time.perf_counter()
         try:
-            player_data = self.player.to_dict()
-            game_state = {'player': player_data, 'current_location_description': self.current_location_description, 'version': '1.1'}
+            game_state = self.export_state(username)
             with open(save_path, 'w') as f:
                 json.dump(game_state, f, indent=4)
-            self._log_to_gui(f'Gra zapisana dla {username}.')
+            self.leaderboard.update(username, self.player)
+            SAVE_SECONDS.observe(time.perf_counter() - save_start)
+            SAVES_TOTAL.inc()
+            self._log_to_gui(GameMessage('game.saved', username=username))
             log_event(f'Gra zapisana do pliku: {save_path}', color=COLOR_GREEN)
             return True
         except Exception as e:
-            self._log_to_gui(f'Błąd podczas zapisywania gry: {e}')
+            SAVE_FAILURES_TOTAL.inc()
+            self._log_to_gui(GameMessage('game.save_failed', error=e))
             log_event(f"Krytyczny błąd podczas zapisywania gry dla '{username}': {e}", level='ERROR', color=COLOR_RED)
             return False
 
     def load_game(self, username):
         save_path = self._get_save_path(username)
         if not os.path.exists(save_path):
-            self._log_to_gui(f'Nie znaleziono zapisu dla {username}.')
+            self._log_to_gui(GameMessage('game.no_save', username=username))
             log_event(f"Nie znaleziono pliku zapisu dla '{username}': {save_path}", level='INFO')
             return False
         try:
             with open(save_path, 'r') as f:
                 game_state = json.load(f)
-            self.player = Player.from_dict(safe_nested_get(game_state, 'player', {}), ALL_DEFAULT_ITEMS)
-            self.current_location_description = safe_nested_get(game_state, 'current_location_description', 'Nieznane miejsce.')
-            self._log_to_gui(f'Gra wczytana dla {self.player.name}.')
+            self.import_state(game_state, username)
+            LOADS_TOTAL.inc()
+            self._log_to_gui(GameMessage('game.loaded', name=self.player.name))
             log_event(f"Gra wczytana z pliku: {save_path} dla gracza '{self.player.name}'", color=COLOR_GREEN)
             self.update_gui()
-            self.is_in_combat = False
-            self.current_enemy = None
-            self.gui_update_combat_buttons(False)
+            self._update_combat_buttons(False)
             return True
         except Exception as e:
-            self._log_to_gui(f'Błąd podczas wczytywania gry: {e}')
+            self._log_to_gui(GameMessage('game.load_failed', error=e))
             log_event(f"Krytyczny błąd podczas wczytywania gry dla '{username}': {e}", level='ERROR', color=COLOR_RED)
             return False
 
     def explore(self):
         if self.is_in_combat:
-            self._log_to_gui('Jesteś w trakcie walki!')
+            self._log_to_gui(GameMessage('explore.in_combat'))
             return
         if not self.player or not self.player.is_alive():
-            self._log_to_gui('Nie możesz eksplorować, gdy jesteś pokonany.')
+            self._log_to_gui(GameMessage('explore.defeated'))
             return
-        self._log_to_gui('Rozglądasz się...')
-        log_event(f"Gracz '{self.player.name}' eksploruje.", level='INFO')
-        event_roll = roll_dice_expression('1d100')
+        EXPLORES_TOTAL.inc()
+        self._advance_turn()
+        biome = self.move_in_world()
+        self._log_to_gui(GameMessage('explore.start'))
+        log_event("Gracz '%s' eksploruje (%s, %s).", self.player.name, biome['name'], self.position, level='DEBUG')
+        event_roll = EVENT_ROLLER.roll()
         if event_roll <= 15:
-            self.find_item_event()
+            self.find_item_event(biome['item_weights'])
         elif event_roll <= 75:
-            self.start_encounter()
+            self.start_encounter(self.biome_spawn_weights(biome))
         elif event_roll <= 90:
             self.find_gold_event()
         else:
-            self._log_to_gui('Nic ciekawego się nie wydarzyło.')
+            self._log_to_gui(GameMessage('explore.nothing'))
             log_event('Eksploracja: nic ciekawego.', level='DEBUG')
         self.update_gui()
 
-    def find_item_event(self):
-        possible_finds = {item_key: 1 for item_key, item_obj in ALL_DEFAULT_ITEMS.items() if not isinstance(item_obj, (Weapon, Armor)) or item_obj.value < 50}
-        possible_finds['small_health_potion'] = 10
-        possible_finds['iron_ore'] = 5
-        possible_finds['stale_bread'] = 8
+    def move_in_world(self, direction=None):
+        dx, dy = direction if direction else random.choice(WORLD_MOVES)
+        x, y = (self.position[0] + dx, self.position[1] + dy)
+        self.position = (x, y)
+        biome = self.world.biome_at(x, y)
+        if not self.world.is_explored(x, y):
+            self.world.mark_explored(x, y)
+            self._log_to_gui(GameMessage('explore.new_area', biome=biome['name']))
+        self.current_location_description = f"{biome['name']} ({x}, {y}). {biome['description']}"
+        return biome
+
+    def find_item_event(self, item_weights=None):
+        possible_finds = dict(BASE_EXPLORATION_FINDS, **item_weights) if item_weights else BASE_EXPLORATION_FINDS
         found_item_key = get_weighted_random_choice(possible_finds)
-        if found_item_key and found_item_key in ALL_DEFAULT_ITEMS:
-            found_item = ALL_DEFAULT_ITEMS[found_item_key]
-            self._log_to_gui(f'Znalazłeś {found_item.name}!')
-            log_event(f'Gracz znalazł przedmiot: {found_item.name}', level='INFO', color=COLOR_GREEN)
+        if found_item_key and found_item_key in self.item_catalog:
+            found_item = self.item_catalog[found_item_key]
+            self._log_to_gui(GameMessage('explore.item_found', item=found_item.name))
+            log_event('Gracz znalazł przedmiot: %s', found_item.name, level='DEBUG', color=COLOR_GREEN)
             self.player.add_item(found_item)
         else:
-            self._log_to_gui('Coś błysnęło w trawie, ale zniknęło, nim zdążyłeś zareagować.')
+            self._log_to_gui(GameMessage('explore.item_lost'))
             log_event('Nie udało się wylosować przedmiotu podczas eksploracji.', level='DEBUG')
 
     def find_gold_event(self):
-        amount = roll_dice_expression('2d10')
+        amount = GOLD_FIND_ROLLER.roll()
         self.player.gold += amount
-        self._log_to_gui(f'Znalazłeś sakiewkę z {format_currency(amount)}!')
-        log_event(f'Gracz znalazł {amount} złota.', level='INFO', color=COLOR_GREEN)
+        self._log_to_gui(GameMessage('explore.gold_found', gold=amount))
+        log_event('Gracz znalazł %s złota.', amount, level='DEBUG', color=COLOR_GREEN)
 
-    def start_encounter(self):
+    def biome_spawn_weights(self, biome):
+        # tabela biomu skaluje wagi tej gry względem domyślnych (przy domyślnych wagach daje dokładnie tabelę biomu);
+        # wrogowie spoza domyślnych nie mają preferencji biomu, a klucze bez definicji są pomijane
+        biome_weights = biome.get('spawn_weights', {})
+        weights = {}
+        for enemy_key, weight in self.enemy_spawn_weights.items():
+            if enemy_key not in self.available_enemies_definitions:
+                continue
+            default_weight = DEFAULT_ENEMY_SPAWN_WEIGHTS.get(enemy_key)
+            if default_weight:
+                weight = weight * biome_weights.get(enemy_key, 0) / default_weight
+            if weight > 0:
+                weights[enemy_key] = weight
+        return weights or None
+
+    def start_encounter(self, spawn_weights=None):
         if self.is_in_combat:
             return
         if not self.player or not self.player.is_alive():
             return
-        chosen_enemy_key = get_weighted_random_choice(self.enemy_spawn_weights)
+        chosen_enemy_key = get_weighted_random_choice(spawn_weights or self.enemy_spawn_weights)
         if not chosen_enemy_key or chosen_enemy_key not in self.available_enemies_definitions:
             log_event(f"Błąd: Nie udało się wylosować wroga lub definicja '{chosen_enemy_key}' nie istnieje.", level='ERROR', color=COLOR_RED)
-            self._log_to_gui('Coś zaszurało w krzakach, ale uciekło.')
+            self._log_to_gui(GameMessage('encounter.escaped'))
             return
-        enemy_def = self.available_enemies_definitions[chosen_enemy_key]
-        self.current_enemy = Enemy(name=enemy_def['name'], hp=enemy_def['hp'], attack=enemy_def['attack'], defense=enemy_def['defense'], xp_reward=enemy_def['xp'], gold_reward=enemy_def['gold'], loot_table=enemy_def.get('loot_table', []), attack_dice=enemy_def.get('attack_dice', '1d4'))
+        self.current_enemy = create_enemy_from_definition(chosen_enemy_key, self.available_enemies_definitions[chosen_enemy_key])
+        self.current_enemy.status_effects.bind(self.effect_scheduler)
+        FIGHTS_STARTED_TOTAL.inc()
         self.is_in_combat = True
-        self._log_to_gui(f'Spotykasz {self.current_enemy.name}!')
-        self._log_to_gui(str(self.current_enemy))
-        log_event(f"Rozpoczęto walkę: Gracz '{self.player.name}' vs Wróg '{self.current_enemy.name}'", level='INFO', color=COLOR_YELLOW)
-        self.gui_update_combat_buttons(True)
+        enemy = self.current_enemy
+        self._log_to_gui(GameMessage('encounter.start', enemy=enemy.name))
+        self._log_to_gui(GameMessage('character.status', name=enemy.name, hp=enemy.hp, max_hp=enemy.max_hp, attack=enemy.attack_power, defense=enemy.defense_power))
+        log_event("Rozpoczęto walkę: Gracz '%s' vs Wróg '%s'", self.player.name, enemy.name, level='DEBUG', color=COLOR_YELLOW)
+        self._update_combat_buttons(True)
         self.update_gui()
 
+    def start_group_encounter(self, enemy_count=3, companions=None, max_actions=100000):
+        if self.is_in_combat:
+            self._log_to_gui(GameMessage('explore.in_combat'))
+            return None
+        if not self.player or not self.player.is_alive():
+            return None
+        enemies = []
+        for _ in range(enemy_count):
+            enemy_key = get_weighted_random_choice(self.enemy_spawn_weights)
+            enemy = create_enemy_from_definition(enemy_key, self.available_enemies_definitions[enemy_key])
+            enemy.status_effects.bind(self.effect_scheduler)
+            enemies.append(enemy)
+        allies = [self.player] + list(companions or [])
+        log_event(f"Rozpoczęto starcie grupowe: {len(allies)} sojuszników vs {len(enemies)} wrogów.", level='INFO', color=COLOR_YELLOW)
+        FIGHTS_STARTED_TOTAL.inc()
+        with self.batched_gui_updates():
+            self._log_to_gui(GameMessage('encounter.group_start', count=len(enemies)))
+            encounter = Encounter(allies, enemies, enemy_policy=self.enemy_policy)
+            winner = encounter.run(max_actions)
+            for message in encounter.messages:
+                self._log_to_gui(message)
+            if not self.player.is_alive():
+                self._log_to_gui(GameMessage('combat.group_defeat', player=self.player.name))
+                FIGHTS_LOST_TOTAL.inc()
+                log_event(f"Gracz '{self.player.name}' zginął w starciu grupowym. GAME OVER.", level='CRITICAL', color=COLOR_RED)
+                self.player.status_effects.clear()
+                self.player = None
+            elif winner == ALLIES:
+                FIGHTS_WON_TOTAL.inc()
+                self._grant_group_rewards(encounter.defeated[ENEMIES])
+            else:
+                self._log_to_gui(GameMessage('combat.group_draw'))
+            for enemy in enemies:
+                enemy.status_effects.clear()
+            self.update_gui()
+        return winner
+
+    def _grant_group_rewards(self, defeated_enemies):
+        total_xp = sum((enemy.xp_reward for enemy in defeated_enemies))
+        total_gold = sum((enemy.gold_reward for enemy in defeated_enemies))
+        self._log_to_gui(GameMessage('combat.group_victory', count=len(defeated_enemies)))
+        self._log_to_gui(self.player.add_xp(total_xp))
+        self.player.gold += total_gold
+        self._log_to_gui(GameMessage('combat.gold_reward', gold=total_gold))
+        for enemy in defeated_enemies:
+            for item in enemy.drop_loot():
+                self._log_to_gui(GameMessage('combat.loot_item', item=item.name))
+                self.player.add_item(item)
+
     def player_action_combat(self, action_type, param=None):
         if not self.is_in_combat or not self.player or (not self.current_enemy) or (not self.player.is_alive()):
             log_event('Próba akcji gracza poza walką lub gdy gracz/wróg nie istnieje.', level='WARNING')
@@ -161,10 +412,10 @@ class Game:
                     self.update_gui()
                     return
             else:
-                action_message = 'Musisz wybrać miksturę do użycia.'
+                action_message = GameMessage('potion.not_chosen')
         else:
             log_event(f'Nieznana akcja gracza w walce: {action_type}', level='ERROR')
-            self._log_to_gui('Nieznana akcja.')
+            self._log_to_gui(GameMessage('combat.unknown_action'))
             return
         if action_message:
             self._log_to_gui(action_message)
@@ -173,12 +424,14 @@ class Game:
             self.end_combat(victory=True)
         elif self.player.is_alive():
             self.enemy_turn()
+            if self.is_in_combat:
+                self._advance_turn()
 
     def enemy_turn(self):
         if not self.is_in_combat or not self.current_enemy or (not self.current_enemy.is_alive()) or (not self.player.is_alive()):
             return
         action_message = ''
-        if self.current_enemy.hp < self.current_enemy.max_hp * 0.3 and get_percentage_chance(30):
+        if self.enemy_policy.choose_action(self.current_enemy, self.player) == 'block':
             action_message = self.current_enemy.block()
             log_event(f"Wróg '{self.current_enemy.name}' blokuje.", level='DEBUG')
         else:
@@ -193,41 +446,48 @@ class Game:
     def flee_combat(self):
         if not self.is_in_combat:
             return
-        if get_percentage_chance(50):
-            self._log_to_gui('Udało ci się uciec!')
-            log_event(f"Gracz '{self.player.name}' uciekł z walki.", level='INFO', color=COLOR_YELLOW)
+        if get_percentage_chance(FLEE_CHANCE):
+            self._log_to_gui(GameMessage('combat.flee_success'))
+            log_event("Gracz '%s' uciekł z walki.", self.player.name, level='DEBUG', color=COLOR_YELLOW)
             self.is_in_combat = False
             self.current_enemy = None
-            self.gui_update_combat_buttons(False)
+            self._update_combat_buttons(False)
         else:
-            self._log_to_gui('Nie udało się uciec! Wróg korzysta z okazji.')
-            log_event(f"Graczowi '{self.player.name}' nie udało się uciec.", level='INFO')
+            self._log_to_gui(GameMessage('combat.flee_failed'))
+            log_event("Graczowi '%s' nie udało się uciec.", self.player.name, level='DEBUG')
             self.enemy_turn()
+            if self.is_in_combat:
+                self._advance_turn()
         self.update_gui()
 
     def end_combat(self, victory):
         self.is_in_combat = False
         enemy_name = self.current_enemy.name if self.current_enemy else 'Nieznany Wróg'
         if victory and self.player:
-            self._log_to_gui(f'Pokonałeś {enemy_name}!')
+            FIGHTS_WON_TOTAL.inc()
+            self._log_to_gui(GameMessage('combat.victory', enemy=enemy_name))
             xp_message = self.player.add_xp(self.current_enemy.xp_reward)
             self._log_to_gui(xp_message)
             gold_reward = self.current_enemy.gold_reward
             self.player.gold += gold_reward
-            self._log_to_gui(f'Zdobywasz {format_currency(gold_reward)}.')
-            log_event(f"Gracz '{self.player.name}' pokonał '{enemy_name}'. Zdobyto {self.current_enemy.xp_reward} XP i {gold_reward} złota.", color=COLOR_GREEN)
+            self._log_to_gui(GameMessage('combat.gold_reward', gold=gold_reward))
+            log_event("Gracz '%s' pokonał '%s'. Zdobyto %s XP i %s złota.", self.player.name, enemy_name, self.current_enemy.xp_reward, gold_reward, level='DEBUG', color=COLOR_GREEN)
             dropped_loot = self.current_enemy.drop_loot()
             if dropped_loot:
-                self._log_to_gui('Znaleziono łup:')
+                self._log_to_gui(GameMessage('combat.loot_header'))
                 for item in dropped_loot:
-                    self._log_to_gui(f'- {item.name}')
+                    self._log_to_gui(GameMessage('combat.loot_item', item=item.name))
                     self.player.add_item(item)
         elif not victory and self.player:
-            self._log_to_gui(f'{self.player.name} został pokonany przez {enemy_name}. Koniec gry.')
+            FIGHTS_LOST_TOTAL.inc()
+            self._log_to_gui(GameMessage('combat.defeat', player=self.player.name, enemy=enemy_name))
             log_event(f"Gracz '{self.player.name}' został pokonany. GAME OVER.", level='CRITICAL', color=COLOR_RED)
+            self.player.status_effects.clear()
             self.player = None
+        if self.current_enemy:
+            self.current_enemy.status_effects.clear()
         self.current_enemy = None
-        self.gui_update_combat_buttons(False)
+        self._update_combat_buttons(False)
         self.update_gui()
 
     def get_player_status(self):
@@ -242,6 +502,8 @@ class Game:
             status += f'Broń: {self.player.equipped_weapon.name} (Obrażenia: {weapon_dmg_info})\n'
         if self.player.equipped_armor:
             status += f'Zbroja: {self.player.equipped_armor.name} (+{self.player.equipped_armor.defense} Obr.)\n'
+        if self.player.status_effects:
+            status += f'Efekty: {self.player.status_effects.describe()}\n'
         return status
 
     def get_enemy_status(self):
@@ -257,9 +519,73 @@ class Game:
             listing += f'{i + 1}. {str(item)}\n'
         return listing
 
+    def show_leaderboard(self, metric='level', username=None):
+        self._log_to_gui(self.leaderboard.format_top(metric))
+        player_rank = self.leaderboard.rank(username, metric) if username else None
+        if player_rank:
+            self._log_to_gui(GameMessage('leaderboard.rank', rank=player_rank, total=len(self.leaderboard)))
+
+    def _can_trade(self):
+        if not self.player or not self.player.is_alive():
+            self._log_to_gui(GameMessage('trade.unavailable'))
+            return False
+        if self.is_in_combat:
+            self._log_to_gui(GameMessage('trade.in_combat'))
+            return False
+        return True
+
+    def show_merchant_stock(self):
+        if self._can_trade():
+            self._log_to_gui(self.merchant.describe_stock())
+
+    def buy_item(self, item_name):
+        if not self._can_trade():
+            return False
+        item_key = ITEM_CATALOG.key_for(item_name)
+        if item_key is None:
+            self._log_to_gui(GameMessage('trade.unknown_item', item=item_name))
+            return False
+        success, message = self.merchant.buy(self.player, item_key)
+        self._log_to_gui(message)
+        self.update_gui()
+        return success
+
+    def sell_item(self, item_name):
+        if not self._can_trade():
+            return False
+        success, message = self.merchant.sell(self.player, item_name)
+        self._log_to_gui(message)
+        self.update_gui()
+        return success
+
+    def _can_craft(self):
+        if not self.player or not self.player.is_alive():
+            self._log_to_gui(GameMessage('craft.unavailable'))
+            return False
+        if self.is_in_combat:
+            self._log_to_gui(GameMessage('craft.in_combat'))
+            return False
+        return True
+
+    def show_recipes(self):
+        if self._can_craft():
+            self._log_to_gui(self.recipe_book.describe_recipes(self.player.inventory))
+
+    def craft_item(self, item_name, quantity=1):
+        if not self._can_craft():
+            return False
+        item_key = ITEM_CATALOG.key_for(item_name)
+        if item_key is None or self.recipe_book.recipe_for(item_key) is None:
+            self._log_to_gui(GameMessage('craft.unknown_recipe', item=item_name))
+            return False
+        success, message = self.recipe_book.craft(self.player, item_key, quantity)
+        self._log_to_gui(message)
+        self.update_gui()
+        return success
+
     def use_inventory_item(self, item_index_str):
         if not self.player or not self.player.is_alive():
-            self._log_to_gui('Nie możesz teraz używać przedmiotów.')
+            self._log_to_gui(GameMessage('inventory.unavailable'))
             return
         try:
             item_index = int(item_index_str) - 1
@@ -271,26 +597,38 @@ class Game:
                     log_message_for_gui = message
                     if success:
                         self.player.inventory.pop(item_index)
-                        log_event(f'Gracz użył {item_to_use.name} poza walką. {message}', level='INFO')
+                        log_event('Gracz użył %s poza walką. %s', item_to_use.name, message, level='DEBUG')
                     else:
-                        log_event(f'Nie udało się użyć {item_to_use.name} poza walką. {message}', level='WARNING')
+                        log_event('Nie udało się użyć %s poza walką. %s', item_to_use.name, message, level='DEBUG')
                 elif isinstance(item_to_use, (Weapon, Armor)):
                     log_message_for_gui = self.player.equip_item(item_to_use.name)
                 else:
-                    log_message_for_gui = f'{item_to_use.name} nie jest miksturą, bronią ani zbroją. Nie można go tak użyć.'
+                    log_message_for_gui = GameMessage('inventory.not_usable', item=item_to_use.name)
                 self._log_to_gui(log_message_for_gui)
                 self.update_gui()
             else:
-                self._log_to_gui('Nieprawidłowy numer przedmiotu.')
+                self._log_to_gui(GameMessage('inventory.bad_number'))
         except ValueError:
-            self._log_to_gui('Podaj numer przedmiotu.')
+            self._log_to_gui(GameMessage('inventory.not_a_number'))
         except IndexError:
-            self._log_to_gui('Przedmiot o podanym numerze nie istnieje w ekwipunku.')
+            self._log_to_gui(GameMessage('inventory.missing_number'))
 
     def update_gui(self):
+        if self._gui_batch_depth or self.deferred_rendering:
+            self._gui_stale = True
+            return
+        self._render_gui()
+
+    def view_state(self):
+        if not self.player:
+            return EMPTY_VIEW_STATE
+        return GameViewState(True, self.player.is_alive(), self.is_in_combat, dict(self.player.inventory.names_of_type(Potion)))
+
+    def _render_gui(self):
+        view_state = self.view_state()
         if self.player and self.player.is_alive():
-            self.gui_update_stats(self.get_player_status(), self.get_enemy_status(), self.get_inventory_listing())
+            self.gui_update_stats(self.get_player_status(), self.get_enemy_status(), self.get_inventory_listing(), view_state)
         elif self.player and (not self.player.is_alive()):
-            self.gui_update_stats('GAME OVER', '', 'Twój ekwipunek przepadł w mroku...')
+            self.gui_update_stats('GAME OVER', '', 'Twój ekwipunek przepadł w mroku...', view_state)
         else:
-            self.gui_update_stats('Brak aktywnej gry.', '', '')
+            self.gui_update_stats('Brak aktywnej gry.', '', '', view_state)
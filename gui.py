@@ -1,15 +1,30 @@
 import tkinter as tk
 from tkinter import ttk, scrolledtext, simpledialog, messagebox
-from items import Potion
+from autoplay import AutoPlayer, AutoPlayPolicy
+from game_logic import EMPTY_VIEW_STATE
+from log_view import BufferedLogView
 from utils import log_event, COLOR_CYAN, format_currency
+from metrics import REGISTRY
+AUTO_PLAY_REFRESH_MS = 100
+LOG_MAX_LINES = 500
+LOG_SPILL_PATH = None
+# widżety ekranu gry, do których piszą odświeżenia z wątku roboczego
+GAME_SCREEN_WIDGETS = ('log_text', 'player_status_label', 'enemy_status_label', 'explore_button', 'auto_play_button', 'trade_button', 'craft_button', 'leaderboard_button', 'save_button', 'logout_button', 'combat_frame', 'attack_button', 'block_button', 'use_potion_button', 'flee_button', 'inventory_text', 'item_entry', 'use_item_button')
 
 class RPGInterface:
 
-    def __init__(self, root, auth_service, game_logic_service):
+    def __init__(self, root, auth_service, game_logic_service, executor):
         self.root = root
         self.auth = auth_service
         self.game = game_logic_service
+        self.executor = executor
         self.current_username = None
+        self.auto_player = None
+        self._rendered_status = None
+        # jedyne źródło wiedzy GUI o grze: stan przysyłany z wątku roboczego przez dispatch_to_ui
+        self.view_state = EMPTY_VIEW_STATE
+        self.log_view = BufferedLogView(self.root, max_lines=LOG_MAX_LINES, spill_path=LOG_SPILL_PATH)
+        REGISTRY.gauge('log_pending_lines', 'Linie logu czekające na wyrenderowanie.', lambda: self.log_view.pending_count)
         self.root.title('Proste RPG v1.1')
         self.root.geometry('850x650')
         self.style = ttk.Style()
@@ -23,15 +38,24 @@ class RPGInterface:
         log_event('RPGInterface zainicjalizowane.', level='DEBUG', color=COLOR_CYAN)
 
     def clear_screen(self):
+        self.log_view.detach()
+        self._rendered_status = None
+        # bez atrybutów zniszczonych widżetów spóźnione odświeżenie (np. po reset_session) niczego nie rysuje
+        for name in GAME_SCREEN_WIDGETS:
+            self.__dict__.pop(name, None)
         for widget in self.root.winfo_children():
             widget.destroy()
         log_event('Ekran wyczyszczony.', level='DEBUG')
 
     def create_login_screen(self):
         self.clear_screen()
+        if self.current_username:
+            self.auth.logout(self.current_username)
         self.current_username = None
-        if self.game:
-            self.game.player = None
+        self.auto_player = None
+        self.log_view.clear()
+        self.view_state = EMPTY_VIEW_STATE
+        self.executor.submit('reset_session')
         login_frame = ttk.Frame(self.root, padding='20')
         login_frame.pack(expand=True)
         ttk.Label(login_frame, text='Logowanie / Rejestracja', style='Header.TLabel').pack(pady=10)
@@ -72,7 +96,13 @@ class RPGInterface:
 
     def show_character_or_game_screen(self):
         self.clear_screen()
-        if self.game.load_game(self.current_username):
+        ttk.Label(self.root, text='Wczytywanie...', style='Header.TLabel').pack(expand=True)
+        self.executor.submit('load_game', self.current_username, on_done=self._on_game_loaded)
+
+    def _on_game_loaded(self, loaded):
+        if not self.current_username:
+            return
+        if loaded is True:
             self.create_main_game_screen()
             log_event(f'Gra wczytana dla {self.current_username}, przejście do ekranu gry.', level='INFO')
         else:
@@ -104,7 +134,12 @@ class RPGInterface:
             messagebox.showerror('Błąd', 'Nazwa postaci nie może być pusta.')
             return
         log_event(f'Rozpoczęcie nowej gry: Imię={char_name}, Klasa={char_class}', level='INFO')
-        self.game.create_new_player(char_name, char_class)
+        self.executor.submit('create_new_player', char_name, char_class, on_done=self._on_player_created)
+
+    def _on_player_created(self, result):
+        if isinstance(result, Exception):
+            messagebox.showerror('Błąd', f'Nie udało się stworzyć postaci: {result}')
+            return
         self.create_main_game_screen()
 
     def create_main_game_screen(self):
@@ -116,6 +151,7 @@ class RPGInterface:
         ttk.Label(left_frame, text='Log Gry:', style='Header.TLabel').pack(anchor=tk.NW)
         self.log_text = scrolledtext.ScrolledText(left_frame, height=20, width=70, wrap=tk.WORD, state=tk.DISABLED, font=('Arial', 9))
         self.log_text.pack(fill=tk.BOTH, expand=True, pady=5)
+        self.log_view.attach(self.log_text)
         status_frame = ttk.Frame(left_frame)
         status_frame.pack(fill=tk.X, pady=5)
         self.player_status_label = ttk.Label(status_frame, text='Status Gracza:', style='Status.TLabel', justify=tk.LEFT)
@@ -126,21 +162,29 @@ class RPGInterface:
         main_pane.add(right_frame, weight=2)
         actions_frame = ttk.LabelFrame(right_frame, text='Akcje Główne', padding=10)
         actions_frame.pack(fill=tk.X, pady=5)
-        self.explore_button = ttk.Button(actions_frame, text='Eksploruj', command=self.game.explore)
+        self.explore_button = ttk.Button(actions_frame, text='Eksploruj', command=lambda: self.executor.submit('explore'))
         self.explore_button.pack(fill=tk.X, pady=2)
-        self.save_button = ttk.Button(actions_frame, text='Zapisz Grę', command=lambda: self.game.save_game(self.current_username))
+        self.auto_play_button = ttk.Button(actions_frame, text='Auto-eksploracja', command=self.handle_auto_play)
+        self.auto_play_button.pack(fill=tk.X, pady=2)
+        self.trade_button = ttk.Button(actions_frame, text='Handel', command=self.handle_trade)
+        self.trade_button.pack(fill=tk.X, pady=2)
+        self.craft_button = ttk.Button(actions_frame, text='Rzemiosło', command=self.handle_craft)
+        self.craft_button.pack(fill=tk.X, pady=2)
+        self.leaderboard_button = ttk.Button(actions_frame, text='Ranking', command=lambda: self.executor.submit('show_leaderboard', 'level', self.current_username))
+        self.leaderboard_button.pack(fill=tk.X, pady=2)
+        self.save_button = ttk.Button(actions_frame, text='Zapisz Grę', command=lambda: self.executor.submit('save_game', self.current_username))
         self.save_button.pack(fill=tk.X, pady=2)
         self.logout_button = ttk.Button(actions_frame, text='Wyloguj', command=self.create_login_screen)
         self.logout_button.pack(fill=tk.X, pady=2)
         self.combat_frame = ttk.LabelFrame(right_frame, text='Walka', padding=10)
         self.combat_frame.pack(fill=tk.X, pady=5)
-        self.attack_button = ttk.Button(self.combat_frame, text='Atakuj', command=lambda: self.game.player_action_combat('attack'))
+        self.attack_button = ttk.Button(self.combat_frame, text='Atakuj', command=lambda: self.executor.submit('player_action_combat', 'attack'))
         self.attack_button.pack(fill=tk.X, pady=2)
-        self.block_button = ttk.Button(self.combat_frame, text='Blokuj', command=lambda: self.game.player_action_combat('block'))
+        self.block_button = ttk.Button(self.combat_frame, text='Blokuj', command=lambda: self.executor.submit('player_action_combat', 'block'))
         self.block_button.pack(fill=tk.X, pady=2)
         self.use_potion_button = ttk.Button(self.combat_frame, text='Użyj Mikstury (Walka)', command=self.handle_use_potion_combat)
         self.use_potion_button.pack(fill=tk.X, pady=2)
-        self.flee_button = ttk.Button(self.combat_frame, text='Uciekaj', command=self.game.flee_combat)
+        self.flee_button = ttk.Button(self.combat_frame, text='Uciekaj', command=lambda: self.executor.submit('flee_combat'))
         self.flee_button.pack(fill=tk.X, pady=2)
         self.update_combat_buttons_visibility(False)
         inventory_frame = ttk.LabelFrame(right_frame, text='Ekwipunek', padding=10)
@@ -156,43 +200,106 @@ class RPGInterface:
         self.use_item_button = ttk.Button(item_action_frame, text='Użyj/Wyposaż', command=self.handle_use_inventory_item)
         self.use_item_button.pack(side=tk.LEFT, expand=True, fill=tk.X)
         log_event('Utworzono główny ekran gry.', level='DEBUG')
-        if self.game.player:
-            self.game.update_gui()
-            if self.game.is_in_combat:
-                self.update_combat_buttons_visibility(True)
+        # stan przycisków i statusu przyjdzie z wątku roboczego razem z odświeżeniem widoku
+        self.executor.submit('update_gui')
+
+    def handle_auto_play(self):
+        if not self.view_state.alive or self.view_state.in_combat or self.auto_player:
+            return
+        cycles = simpledialog.askinteger('Auto-eksploracja', 'Ile cykli eksploracji wykonać?', parent=self.root, minvalue=1, maxvalue=100000, initialvalue=20)
+        if not cycles:
+            return
+        log_event(f'GUI: Start auto-eksploracji na {cycles} cykli.', level='DEBUG')
+        self.auto_player = AutoPlayer(self.game, AutoPlayPolicy())
+        self._auto_play_tick(self.auto_player, cycles)
+
+    def _auto_play_tick(self, auto_player, remaining_cycles):
+        self.executor.submit(self._run_auto_play_chunk, auto_player, remaining_cycles, on_done=lambda result: self._on_auto_play_chunk(auto_player, result))
+
+    @staticmethod
+    def _run_auto_play_chunk(auto_player, remaining_cycles):
+        # wykonywane w wątku roboczym - tylko tam wolno czytać stan gry; do GUI wraca gotowy wynik
+        remaining_cycles -= auto_player.run(remaining_cycles, 0.05)
+        if remaining_cycles > 0 and auto_player.can_continue():
+            return (remaining_cycles, None)
+        return (0, auto_player.get_summary())
+
+    def _on_auto_play_chunk(self, auto_player, result):
+        if auto_player is not self.auto_player:
+            return
+        if isinstance(result, Exception):
+            self.log_message('Auto-eksploracja przerwana przez błąd.')
+            self.auto_player = None
+            return
+        remaining_cycles, summary = result
+        if summary is None:
+            self.root.after(AUTO_PLAY_REFRESH_MS, self._auto_play_tick, auto_player, remaining_cycles)
+            return
+        self.log_message(summary)
+        self.auto_player = None
+
+    def handle_trade(self):
+        if not self.view_state.alive or self.view_state.in_combat:
+            return
+        self.executor.submit('show_merchant_stock')
+        choice = simpledialog.askstring('Handel', "Wpisz 'kup <nazwa>' lub 'sprzedaj <nazwa>':", parent=self.root)
+        if not choice:
+            return
+        action, _, item_name = choice.strip().partition(' ')
+        if action.lower() == 'kup' and item_name:
+            self.executor.submit('buy_item', item_name.strip())
+        elif action.lower() == 'sprzedaj' and item_name:
+            self.executor.submit('sell_item', item_name.strip())
         else:
-            self.log_message('Błąd krytyczny: Brak danych gracza na głównym ekranie gry. Spróbuj wczytać grę ponownie lub stwórz nową postać.')
-            log_event('Krytyczny błąd: Brak gracza na ekranie gry.', level='ERROR', color=COLOR_CYAN)
+            self.log_message('Nieznana komenda handlu.')
+
+    def handle_craft(self):
+        if not self.view_state.alive or self.view_state.in_combat:
+            return
+        self.executor.submit('show_recipes')
+        item_name = simpledialog.askstring('Rzemiosło', 'Wpisz nazwę przedmiotu do wytworzenia:', parent=self.root)
+        if item_name and item_name.strip():
+            self.executor.submit('craft_item', item_name.strip())
 
     def handle_use_inventory_item(self):
         item_num_str = self.item_entry.get()
         log_event(f'GUI: Próba użycia/wyposażenia przedmiotu z ekwipunku nr: {item_num_str}', level='DEBUG')
-        self.game.use_inventory_item(item_num_str)
+        self.executor.submit('use_inventory_item', item_num_str)
 
     def handle_use_potion_combat(self):
-        if not self.game.player or not self.game.is_in_combat:
+        if not self.view_state.alive or not self.view_state.in_combat:
             return
-        potions_in_inventory = [(i, item.name) for i, item in enumerate(self.game.player.inventory) if isinstance(item, Potion)]
+        potions_in_inventory = self.view_state.potions
         if not potions_in_inventory:
             self.log_message('Nie masz żadnych mikstur w ekwipunku.')
             return
-        potion_name_to_use = simpledialog.askstring('Użyj Mikstury', 'Wpisz nazwę mikstury do użycia:', parent=self.root)
+        potions_listing = ', '.join((f'{name} x{count}' for name, count in potions_in_inventory.items()))
+        potion_name_to_use = simpledialog.askstring('Użyj Mikstury', f'Masz: {potions_listing}\nWpisz nazwę (lub początek nazwy) mikstury do użycia:', parent=self.root)
+        if potion_name_to_use and potion_name_to_use.casefold() not in {name.casefold() for name in potions_in_inventory}:
+            prefix = potion_name_to_use.casefold()
+            matching_potions = [name for name in potions_in_inventory if name.casefold().startswith(prefix)]
+            if len(matching_potions) == 1:
+                potion_name_to_use = matching_potions[0]
         if potion_name_to_use:
             log_event(f"GUI: Próba użycia mikstury '{potion_name_to_use}' w walce.", level='DEBUG')
-            self.game.player_action_combat('use_potion', potion_name_to_use)
+            self.executor.submit('player_action_combat', 'use_potion', potion_name_to_use)
         else:
             self.log_message('Anulowano użycie mikstury.')
 
     def log_message(self, message):
-        if hasattr(self, 'log_text'):
-            self.log_text.config(state=tk.NORMAL)
-            self.log_text.insert(tk.END, message + '\n')
-            self.log_text.config(state=tk.DISABLED)
-            self.log_text.see(tk.END)
+        if self.log_view.widget is not None:
+            self.log_view.append(message)
         else:
             print(f'GUI_LOG_FALLBACK: {message}')
 
-    def update_status_labels(self, player_status, enemy_status, inventory_listing):
+    def update_status_labels(self, player_status, enemy_status, inventory_listing, view_state=None):
+        if view_state is not None:
+            self.view_state = view_state
+            self.update_combat_buttons_visibility(view_state.in_combat)
+        # ponowne wstawianie tych samych napisów tylko przebudowuje widżety
+        status = (player_status, enemy_status, inventory_listing)
+        if status == self._rendered_status:
+            return
         if hasattr(self, 'player_status_label'):
             self.player_status_label.config(text=player_status)
         if hasattr(self, 'enemy_status_label'):
@@ -202,20 +309,26 @@ class RPGInterface:
             self.inventory_text.delete(1.0, tk.END)
             self.inventory_text.insert(tk.END, inventory_listing)
             self.inventory_text.config(state=tk.DISABLED)
+        self._rendered_status = status
 
     def update_combat_buttons_visibility(self, is_combat_active):
+        self.view_state = self.view_state._replace(in_combat=is_combat_active)
+        alive = self.view_state.alive
         if hasattr(self, 'attack_button'):
-            can_act_in_combat = is_combat_active and self.game.player and self.game.player.is_alive()
+            can_act_in_combat = is_combat_active and alive
             combat_button_state = tk.NORMAL if can_act_in_combat else tk.DISABLED
             self.attack_button.config(state=combat_button_state)
             self.block_button.config(state=combat_button_state)
             self.use_potion_button.config(state=combat_button_state)
             self.flee_button.config(state=combat_button_state)
-            can_explore = not is_combat_active and self.game.player and self.game.player.is_alive()
+            can_explore = not is_combat_active and alive
             explore_state = tk.NORMAL if can_explore else tk.DISABLED
             self.explore_button.config(state=explore_state)
-            can_save = not is_combat_active and self.game.player and self.game.player.is_alive()
+            self.trade_button.config(state=explore_state)
+            self.craft_button.config(state=explore_state)
+            self.auto_play_button.config(state=explore_state)
+            can_save = not is_combat_active and alive
             self.save_button.config(state=tk.NORMAL if can_save else tk.DISABLED)
-            can_use_inventory = self.game.player and self.game.player.is_alive()
+            can_use_inventory = alive
             if hasattr(self, 'use_item_button'):
                 self.use_item_button.config(state=tk.NORMAL if can_use_inventory else tk.DISABLED)
@@ -0,0 +1,192 @@
+from bisect import bisect_left, bisect_right, insort
+from collections import Counter
+from itertools import count
+# wspólny licznik wersji: ta sama wersja oznacza zawsze tę samą zawartość ekwipunku
+_versions = count(1)
+
+class Inventory:
+
+    def __init__(self, items=None):
+        self._items = []
+        self._by_name = {}
+        self._sorted_names = []
+        self._names_by_type = {}
+        self._by_value = {}
+        self._sorted_values = []
+        self._version = 0
+        # True, gdy struktury są współdzielone z migawką - pierwsza zmiana je kopiuje (copy-on-write)
+        self._shared = False
+        for item in items or []:
+            self.append(item)
+
+    def __len__(self):
+        return len(self._items)
+
+    def __iter__(self):
+        return iter(self._items)
+
+    def __getitem__(self, index):
+        return self._items[index]
+
+    def __bool__(self):
+        return bool(self._items)
+
+    def __repr__(self):
+        return f'Inventory({self._items!r})'
+
+    @property
+    def version(self):
+        return self._version
+
+    def append(self, item):
+        self._unshare()
+        self._items.append(item)
+        self._index(item)
+        self._version = next(_versions)
+
+    def pop(self, index=-1):
+        self._unshare()
+        item = self._items.pop(index)
+        self._unindex(item)
+        self._version = next(_versions)
+        return item
+
+    def remove(self, item):
+        self._unshare()
+        self._items.remove(item)
+        self._unindex(item)
+        self._version = next(_versions)
+
+    def clear(self):
+        self._set_state(([], {}, [], {}, {}, []))
+        self._shared = False
+        self._version = next(_versions)
+
+    def _get_state(self):
+        return (self._items, self._by_name, self._sorted_names, self._names_by_type, self._by_value, self._sorted_values)
+
+    def _set_state(self, state):
+        self._items, self._by_name, self._sorted_names, self._names_by_type, self._by_value, self._sorted_values = state
+
+    def _unshare(self):
+        if not self._shared:
+            return
+        # płytkie kopie - przedmiotów nie kopiujemy, tylko listy i słowniki, które zaraz zmienimy
+        self._items = list(self._items)
+        self._by_name = {name_key: list(bucket) for name_key, bucket in self._by_name.items()}
+        self._sorted_names = list(self._sorted_names)
+        self._names_by_type = {cls: Counter(names) for cls, names in self._names_by_type.items()}
+        self._by_value = {value: list(bucket) for value, bucket in self._by_value.items()}
+        self._sorted_values = list(self._sorted_values)
+        self._shared = False
+
+    def snapshot(self):
+        # migawka trzyma bieżące struktury, bez kopiowania; kopię zrobi dopiero następna zmiana
+        self._shared = True
+        return (self._version, self._get_state())
+
+    def restore(self, state):
+        version, structures = state
+        if version == self._version:
+            return
+        self._set_state(structures)
+        self._shared = True
+        self._version = version
+
+    def _index(self, item):
+        name_key = item.name.casefold()
+        bucket = self._by_name.get(name_key)
+        if bucket is None:
+            self._by_name[name_key] = [item]
+            insort(self._sorted_names, name_key)
+        else:
+            bucket.append(item)
+        self._names_by_type.setdefault(type(item), Counter())[name_key] += 1
+        value_bucket = self._by_value.get(item.value)
+        if value_bucket is None:
+            self._by_value[item.value] = [item]
+            insort(self._sorted_values, item.value)
+        else:
+            value_bucket.append(item)
+
+    def _unindex(self, item):
+        name_key = item.name.casefold()
+        bucket = self._by_name[name_key]
+        bucket.remove(item)
+        if not bucket:
+            del self._by_name[name_key]
+            del self._sorted_names[bisect_left(self._sorted_names, name_key)]
+        type_names = self._names_by_type[type(item)]
+        type_names[name_key] -= 1
+        if type_names[name_key] <= 0:
+            del type_names[name_key]
+            if not type_names:
+                del self._names_by_type[type(item)]
+        value_bucket = self._by_value[item.value]
+        value_bucket.remove(item)
+        if not value_bucket:
+            del self._by_value[item.value]
+            del self._sorted_values[bisect_left(self._sorted_values, item.value)]
+
+    def find(self, name, item_type=None):
+        bucket = self._by_name.get(name.casefold())
+        if not bucket:
+            return None
+        if item_type is None:
+            return bucket[0]
+        for item in bucket:
+            if isinstance(item, item_type):
+                return item
+        return None
+
+    def index(self, item):
+        return self._items.index(item)
+
+    def count(self, name):
+        return len(self._by_name.get(name.casefold(), ()))
+
+    def search_prefix(self, prefix, item_type=None):
+        prefix = prefix.casefold()
+        matches = []
+        i = bisect_left(self._sorted_names, prefix)
+        while i < len(self._sorted_names) and self._sorted_names[i].startswith(prefix):
+            item = self.find(self._sorted_names[i], item_type)
+            if item is not None:
+                matches.append(item)
+            i += 1
+        return matches
+
+    def _type_keys(self, item_type):
+        return [cls for cls in self._names_by_type if issubclass(cls, item_type)]
+
+    def has_type(self, item_type):
+        return bool(self._type_keys(item_type))
+
+    def count_of_type(self, item_type):
+        return sum((sum(self._names_by_type[cls].values()) for cls in self._type_keys(item_type)))
+
+    def of_type(self, item_type):
+        for cls in self._type_keys(item_type):
+            for name_key in self._names_by_type[cls]:
+                for item in self._by_name[name_key]:
+                    if type(item) is cls:
+                        yield item
+
+    def names_of_type(self, item_type):
+        names = Counter()
+        for item in self.of_type(item_type):
+            names[item.name] += 1
+        return names
+
+    def by_value(self, min_value=None, max_value=None, descending=False):
+        lo = 0 if min_value is None else bisect_left(self._sorted_values, min_value)
+        hi = len(self._sorted_values) if max_value is None else bisect_right(self._sorted_values, max_value)
+        values = self._sorted_values[lo:hi]
+        for value in reversed(values) if descending else values:
+            yield from self._by_value[value]
+
+    def most_valuable(self, item_type=None):
+        for item in self.by_value(descending=True):
+            if item_type is None or isinstance(item, item_type):
+                return item
+        return None
@@ -1,6 +1,11 @@
-from utils import log_event, format_currency, clamp, COLOR_GREEN
+from utils import log_event, format_currency, clamp, COLOR_GREEN, COLOR_RED
+from dice import compile_dice
+from status_effects import apply_potion_effect
+from messages import GameMessage, join_messages
 
 class Item:
+    # pola opisujące przedmiot - tylko je (i INSTANCE_FIELDS) można nadpisać w nakładce egzemplarza
+    STAT_FIELDS = ('name', 'description', 'value')
 
     def __init__(self, name, description, value):
         self.name = name
@@ -15,17 +20,34 @@ class Item:
         return False
 
 class Weapon(Item):
+    STAT_FIELDS = Item.STAT_FIELDS + ('damage', 'damage_dice')
 
     def __init__(self, name, description, value, damage, damage_dice=None):
         super().__init__(name, description, value)
         self.damage = damage
         self.damage_dice = damage_dice
 
+    @property
+    def damage_dice(self):
+        return self._damage_dice
+
+    @damage_dice.setter
+    def damage_dice(self, expression):
+        # wyrażenie kompilowane przy przypisaniu, żeby rzut w walce nie dotykał parsera
+        self._damage_dice = expression
+        self.damage_roller = None
+        if expression:
+            try:
+                self.damage_roller = compile_dice(expression)
+            except ValueError as e:
+                log_event(f'Błąd w notacji kości dla broni {self.name}: {e}', level='ERROR', color=COLOR_RED)
+
     def __str__(self):
         dice_info = f' ({self.damage_dice})' if self.damage_dice else ''
         return f'{super().__str__()} (Bazowe obrażenia: {self.damage}{dice_info})'
 
 class Armor(Item):
+    STAT_FIELDS = Item.STAT_FIELDS + ('defense',)
 
     def __init__(self, name, description, value, defense):
         super().__init__(name, description, value)
@@ -35,6 +57,7 @@ class Armor(Item):
         return f'{super().__str__()} (Obrona: {self.defense})'
 
 class Potion(Item):
+    STAT_FIELDS = Item.STAT_FIELDS + ('heal_amount', 'effect', 'duration')
 
     def __init__(self, name, description, value, heal_amount, effect=None, duration=0):
         super().__init__(name, description, value)
@@ -61,29 +84,32 @@ class Potion(Item):
             target.hp = clamp(target.hp + self.heal_amount, 0, target.max_hp)
             healed_amount = target.hp - hp_before
             if healed_amount > 0:
-                msg = f'{target.name} używa {self.name} i leczy {healed_amount} HP (do {target.hp}/{target.max_hp}).'
-                log_event(msg, level='INFO', color=COLOR_GREEN)
+                msg = GameMessage('potion.healed', target=target.name, potion=self.name, amount=healed_amount, hp=target.hp, max_hp=target.max_hp)
+                log_event(msg, level='DEBUG', color=COLOR_GREEN)
                 log_message_for_gui.append(msg)
                 used_successfully = True
             elif hp_before == target.max_hp:
-                msg = f'{target.name} próbował użyć {self.name}, ale ma już pełne HP.'
-                log_event(msg, level='INFO')
+                msg = GameMessage('potion.full_hp', target=target.name, potion=self.name)
+                log_event(msg, level='DEBUG')
                 log_message_for_gui.append(msg)
                 used_successfully = True
             else:
-                msg = f'{target.name} próbował użyć {self.name}, ale nie przyniosło to efektu leczniczego.'
+                msg = GameMessage('potion.no_heal', target=target.name, potion=self.name)
                 log_event(msg, level='WARNING')
                 log_message_for_gui.append(msg)
         if self.effect:
-            effect_msg = f'{target.name} odczuwa dodatkowy efekt mikstury {self.name} ({self.effect}).'
-            log_event(effect_msg, level='INFO')
+            if hasattr(target, 'status_effects'):
+                effect_msg = apply_potion_effect(target, self)
+            else:
+                effect_msg = GameMessage('potion.extra_effect', target=target.name, potion=self.name, effect=self.effect)
+                log_event(effect_msg, level='DEBUG')
             log_message_for_gui.append(effect_msg)
             used_successfully = True
         if not used_successfully:
-            no_effect_msg = f'{self.name} nie może być użyty na {target.name} lub nie ma zdefiniowanego efektu w tej sytuacji.'
+            no_effect_msg = GameMessage('potion.unusable', potion=self.name, target=target.name)
             log_event(no_effect_msg, level='WARNING')
             return (False, no_effect_msg)
-        return (True, ' '.join(log_message_for_gui))
+        return (True, join_messages(*log_message_for_gui))
 
 DEFAULT_WEAPONS = {
     "splintered_club": Weapon("Drzazgowa Pałka", "Kawałek drewna, ledwo trzymający się kupy.", 1, 1, "1d2"),
@@ -196,10 +222,122 @@ DEFAULT_MISC_ITEMS = {
     "map_fragment_unknown": Item("Fragment Nieznanej Mapy", "Część większej mapy, miejsce nie do rozpoznania.", 8),
 }
 
+DEFAULT_CRAFTING_MATERIALS = {
+    "iron_ingot": Item("Sztabka Żelaza", "Przetopiona ruda, gotowa do kucia.", 10),
+    "leather_strip": Item("Rzemień", "Wyprawiony pasek skóry.", 4),
+    "silk_thread": Item("Jedwabna Nić", "Mocna nić skręcona z pajęczego jedwabiu.", 18),
+    "healing_essence": Item("Esencja Lecznicza", "Skoncentrowany wyciąg z ziół.", 7),
+    "alchemical_base": Item("Baza Alchemiczna", "Podstawa bardziej złożonych mikstur.", 14),
+}
+
 ALL_DEFAULT_ITEMS = {
     **DEFAULT_WEAPONS,
     **DEFAULT_ARMORS,
     **DEFAULT_POTIONS,
-    **DEFAULT_MISC_ITEMS
+    **DEFAULT_MISC_ITEMS,
+    **DEFAULT_CRAFTING_MATERIALS
     # te gwiazdki to laczenie slownikow
-}
\ No newline at end of file
+}
+_KEYS_BY_NAME = {item.name: key for key, item in ALL_DEFAULT_ITEMS.items()}
+# pola, których prototypy nie mają - istnieją tylko w nakładkach konkretnych egzemplarzy
+INSTANCE_FIELDS = {'durability': 'Wytrzymałość', 'enchantment': 'Zaklęcie', 'stack_size': 'Stos'}
+_INSTANCE_CLASSES = {}
+
+class _OverlayField:
+    # zastępuje property prototypu (np. w widokach wspólnego katalogu): wartość z nakładki ma pierwszeństwo,
+    # bo deskryptor bez __set__ ustępuje słownikowi obiektu
+    def __init__(self, name):
+        self.name = name
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        return getattr(instance._prototype, self.name)
+
+class _OverlayDamageRoller:
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        if 'damage_dice' not in instance.__dict__:
+            return instance._prototype.damage_roller
+        expression = instance.__dict__['damage_dice']
+        return compile_dice(expression) if expression else None
+
+class ItemInstance:
+    # egzemplarz = wspólny, niezmienny prototyp z katalogu + mała nakładka własnych pól (słownik obiektu);
+    # niezmienione przedmioty w ogóle nie mają egzemplarza - ekwipunek trzyma sam prototyp
+    __slots__ = ()
+
+    def __getattr__(self, name):
+        # wywoływane tylko dla pól spoza nakładki
+        if name == '_prototype':
+            raise AttributeError(name)
+        return getattr(self._prototype, name)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"Egzemplarz przedmiotu '{self.name}' jest niezmienny - użyj customize().")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"Egzemplarz przedmiotu '{self.name}' jest niezmienny - użyj customize().")
+
+    def __str__(self):
+        extras = [f'{label}: {self.__dict__[field]}' for field, label in INSTANCE_FIELDS.items() if field in self.__dict__]
+        return f"{super().__str__()} [{', '.join(extras)}]" if extras else super().__str__()
+
+    def __repr__(self):
+        return f'{type(self).__name__}({self._prototype.name!r}, {self.__dict__!r})'
+
+    def __reduce__(self):
+        return (_build_instance, (self._prototype, dict(self.__dict__)))
+
+def _instance_class(base):
+    cls = _INSTANCE_CLASSES.get(base)
+    if cls is None:
+        # podklasa prototypu, więc isinstance(egzemplarz, Weapon) i indeks typów ekwipunku działają bez zmian
+        namespace = {'__slots__': ('_prototype',)}
+        for field in base.STAT_FIELDS:
+            if isinstance(getattr(base, field, None), property):
+                namespace[field] = _OverlayField(field)
+        if issubclass(base, Weapon):
+            namespace['damage_roller'] = _OverlayDamageRoller()
+        cls = _INSTANCE_CLASSES[base] = type(f'{base.__name__}Instance', (ItemInstance, base), namespace)
+    return cls
+
+def _build_instance(prototype, overlay):
+    if not overlay:
+        return prototype
+    cls = _instance_class(type(prototype))
+    instance = cls.__new__(cls)
+    object.__setattr__(instance, '_prototype', prototype)
+    instance.__dict__.update(overlay)
+    return instance
+
+def prototype_of(item):
+    return item._prototype if isinstance(item, ItemInstance) else item
+
+def overlay_of(item):
+    return dict(item.__dict__) if isinstance(item, ItemInstance) else {}
+
+def customize(item, **changes):
+    # zwraca nowy egzemplarz; wartość None usuwa pole z nakładki, pusta nakładka daje z powrotem prototyp
+    prototype = prototype_of(item)
+    overlay = overlay_of(item)
+    for field, value in changes.items():
+        # sprawdzamy zadeklarowane statystyki klasy, nie słownik prototypu - widoki katalogu trzymają je w property
+        if field not in INSTANCE_FIELDS and field not in type(prototype).STAT_FIELDS:
+            raise ValueError(f"Przedmiot {prototype.name} nie ma pola '{field}'.")
+        if field == 'damage_dice' and value:
+            compile_dice(value)
+        if value is None or (field not in INSTANCE_FIELDS and value == getattr(prototype, field)):
+            overlay.pop(field, None)
+        else:
+            overlay[field] = value
+    return _build_instance(prototype, overlay)
+
+def item_key_for(item):
+    return _KEYS_BY_NAME.get(prototype_of(item).name)
+
+def item_from_data(item_key, overlay, items=ALL_DEFAULT_ITEMS):
+    prototype = items[item_key]
+    return customize(prototype, **overlay) if overlay else prototype
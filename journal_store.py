@@ -0,0 +1,242 @@
+import json
+import os
+import threading
+from contextlib import contextmanager
+from utils import log_event, COLOR_RED, COLOR_YELLOW
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+    import msvcrt
+JOURNAL_SUFFIX = '.journal'
+LOCK_SUFFIX = '.lock'
+COMPACT_THRESHOLD = 1000
+
+def _file_signature(path):
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+class JournaledStore:
+    # migawka (pełny plik JSON) + dziennik dopisywanych rekordów z numerem generacji w nagłówku;
+    # zapisy idą pod blokadą pliku, więc procesy nie nadpisują sobie nawzajem zmian.
+    # Podklasy definiują format migawki i rekordów; wartość None w rekordzie oznacza usunięcie klucza.
+    snapshot_indent = None
+    reloads_metric = None
+    incremental_metric = None
+
+    def __init__(self, path, compact_threshold=COMPACT_THRESHOLD):
+        self.path = path
+        self.journal_path = path + JOURNAL_SUFFIX
+        self.lock_path = path + LOCK_SUFFIX
+        self.compact_threshold = compact_threshold
+        self.records = {}
+        self._generation = None
+        self._offset = 0
+        self._journal_records = 0
+        self._signature = None
+        self._thread_lock = threading.RLock()
+        with self._locked():
+            self._reload()
+
+    def __len__(self):
+        return len(self.records)
+
+    def _decode_snapshot(self, data):
+        return data
+
+    def _encode_snapshot(self, records):
+        return records
+
+    def _decode_record(self, record):
+        raise NotImplementedError
+
+    def _encode_record(self, key, value):
+        raise NotImplementedError
+
+    def _on_reload(self):
+        # wywoływane po pełnym przeładowaniu
+        pass
+
+    def _on_records(self, keys):
+        # wywoływane po zastosowaniu pojedynczych rekordów (własnych lub dopisanych przez inne procesy)
+        pass
+
+    @contextmanager
+    def _locked(self):
+        with self._thread_lock:
+            lock_dir = os.path.dirname(self.lock_path)
+            if lock_dir:
+                os.makedirs(lock_dir, exist_ok=True)
+            with open(self.lock_path, 'a+b') as lock_file:
+                if fcntl:
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+                else:
+                    lock_file.seek(0)
+                    msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+                try:
+                    yield
+                finally:
+                    if fcntl:
+                        fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+                    else:
+                        lock_file.seek(0)
+                        msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+
+    def _current_signature(self):
+        return (_file_signature(self.path), _file_signature(self.journal_path))
+
+    def _read_snapshot(self):
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, 'r') as f:
+                return self._decode_snapshot(json.load(f))
+        except (json.JSONDecodeError, OSError) as e:
+            log_event(f'Błąd podczas ładowania pliku {self.path}: {e}', level='ERROR', color=COLOR_RED)
+            return {}
+
+    def _read_header(self, journal):
+        header = journal.readline()
+        if not header.endswith(b'\n'):
+            return (None, 0)
+        try:
+            return (json.loads(header)['generation'], len(header))
+        except (ValueError, KeyError, TypeError) as e:
+            # uszkodzony nagłówek: rekordy i tak czytamy, a najbliższy zapis skompaktuje dziennik
+            log_event(f'Uszkodzony nagłówek dziennika {self.journal_path}: {e}', level='ERROR', color=COLOR_RED)
+            return (0, len(header))
+
+    def _apply(self, records, key, value):
+        if value is None:
+            records.pop(key, None)
+        else:
+            records[key] = value
+
+    def _read_journal(self, journal, records):
+        # tylko pełne linie - ostatnia może być właśnie dopisywana przez inny proces
+        keys = []
+        for line in journal:
+            if not line.endswith(b'\n'):
+                break
+            self._offset += len(line)
+            try:
+                key, value = self._decode_record(json.loads(line))
+            except (ValueError, KeyError, TypeError) as e:
+                log_event(f'Pominięto uszkodzony rekord dziennika {self.journal_path} (offset {self._offset - len(line)}): {e}', level='ERROR', color=COLOR_RED)
+                continue
+            self._apply(records, key, value)
+            keys.append(key)
+        self._journal_records += len(keys)
+        return keys
+
+    def _reload(self):
+        records = self._read_snapshot()
+        self._generation, self._offset, self._journal_records = (None, 0, 0)
+        try:
+            with open(self.journal_path, 'rb') as journal:
+                generation, header_length = self._read_header(journal)
+                if header_length:
+                    self._generation, self._offset = (generation, header_length)
+                    self._read_journal(journal, records)
+        except FileNotFoundError:
+            pass
+        self.records = records
+        self._signature = self._current_signature()
+        if self.reloads_metric:
+            self.reloads_metric.inc()
+        log_event(f'Załadowano {len(records)} rekordów z {self.path} (generacja {self._generation}).', level='DEBUG')
+        self._on_reload()
+
+    def refresh(self):
+        # tani test zmian: dwa stat(); przy zmianie czytamy tylko nowe rekordy dziennika
+        if self._current_signature() == self._signature:
+            return False
+        with self._locked():
+            self._refresh_locked()
+        return True
+
+    def _refresh_locked(self):
+        signature = self._current_signature()
+        if signature == self._signature:
+            return
+        if signature[0] == self._signature[0] and signature[1] is not None:
+            with open(self.journal_path, 'rb') as journal:
+                generation, header_length = self._read_header(journal)
+                if header_length and generation == self._generation and signature[1][1] >= self._offset:
+                    journal.seek(self._offset)
+                    keys = self._read_journal(journal, self.records)
+                    self._signature = self._current_signature()
+                    if self.incremental_metric:
+                        self.incremental_metric.inc()
+                    if keys:
+                        self._on_records(keys)
+                    return
+        self._reload()
+
+    def get(self, key):
+        # trafienia są czysto w pamięci; pudło sprawdza, czy ktoś nie dopisał rekordu
+        value = self.records.get(key)
+        if value is None and self.refresh():
+            value = self.records.get(key)
+        return value
+
+    def put(self, key, value, only_if_absent=False):
+        with self._locked():
+            self._refresh_locked()
+            if (only_if_absent and key in self.records) or self.records.get(key) == value:
+                return False
+            if self._generation is None:
+                self._write_journal(1, [])
+            elif self._generation == 0:
+                self._compact()
+            self._truncate_torn_tail()
+            line = (json.dumps(self._encode_record(key, value)) + '\n').encode('utf-8')
+            with open(self.journal_path, 'ab') as journal:
+                journal.write(line)
+            self._apply(self.records, key, value)
+            self._offset += len(line)
+            self._journal_records += 1
+            if self._journal_records >= self.compact_threshold:
+                self._compact()
+            self._signature = self._current_signature()
+        self._on_records([key])
+        return True
+
+    def replace_all(self, records):
+        # pełna wymiana zawartości (np. odbudowa) - atomowo przez migawkę i nową generację dziennika
+        with self._locked():
+            self._refresh_locked()
+            self.records = dict(records)
+            if self._generation is None:
+                self._generation = 0
+            self._compact()
+            self._signature = self._current_signature()
+        self._on_reload()
+
+    def _truncate_torn_tail(self):
+        # pod blokadą nikt nie dopisuje, więc bajty za ostatnią pełną linią zostawił przerwany zapis
+        size = os.path.getsize(self.journal_path)
+        if size > self._offset:
+            log_event(f'Obcięto niedokończony rekord dziennika {self.journal_path} ({size - self._offset} B).', level='WARNING', color=COLOR_YELLOW)
+            os.truncate(self.journal_path, self._offset)
+
+    def _write_journal(self, generation, lines):
+        temp_path = self.journal_path + '.tmp'
+        with open(temp_path, 'wb') as journal:
+            header = json.dumps({'generation': generation}) + '\n'
+            journal.write(header.encode('utf-8'))
+            journal.writelines(lines)
+        os.replace(temp_path, self.journal_path)
+        self._generation, self._offset, self._journal_records = (generation, len(header), 0)
+
+    def _compact(self):
+        # migawka zapisana atomowo, potem pusty dziennik z nową generacją - czytelnicy wykryją ją i przeładują całość
+        temp_path = self.path + '.tmp'
+        with open(temp_path, 'w') as f:
+            json.dump(self._encode_snapshot(self.records), f, indent=self.snapshot_indent)
+        os.replace(temp_path, self.path)
+        self._write_journal(self._generation + 1, [])
+        log_event(f'Skompaktowano dziennik {self.journal_path} ({len(self.records)} rekordów, generacja {self._generation}).', level='DEBUG')
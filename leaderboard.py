@@ -0,0 +1,167 @@
+import json
+import os
+from bisect import bisect_left, insort
+from concurrent.futures import ProcessPoolExecutor
+from numbers import Real
+from journal_store import JournaledStore
+from utils import log_event, safe_nested_get, COLOR_RED, COLOR_GREEN, COLOR_YELLOW
+LEADERBOARD_FILE = 'leaderboard.json'
+LEADERBOARD_METRICS = ('level', 'xp', 'gold')
+SAVE_FILE_SUFFIX = '_save.json'
+
+def _read_save_metrics(save_path):
+    try:
+        with open(save_path, 'r') as f:
+            player_data = safe_nested_get(json.load(f), 'player', {})
+    except (OSError, json.JSONDecodeError):
+        return None
+    username = os.path.basename(save_path)[:-len(SAVE_FILE_SUFFIX)]
+    return (username, {'name': player_data.get('name', username), **{metric: player_data.get(metric, 0) for metric in LEADERBOARD_METRICS}})
+
+def _valid_entry(entry):
+    return isinstance(entry, dict) and isinstance(entry.get('name'), str) and all((isinstance(entry.get(metric), Real) for metric in LEADERBOARD_METRICS))
+
+class _LeaderboardStore(JournaledStore):
+    # zapis rankingu: pojedyncza zmiana to jedna dopisana linia, a nie przepisanie całego pliku
+
+    def __init__(self, path, leaderboard):
+        self.leaderboard = leaderboard
+        super().__init__(path)
+
+    def _decode_snapshot(self, data):
+        entries = safe_nested_get(data, 'entries', {})
+        return dict(entries) if isinstance(entries, dict) else {}
+
+    def _encode_snapshot(self, records):
+        return {'version': 1, 'entries': records}
+
+    def _decode_record(self, record):
+        return (record['username'], record['entry'])
+
+    def _encode_record(self, username, entry):
+        return {'username': username, 'entry': entry}
+
+    def _on_reload(self):
+        self.leaderboard._bulk_load(self.records)
+
+    def _on_records(self, usernames):
+        self.leaderboard._reindex(usernames, self.records)
+
+class Leaderboard:
+
+    def __init__(self, path=None):
+        self.path = path
+        self.entries = {}
+        # dla każdej metryki posortowana lista (-wynik, użytkownik): ranking i top-K to bisect + wycinek
+        self._rankings = {metric: [] for metric in LEADERBOARD_METRICS}
+        self._store = None
+
+    def __len__(self):
+        self.refresh()
+        return len(self.entries)
+
+    def refresh(self):
+        # wpisy dopisane przez inne procesy (np. procesy robocze routera sesji)
+        if self._store is not None:
+            self._store.refresh()
+
+    def _unindex(self, username):
+        entry = self.entries.get(username)
+        if entry is None:
+            return
+        for metric, ranking in self._rankings.items():
+            del ranking[bisect_left(ranking, (-entry[metric], username))]
+
+    def _index(self, username, entry):
+        self.entries[username] = entry
+        for metric, ranking in self._rankings.items():
+            insort(ranking, (-entry[metric], username))
+
+    def update(self, username, player, persist=True):
+        entry = {'name': player.name, **{metric: getattr(player, metric) for metric in LEADERBOARD_METRICS}}
+        if self.entries.get(username) == entry:
+            return False
+        if persist and self._store is not None:
+            # magazyn pod blokadą dociąga cudze zmiany, dopisuje naszą i przez _on_records aktualizuje indeksy
+            return self._store.put(username, entry)
+        self._reindex([username], {username: entry})
+        return True
+
+    def remove(self, username):
+        if username not in self.entries:
+            return False
+        if self._store is not None:
+            return self._store.put(username, None)
+        self._reindex([username], {})
+        return True
+
+    def _reindex(self, usernames, entries):
+        for username in usernames:
+            self._unindex(username)
+            self.entries.pop(username, None)
+            entry = entries.get(username)
+            if entry is None:
+                continue
+            if _valid_entry(entry):
+                self._index(username, entry)
+            else:
+                log_event(f'Pominięto nieprawidłowy wpis rankingu dla {username}: {entry!r}', level='WARNING', color=COLOR_YELLOW)
+
+    def rank(self, username, metric='level'):
+        self.refresh()
+        entry = self.entries.get(username)
+        if entry is None:
+            return None
+        return bisect_left(self._rankings[metric], (-entry[metric], username)) + 1
+
+    def top(self, metric='level', count=100):
+        self.refresh()
+        return [(username, self.entries[username]['name'], -negative_score) for negative_score, username in self._rankings[metric][:count]]
+
+    def format_top(self, metric='level', count=10):
+        lines = [f'Ranking ({metric}):']
+        for position, (username, name, score) in enumerate(self.top(metric, count), start=1):
+            lines.append(f'{position}. {name} ({username}) - {score}')
+        return '\n'.join(lines)
+
+    def save(self):
+        # pełny zapis (po odbudowie); zwykłe aktualizacje idą pojedynczymi rekordami dziennika
+        if not self.path:
+            return
+        entries = self.entries
+        try:
+            if self._store is None:
+                # otwarcie magazynu wczytuje stan z pliku - nasze wpisy i tak go zastąpią
+                self._store = _LeaderboardStore(self.path, self)
+            self._store.replace_all(entries)
+            log_event(f'Zapisano ranking ({len(self.entries)} graczy) do {self.path}.', level='DEBUG')
+        except OSError as e:
+            log_event(f'Błąd podczas zapisywania rankingu do {self.path}: {e}', level='ERROR', color=COLOR_RED)
+
+    @classmethod
+    def load(cls, path):
+        leaderboard = cls(path)
+        try:
+            leaderboard._store = _LeaderboardStore(path, leaderboard)
+        except OSError as e:
+            log_event(f'Błąd podczas wczytywania rankingu {path}: {e}', level='ERROR', color=COLOR_RED)
+        return leaderboard
+
+    def _bulk_load(self, entries):
+        self.entries = {}
+        for username, entry in entries.items():
+            if _valid_entry(entry):
+                self.entries[username] = entry
+            else:
+                log_event(f'Pominięto nieprawidłowy wpis rankingu dla {username}: {entry!r}', level='WARNING', color=COLOR_YELLOW)
+        for metric in LEADERBOARD_METRICS:
+            self._rankings[metric] = sorted(((-entry[metric], username) for username, entry in self.entries.items()))
+
+    def rebuild_from_saves(self, save_dir, max_workers=None):
+        save_paths = [os.path.join(save_dir, file_name) for file_name in os.listdir(save_dir) if file_name.endswith(SAVE_FILE_SUFFIX)]
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            results = [result for result in pool.map(_read_save_metrics, save_paths, chunksize=64) if result is not None]
+        self._bulk_load(dict(results))
+        self.save()
+        log_event(f'Odbudowano ranking z {len(results)} zapisów (pominięto {len(save_paths) - len(results)} uszkodzonych).', level='INFO', color=COLOR_GREEN)
+        return len(results)
@@ -0,0 +1,166 @@
+import argparse
+import contextlib
+import os
+import statistics
+import tempfile
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+import utils
+from utils import log_event, get_weighted_random_choice, COLOR_CYAN, COLOR_RED
+from auth import AuthService
+from game_logic import Game
+DEFAULT_ACTION_MIX = {'explore': 55, 'fight': 20, 'use_item': 10, 'save': 10, 'load': 5}
+PLAYER_CLASSES_FOR_BOTS = ['Wojownik', 'Mag']
+
+def _ignore_gui_update(*args):
+    pass
+
+class BotClient:
+
+    def __init__(self, bot_id, auth_service, action_mix=None):
+        self.bot_id = bot_id
+        self.username = f'bot_{os.getpid()}_{bot_id}'
+        self.password = f'haslo_{bot_id}'
+        self.auth = auth_service
+        self.action_mix = action_mix or DEFAULT_ACTION_MIX
+        self.game = Game(_ignore_gui_update, _ignore_gui_update, _ignore_gui_update)
+        self.samples = []
+        self.has_saved = False
+
+    def _timed(self, action, handler, *args):
+        start = time.perf_counter()
+        try:
+            result = handler(*args)
+            ok = result is not False
+        except Exception as e:
+            log_event(f'Bot {self.username}: błąd akcji {action}: {e}', level='ERROR', color=COLOR_RED)
+            ok = False
+        self.samples.append((action, start, time.perf_counter() - start, ok))
+
+    def _login(self):
+        self._timed('register', lambda: self.auth.register(self.username, self.password)[0])
+        self._timed('login', lambda: self.auth.login(self.username, self.password)[0])
+
+    def _create_character(self):
+        self._timed('create_character', self.game.create_new_player, f'Bot{self.bot_id}', PLAYER_CLASSES_FOR_BOTS[self.bot_id % len(PLAYER_CLASSES_FOR_BOTS)])
+
+    def _fight(self):
+        if self.game.is_in_combat:
+            self.game.player_action_combat('attack')
+        else:
+            self.game.start_encounter()
+
+    def _use_item(self):
+        if self.game.player.inventory:
+            self.game.use_inventory_item('1')
+
+    def step(self):
+        if not self.game.player:
+            self._create_character()
+            return
+        action = 'fight' if self.game.is_in_combat else get_weighted_random_choice(self.action_mix)
+        if action == 'load' and (not self.has_saved):
+            action = 'save'
+        self.has_saved = self.has_saved or action == 'save'
+        handlers = {'explore': self.game.explore, 'fight': self._fight, 'use_item': self._use_item, 'save': lambda: self.game.save_game(self.username), 'load': lambda: self.game.load_game(self.username)}
+        self._timed(action, handlers[action])
+
+    def run(self, deadline, max_actions=None):
+        self._login()
+        self._create_character()
+        actions = 0
+        while time.perf_counter() < deadline and (max_actions is None or actions < max_actions):
+            self.step()
+            actions += 1
+        self.auth.logout(self.username)
+        return self.samples
+
+def _run_bot_group(bot_ids, duration, max_actions, action_mix, threads_per_process):
+    # wywoływane w procesie roboczym: własny AuthService, boty na wątkach
+    utils.DEBUG_MODE = False
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        auth_service = AuthService()
+        deadline = time.perf_counter() + duration
+        bots = [BotClient(bot_id, auth_service, action_mix) for bot_id in bot_ids]
+        with ThreadPoolExecutor(max_workers=threads_per_process) as pool:
+            results = list(pool.map(lambda bot: bot.run(deadline, max_actions), bots))
+    # czasy startu względem początku grupy, bo perf_counter nie jest wspólny dla procesów
+    group_start = deadline - duration
+    return [(action, start - group_start, latency, ok) for samples in results for action, start, latency, ok in samples]
+
+def run_load_test(bots=10, duration=10.0, processes=1, max_actions=None, action_mix=None, workdir=None):
+    workdir = workdir or tempfile.mkdtemp(prefix='rpg_loadtest_')
+    os.makedirs(workdir, exist_ok=True)
+    previous_dir = os.getcwd()
+    os.chdir(workdir)
+    log_event(f'Test obciążeniowy: {bots} botów, {processes} procesów, {duration}s, katalog roboczy {workdir}.', level='INFO', color=COLOR_CYAN)
+    try:
+        bot_groups = [list(range(bots))[i::processes] for i in range(processes)]
+        wall_start = time.perf_counter()
+        if processes == 1:
+            samples = _run_bot_group(bot_groups[0], duration, max_actions, action_mix, bots)
+        else:
+            with ProcessPoolExecutor(max_workers=processes) as pool:
+                futures = [pool.submit(_run_bot_group, group, duration, max_actions, action_mix, len(group)) for group in bot_groups if group]
+                samples = [sample for future in futures for sample in future.result()]
+        wall_time = time.perf_counter() - wall_start
+    finally:
+        os.chdir(previous_dir)
+    return LoadTestReport(samples, wall_time)
+
+class LoadTestReport:
+
+    def __init__(self, samples, wall_time):
+        self.samples = samples
+        self.wall_time = wall_time
+
+    def per_action(self):
+        latencies = defaultdict(list)
+        errors = defaultdict(int)
+        for action, _, latency, ok in self.samples:
+            latencies[action].append(latency)
+            if not ok:
+                errors[action] += 1
+        stats = {}
+        for action, values in latencies.items():
+            if len(values) > 1:
+                cut_points = statistics.quantiles(values, n=100, method='inclusive')
+                p50, p95, p99 = (cut_points[49], cut_points[94], cut_points[98])
+            else:
+                p50 = p95 = p99 = values[0]
+            stats[action] = {'count': len(values), 'errors': errors[action], 'error_rate': errors[action] / len(values), 'p50': p50, 'p95': p95, 'p99': p99}
+        return stats
+
+    def timeline(self, interval=1.0):
+        buckets = defaultdict(lambda: [0, 0])
+        for _, start, _, ok in self.samples:
+            bucket = buckets[int(start // interval)]
+            bucket[0] += 1
+            if not ok:
+                bucket[1] += 1
+        return [(second * interval, count / interval, errors / count) for second, (count, errors) in sorted(buckets.items())]
+
+    def format(self):
+        total = len(self.samples)
+        failed = sum((1 for sample in self.samples if not sample[3]))
+        lines = [f'Akcji: {total} w {self.wall_time:.1f}s ({total / self.wall_time:.0f}/s), błędy: {failed} ({(failed / total if total else 0):.2%})', f"{'akcja':<18}{'liczba':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'błędy':>8}"]
+        for action, stats in sorted(self.per_action().items()):
+            lines.append(f"{action:<18}{stats['count']:>8}{stats['p50'] * 1000:>10.2f}{stats['p95'] * 1000:>10.2f}{stats['p99'] * 1000:>10.2f}{stats['error_rate']:>8.1%}")
+        lines.append('Przebieg w czasie (s, akcji/s, odsetek błędów):')
+        for second, rate, error_rate in self.timeline():
+            lines.append(f'  {second:>5.0f} {rate:>8.0f} {error_rate:>7.1%}')
+        return '\n'.join(lines)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Syntetyczny test obciążeniowy logiki gry z użyciem botów.')
+    parser.add_argument('--bots', type=int, default=10)
+    parser.add_argument('--duration', type=float, default=10.0, help='czas trwania w sekundach')
+    parser.add_argument('--processes', type=int, default=1, help='liczba procesów z botami')
+    parser.add_argument('--max-actions', type=int, help='limit akcji na bota')
+    parser.add_argument('--workdir', help='katalog roboczy na zapisy i użytkowników (domyślnie tymczasowy)')
+    args = parser.parse_args(argv)
+    report = run_load_test(args.bots, args.duration, args.processes, args.max_actions, workdir=args.workdir)
+    print(report.format())
+if __name__ == '__main__':
+    main()
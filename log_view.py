@@ -0,0 +1,85 @@
+import tkinter as tk
+from collections import deque
+from utils import log_event, COLOR_RED
+
+class BufferedLogView:
+
+    def __init__(self, root, max_lines=500, spill_path=None):
+        self.root = root
+        self.max_lines = max_lines
+        self.spill_path = spill_path
+        self.lines = deque(maxlen=max_lines)
+        self.widget = None
+        self._pending = []
+        self._flush_scheduled = None
+        self._widget_line_count = 0
+
+    @property
+    def pending_count(self):
+        return len(self._pending)
+
+    def attach(self, text_widget):
+        self.widget = text_widget
+        self._widget_line_count = len(self.lines)
+        if self.lines:
+            self.widget.config(state=tk.NORMAL)
+            self.widget.delete('1.0', tk.END)
+            self.widget.insert(tk.END, '\n'.join(self.lines) + '\n')
+            self.widget.config(state=tk.DISABLED)
+            self.widget.see(tk.END)
+
+    def detach(self):
+        if self._flush_scheduled:
+            self.root.after_cancel(self._flush_scheduled)
+            self._flush_scheduled = None
+        self.flush(render=False)
+        self.widget = None
+
+    def clear(self):
+        self.lines.clear()
+        self._pending = []
+        self._widget_line_count = 0
+        if self.widget is not None:
+            self.widget.config(state=tk.NORMAL)
+            self.widget.delete('1.0', tk.END)
+            self.widget.config(state=tk.DISABLED)
+
+    def append(self, message):
+        self._pending.append(message)
+        if not self._flush_scheduled:
+            self._flush_scheduled = self.root.after(0, self.flush)
+
+    def flush(self, render=True):
+        self._flush_scheduled = None
+        if not self._pending:
+            return
+        # komunikaty mogą być obiektami GameMessage - renderujemy je dopiero tutaj, całą paczką
+        new_lines = '\n'.join(map(str, self._pending)).split('\n')
+        self._pending = []
+        self.lines.extend(new_lines)
+        if self.spill_path:
+            self._spill(new_lines)
+        if not render or self.widget is None:
+            return
+        self.widget.config(state=tk.NORMAL)
+        if len(new_lines) >= self.max_lines:
+            self.widget.delete('1.0', tk.END)
+            self.widget.insert(tk.END, '\n'.join(self.lines) + '\n')
+            self._widget_line_count = len(self.lines)
+        else:
+            self.widget.insert(tk.END, '\n'.join(new_lines) + '\n')
+            self._widget_line_count += len(new_lines)
+            excess_lines = self._widget_line_count - self.max_lines
+            if excess_lines > 0:
+                self.widget.delete('1.0', f'{excess_lines + 1}.0')
+                self._widget_line_count = self.max_lines
+        self.widget.config(state=tk.DISABLED)
+        self.widget.see(tk.END)
+
+    def _spill(self, new_lines):
+        try:
+            with open(self.spill_path, 'a', encoding='utf-8') as f:
+                f.write('\n'.join(new_lines) + '\n')
+        except OSError as e:
+            log_event(f'Błąd zapisu historii logu do {self.spill_path}: {e}', level='ERROR', color=COLOR_RED)
+            self.spill_path = None
@@ -0,0 +1,147 @@
+import random
+from collections import Counter
+from items import Item, ALL_DEFAULT_ITEMS
+from utils import log_event
+
+class LootTable:
+
+    def __init__(self, entries=None, pick_one=False, name=None):
+        self.name = name
+        self.pick_one = pick_one
+        self.refs = []
+        self.weights = []
+        for entry in entries or []:
+            item_ref, weight = entry
+            resolved = resolve_loot_ref(item_ref)
+            if resolved is None and isinstance(item_ref, str):
+                # literówka albo tabela rejestrowana później - cichy brak łupu byłby trudny do wykrycia
+                raise ValueError(f"Nieznany przedmiot lub tabela łupów '{item_ref}' w tabeli '{name}'.")
+            if resolved is None and item_ref is not None:
+                log_event(f"Nieznany format łupu w tabeli '{name}': {item_ref}", level='WARNING')
+                continue
+            if weight <= 0:
+                continue
+            self.refs.append(resolved)
+            self.weights.append(weight)
+        self.probabilities = [w / 100 for w in self.weights]
+        self.total_weight = sum(self.weights)
+        self.cum_weights = []
+        cumulative = 0
+        for w in self.weights:
+            cumulative += w
+            self.cum_weights.append(cumulative)
+
+    def __len__(self):
+        return len(self.refs)
+
+    def roll(self, rng=random):
+        dropped = []
+        if not self.refs:
+            return dropped
+        if self.pick_one:
+            ref = rng.choices(self.refs, cum_weights=self.cum_weights)[0]
+            self._collect(ref, dropped, rng)
+        else:
+            for ref, probability in zip(self.refs, self.probabilities):
+                if rng.random() < probability:
+                    self._collect(ref, dropped, rng)
+        return dropped
+
+    def _collect(self, ref, dropped, rng):
+        if isinstance(ref, LootTable):
+            dropped.extend(ref.roll(rng))
+        elif ref is not None:
+            dropped.append(ref)
+
+    def roll_many(self, n, rng=random):
+        counts = Counter()
+        self._roll_many_into(n, counts, rng)
+        return counts
+
+    def _roll_many_into(self, n, counts, rng):
+        if n <= 0 or not self.refs:
+            return
+        if self.pick_one:
+            # rozkład wielomianowy jako ciąg warunkowych rozkładów dwumianowych
+            remaining_n = n
+            remaining_weight = self.total_weight
+            for ref, weight in zip(self.refs, self.weights):
+                if remaining_n <= 0:
+                    break
+                k = remaining_n if weight >= remaining_weight else rng.binomialvariate(remaining_n, weight / remaining_weight)
+                remaining_n -= k
+                remaining_weight -= weight
+                self._add_count(ref, k, counts, rng)
+        else:
+            for ref, probability in zip(self.refs, self.probabilities):
+                k = n if probability >= 1 else rng.binomialvariate(n, probability)
+                self._add_count(ref, k, counts, rng)
+
+    def _add_count(self, ref, k, counts, rng):
+        if k <= 0:
+            return
+        if isinstance(ref, LootTable):
+            ref._roll_many_into(k, counts, rng)
+        elif ref is not None:
+            counts[ref] += k
+
+    def expected_drops(self):
+        expected = Counter()
+        self._expected_into(1.0, expected)
+        return expected
+
+    def _expected_into(self, multiplier, expected):
+        if not self.refs:
+            return
+        for ref, weight, probability in zip(self.refs, self.weights, self.probabilities):
+            p = weight / self.total_weight if self.pick_one else min(probability, 1.0)
+            if isinstance(ref, LootTable):
+                ref._expected_into(multiplier * p, expected)
+            elif ref is not None:
+                expected[ref] += multiplier * p
+
+    def expected_value(self):
+        return sum((item.value * count for item, count in self.expected_drops().items()))
+
+LOOT_TABLES = {}
+# tabele z definicji wrogów, kluczowane zawartością - zmieniona definicja dostaje nową tabelę
+_COMPILED_TABLES = {}
+
+def resolve_loot_ref(item_ref):
+    if isinstance(item_ref, (Item, LootTable)):
+        return item_ref
+    if isinstance(item_ref, str):
+        if item_ref in ALL_DEFAULT_ITEMS:
+            return ALL_DEFAULT_ITEMS[item_ref]
+        if item_ref in LOOT_TABLES:
+            return LOOT_TABLES[item_ref]
+    if isinstance(item_ref, list):
+        return LootTable(item_ref, pick_one=True)
+    return None
+
+def register_loot_table(name, entries, pick_one=False):
+    table = LootTable(entries, pick_one=pick_one, name=name)
+    LOOT_TABLES[name] = table
+    log_event(f"Skompilowano tabelę łupów '{name}' ({len(table)} pozycji).", level='DEBUG')
+    return table
+
+def _entries_key(entries):
+    return tuple(((_entries_key(ref) if isinstance(ref, list) else ref), weight) for ref, weight in entries)
+
+def get_loot_table(name, entries=None, pick_one=False):
+    if entries is None:
+        return LOOT_TABLES.get(name)
+    key = (name, pick_one, _entries_key(entries))
+    table = _COMPILED_TABLES.get(key)
+    if table is None:
+        table = _COMPILED_TABLES[key] = LootTable(entries, pick_one=pick_one, name=name)
+        log_event(f"Skompilowano tabelę łupów '{name}' ({len(table)} pozycji).", level='DEBUG')
+    return table
+
+def expected_loot_per_hour(table, kills_per_hour):
+    return {item: count * kills_per_hour for item, count in table.expected_drops().items()}
+
+def simulate_loot_per_hour(table, kills_per_hour, hours=1, rng=random):
+    counts = table.roll_many(int(kills_per_hour * hours), rng)
+    total_value = sum((item.value * count for item, count in counts.items()))
+    return counts, total_value / hours if hours else 0
@@ -3,8 +3,13 @@ import tkinter as tk
 from auth import AuthService
 from game_logic import Game
 from gui import RPGInterface
+from game_executor import GameCommandExecutor
+from metrics import start_metrics_server
 from utils import log_event, COLOR_CYAN, DEBUG_MODE
 
+# port lokalnego endpointu /metrics (None = wyłączony)
+METRICS_PORT = None
+
 def main():
     log_event("Uruchamianie aplikacji RPG...", color=COLOR_CYAN, timestamp=True)
     root = tk.Tk()
@@ -12,28 +17,36 @@ def main():
     auth_service = AuthService()
     
     app_gui_instance = None
+    executor = None
 
     def gui_log_callback(message):
-        if app_gui_instance: app_gui_instance.log_message(message)
+        if app_gui_instance: executor.dispatch_to_ui(None, app_gui_instance.log_message, message)
         log_event(f"GUI_MSG: {message}", level="DEBUG", timestamp=False)
 
 
-    def gui_status_update_callback(player_status, enemy_status, inventory_listing):
-        if app_gui_instance: app_gui_instance.update_status_labels(player_status, enemy_status, inventory_listing)
+    def gui_status_update_callback(player_status, enemy_status, inventory_listing, view_state=None):
+        if app_gui_instance: executor.dispatch_to_ui('status', app_gui_instance.update_status_labels, player_status, enemy_status, inventory_listing, view_state)
             
     def gui_combat_buttons_callback(is_active):
-        if app_gui_instance: app_gui_instance.update_combat_buttons_visibility(is_active)
+        if app_gui_instance: executor.dispatch_to_ui('combat_buttons', app_gui_instance.update_combat_buttons_visibility, is_active)
 
     game_service = Game(
         gui_callback_log=gui_log_callback,
         gui_callback_update_stats=gui_status_update_callback,
-        gui_callback_combat_buttons=gui_combat_buttons_callback
+        gui_callback_combat_buttons=gui_combat_buttons_callback,
+        deferred_rendering=True
     )
 
-    app_gui_instance = RPGInterface(root, auth_service, game_service)
+    executor = GameCommandExecutor(root, game_service)
+    app_gui_instance = RPGInterface(root, auth_service, game_service, executor)
+    executor.start()
+    metrics_server = start_metrics_server(METRICS_PORT) if METRICS_PORT else None
 
     log_event("Aplikacja RPG zainicjalizowana i uruchomiona.", color=COLOR_CYAN)
     root.mainloop()
+    executor.shutdown()
+    if metrics_server:
+        metrics_server.shutdown()
     log_event("Aplikacja RPG zakończyła działanie.", color=COLOR_CYAN, timestamp=True)
 
 
@@ -0,0 +1,103 @@
+SEQUENCE = 'sequence'
+MESSAGE_TEMPLATES = {
+    'attack.cannot_act': '{attacker} nie może atakować, jest nieprzytomny.',
+    'attack.enemy_cannot_act': '{attacker} nie może atakować, jest pokonany.',
+    'attack.hit': '{attacker} atakuje {target}. {damage}',
+    'damage.blocked': '{target} blokuje i otrzymuje {amount} obrażeń!',
+    'damage.blocked_detail': '{target} blokuje atak! Obrona: {defense}. Otrzymuje {amount} obrażeń (z {damage}).',
+    'damage.taken': '{target} otrzymuje {amount} obrażeń.',
+    'damage.taken_detail': '{target} otrzymuje {amount} obrażeń (z {damage}, obrona: {defense}).',
+    'damage.knocked_out': '{target} pada nieprzytomny!',
+    'character.defeated': '{target} został pokonany!',
+    'character.status': '{name} (HP: {hp}/{max_hp}, Baz.Atk: {attack}, Baz.Def: {defense})',
+    'character.xp_gained': 'Zdobywasz {amount} XP.',
+    'character.level_up': 'Awans na {level} poziom! Statystyki wzrosły. HP do {max_hp}, Atk do {attack}, Def do {defense}.',
+    'equip.missing': 'Nie masz przedmiotu {item} w ekwipunku.',
+    'equip.done': 'Wyposażono {item}.',
+    'equip.removed': 'Zdjęto {item}.',
+    'equip.not_equipment': '{item} nie jest bronią ani zbroją.',
+    'block.prepare': '{character} przygotowuje się do bloku!',
+    'heal.done': '{character} leczy się o {amount} HP (do {hp}/{max_hp}).',
+    'potion.healed': '{target} używa {potion} i leczy {amount} HP (do {hp}/{max_hp}).',
+    'potion.full_hp': '{target} próbował użyć {potion}, ale ma już pełne HP.',
+    'potion.no_heal': '{target} próbował użyć {potion}, ale nie przyniosło to efektu leczniczego.',
+    'potion.extra_effect': '{target} odczuwa dodatkowy efekt mikstury {potion} ({effect}).',
+    'potion.unusable': '{potion} nie może być użyty na {target} lub nie ma zdefiniowanego efektu w tej sytuacji.',
+    'potion.missing': 'Nie masz mikstury {potion}.',
+    'potion.not_chosen': 'Musisz wybrać miksturę do użycia.',
+    'effect.applied': '{target} zyskuje efekt {potion}{details} na {duration} tur.',
+    'effect.cured': '{target} zostaje wyleczony z: {cured}.',
+    'effect.nothing_to_cure': '{target} pije {potion}, ale nie ma czego leczyć.',
+    'effect.instant': '{target} odczuwa efekt mikstury {potion}, ale szybko mija.',
+    'effect.regen': '{character} regeneruje {amount} HP ({effect}).',
+    'effect.expired': 'Efekt {effect} na {character} przestaje działać.',
+    'game.welcome': 'Witaj, {name}, {character_class}!',
+    'game.nothing_to_save': 'Nie ma aktywnej gry do zapisania.',
+    'game.saved': 'Gra zapisana dla {username}.',
+    'game.save_failed': 'Błąd podczas zapisywania gry: {error}',
+    'game.no_save': 'Nie znaleziono zapisu dla {username}.',
+    'game.loaded': 'Gra wczytana dla {name}.',
+    'game.load_failed': 'Błąd podczas wczytywania gry: {error}',
+    'explore.in_combat': 'Jesteś w trakcie walki!',
+    'explore.defeated': 'Nie możesz eksplorować, gdy jesteś pokonany.',
+    'explore.start': 'Rozglądasz się...',
+    'explore.nothing': 'Nic ciekawego się nie wydarzyło.',
+    'explore.new_area': 'Docierasz na nieznany teren: {biome}.',
+    'explore.item_found': 'Znalazłeś {item}!',
+    'explore.item_lost': 'Coś błysnęło w trawie, ale zniknęło, nim zdążyłeś zareagować.',
+    'explore.gold_found': 'Znalazłeś sakiewkę z {gold:.0f} zł!',
+    'encounter.start': 'Spotykasz {enemy}!',
+    'encounter.escaped': 'Coś zaszurało w krzakach, ale uciekło.',
+    'encounter.group_start': 'Napotykasz grupę wrogów ({count})!',
+    'combat.unknown_action': 'Nieznana akcja.',
+    'combat.victory': 'Pokonałeś {enemy}!',
+    'combat.gold_reward': 'Zdobywasz {gold:.0f} zł.',
+    'combat.loot_header': 'Znaleziono łup:',
+    'combat.loot_item': '- {item}',
+    'combat.defeat': '{player} został pokonany przez {enemy}. Koniec gry.',
+    'combat.flee_success': 'Udało ci się uciec!',
+    'combat.flee_failed': 'Nie udało się uciec! Wróg korzysta z okazji.',
+    'combat.group_defeat': '{player} poległ w starciu grupowym. Koniec gry.',
+    'combat.group_draw': 'Starcie nierozstrzygnięte, wycofujesz się.',
+    'combat.group_victory': 'Pokonałeś {count} wrogów!',
+    'leaderboard.rank': 'Twoje miejsce: {rank} z {total}.',
+    'trade.unavailable': 'Nie możesz teraz handlować.',
+    'trade.in_combat': 'Nie możesz handlować w trakcie walki!',
+    'trade.unknown_item': 'Nie ma takiego przedmiotu jak {item}.',
+    'craft.unavailable': 'Nie możesz teraz niczego wytwarzać.',
+    'craft.in_combat': 'Nie możesz wytwarzać w trakcie walki!',
+    'craft.unknown_recipe': 'Nie znasz przepisu na {item}.',
+    'inventory.unavailable': 'Nie możesz teraz używać przedmiotów.',
+    'inventory.not_usable': '{item} nie jest miksturą, bronią ani zbroją. Nie można go tak użyć.',
+    'inventory.bad_number': 'Nieprawidłowy numer przedmiotu.',
+    'inventory.not_a_number': 'Podaj numer przedmiotu.',
+    'inventory.missing_number': 'Przedmiot o podanym numerze nie istnieje w ekwipunku.',
+}
+
+class GameMessage:
+    __slots__ = ('code', 'params')
+
+    def __init__(self, code, **params):
+        self.code = code
+        self.params = params
+
+    def render(self, templates=None):
+        templates = templates or MESSAGE_TEMPLATES
+        if self.code == SEQUENCE:
+            return ' '.join((render_message(part, templates) for part in self.params['parts']))
+        params = {key: render_message(value, templates) if isinstance(value, GameMessage) else value for key, value in self.params.items()}
+        return templates[self.code].format_map(params)
+
+    def __str__(self):
+        return self.render()
+
+    def __repr__(self):
+        return f'GameMessage({self.code!r}, {self.params!r})'
+
+def join_messages(*parts):
+    return GameMessage(SEQUENCE, parts=tuple((part for part in parts if part)))
+
+def render_message(message, templates=None):
+    if isinstance(message, GameMessage):
+        return message.render(templates)
+    return str(message)
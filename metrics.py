@@ -0,0 +1,193 @@
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from utils import log_event, COLOR_CYAN
+METRICS_PREFIX = 'rpg_'
+DEFAULT_LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+class _ThreadCells:
+
+    def __init__(self, cell_factory):
+        self._cell_factory = cell_factory
+        self._local = threading.local()
+        self._cells = []
+        self._lock = threading.Lock()
+
+    def get(self):
+        # każdy wątek pisze tylko do własnej komórki, więc zapis nie potrzebuje blokady
+        cell = getattr(self._local, 'cell', None)
+        if cell is None:
+            cell = self._cell_factory()
+            with self._lock:
+                self._cells.append(cell)
+            self._local.cell = cell
+        return cell
+
+    def snapshot(self):
+        with self._lock:
+            return list(self._cells)
+
+class Counter:
+    metric_type = 'counter'
+
+    def __init__(self, name, help_text=''):
+        self.name = name
+        self.help_text = help_text
+        self._cells = _ThreadCells(lambda: [0])
+
+    def inc(self, amount=1):
+        self._cells.get()[0] += amount
+
+    @property
+    def value(self):
+        return sum((cell[0] for cell in self._cells.snapshot()))
+
+    def render(self):
+        return [f'{self.name} {self.value}']
+
+class Gauge:
+    metric_type = 'gauge'
+
+    def __init__(self, name, help_text='', value_function=None):
+        self.name = name
+        self.help_text = help_text
+        self.value_function = value_function
+        self._value = 0
+
+    def set(self, value):
+        self._value = value
+
+    def set_function(self, value_function):
+        self.value_function = value_function
+
+    @property
+    def value(self):
+        if self.value_function:
+            try:
+                return self.value_function()
+            except Exception:
+                return float('nan')
+        return self._value
+
+    def render(self):
+        return [f'{self.name} {self.value}']
+
+class Histogram:
+    metric_type = 'histogram'
+
+    def __init__(self, name, help_text='', buckets=DEFAULT_LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = tuple(sorted(buckets))
+        # komórka: liczniki kubełków (+ jeden na +Inf), suma obserwacji
+        self._cells = _ThreadCells(lambda: [[0] * (len(self.buckets) + 1), 0.0])
+
+    def observe(self, value):
+        cell = self._cells.get()
+        cell[0][bisect_left(self.buckets, value)] += 1
+        cell[1] += value
+
+    @contextmanager
+    def time(self):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start)
+
+    def snapshot(self):
+        counts = [0] * (len(self.buckets) + 1)
+        total = 0.0
+        for bucket_counts, cell_sum in self._cells.snapshot():
+            for i, count in enumerate(bucket_counts):
+                counts[i] += count
+            total += cell_sum
+        return (counts, total)
+
+    @property
+    def count(self):
+        return sum(self.snapshot()[0])
+
+    def average(self):
+        counts, total = self.snapshot()
+        observations = sum(counts)
+        return total / observations if observations else 0.0
+
+    def render(self):
+        counts, total = self.snapshot()
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets, counts):
+            cumulative += count
+            lines.append(f'{self.name}_bucket{{le="{bound}"}} {cumulative}')
+        cumulative += counts[-1]
+        lines.append(f'{self.name}_bucket{{le="+Inf"}} {cumulative}')
+        lines.append(f'{self.name}_sum {total}')
+        lines.append(f'{self.name}_count {cumulative}')
+        return lines
+
+class MetricsRegistry:
+
+    def __init__(self, prefix=METRICS_PREFIX):
+        self.prefix = prefix
+        self.metrics = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, metric_class, name, help_text, **kwargs):
+        full_name = self.prefix + name
+        with self._lock:
+            metric = self.metrics.get(full_name)
+            if metric is None:
+                metric = metric_class(full_name, help_text, **kwargs)
+                self.metrics[full_name] = metric
+            elif not isinstance(metric, metric_class):
+                raise ValueError(f'Metryka {full_name} jest już zarejestrowana jako {metric.metric_type}.')
+            return metric
+
+    def counter(self, name, help_text=''):
+        return self._get_or_create(Counter, name, help_text)
+
+    def gauge(self, name, help_text='', value_function=None):
+        gauge = self._get_or_create(Gauge, name, help_text)
+        if value_function:
+            gauge.set_function(value_function)
+        return gauge
+
+    def histogram(self, name, help_text='', buckets=DEFAULT_LATENCY_BUCKETS):
+        return self._get_or_create(Histogram, name, help_text, buckets=buckets)
+
+    def render(self):
+        with self._lock:
+            metrics = list(self.metrics.values())
+        lines = []
+        for metric in metrics:
+            if metric.help_text:
+                lines.append(f'# HELP {metric.name} {metric.help_text}')
+            lines.append(f'# TYPE {metric.name} {metric.metric_type}')
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+REGISTRY = MetricsRegistry()
+
+def start_metrics_server(port, host='127.0.0.1', registry=REGISTRY):
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+
+        def do_GET(self):
+            if self.path.split('?')[0] != '/metrics':
+                self.send_error(404)
+                return
+            body = registry.render().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            log_event(f'Metryki HTTP: {format % args}', level='DEBUG')
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, name='MetricsServer', daemon=True).start()
+    log_event(f'Metryki dostępne pod http://{host}:{server.server_address[1]}/metrics', level='INFO', color=COLOR_CYAN)
+    return server
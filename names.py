@@ -0,0 +1,137 @@
+import hashlib
+import random
+from array import array
+from bisect import bisect_left
+from math import ceil, log
+from utils import log_event, NAME_SYLLABLES, NAME_FIRST_SYLLABLES, NAME_TITLES
+FINGERPRINT_MERGE_THRESHOLD = 65536
+
+def _name_digest(name):
+    return hashlib.blake2b(name.encode('utf-8'), digest_size=16).digest()
+
+class BloomFilter:
+
+    def __init__(self, expected_items, false_positive_rate=0.01):
+        expected_items = max(1, expected_items)
+        self.size = max(64, ceil(-expected_items * log(false_positive_rate) / log(2) ** 2))
+        self.hash_count = max(1, round(self.size / expected_items * log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, digest):
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hash_count)]
+
+    def add_digest(self, digest):
+        # zwraca True, jeśli wszystkie bity były już ustawione (element mógł już być w filtrze)
+        bits = self.bits
+        size = self.size
+        position = int.from_bytes(digest[:8], 'little') % size
+        step = (int.from_bytes(digest[8:], 'little') | 1) % size
+        already_present = True
+        for _ in range(self.hash_count):
+            mask = 1 << (position & 7)
+            if not bits[position >> 3] & mask:
+                bits[position >> 3] |= mask
+                already_present = False
+            position = (position + step) % size
+        self.count += 1
+        return already_present
+
+    def might_contain_digest(self, digest):
+        bits = self.bits
+        for position in self._positions(digest):
+            if not bits[position >> 3] & 1 << (position & 7):
+                return False
+        return True
+
+    def add(self, name):
+        self.add_digest(_name_digest(name))
+
+    def __contains__(self, name):
+        return self.might_contain_digest(_name_digest(name))
+
+class UniqueNameGenerator:
+
+    def __init__(self, seed=None, expected_names=1000000, false_positive_rate=0.01, min_syl=2, max_syl=4, title_chance=0.1):
+        self.rng = random.Random(seed)
+        self.min_syl = min_syl
+        self.max_syl = max_syl
+        self.title_chance = title_chance
+        self.bloom = BloomFilter(expected_names, false_positive_rate)
+        # dokładna weryfikacja po trafieniu w filtr: posortowane 64-bitowe odciski + świeże odciski w zbiorze
+        self._fingerprints = array('Q')
+        self._recent_fingerprints = set()
+        self.issued = 0
+        self.duplicates_rejected = 0
+        self.bloom_false_positives = 0
+
+    def __len__(self):
+        return self.issued
+
+    def _contains_fingerprint(self, fingerprint):
+        if fingerprint in self._recent_fingerprints:
+            return True
+        i = bisect_left(self._fingerprints, fingerprint)
+        return i < len(self._fingerprints) and self._fingerprints[i] == fingerprint
+
+    def _merge_fingerprints(self):
+        if self._recent_fingerprints:
+            # sortujemy tylko świeże odciski; sorted() wykrywa dwa posortowane ciągi i scala je liniowo
+            merged = self._fingerprints + array('Q', sorted(self._recent_fingerprints))
+            self._fingerprints = array('Q', sorted(merged))
+            self._recent_fingerprints.clear()
+
+    def __contains__(self, name):
+        digest = _name_digest(name)
+        return self.bloom.might_contain_digest(digest) and self._contains_fingerprint(int.from_bytes(digest[:8], 'little'))
+
+    def reserve(self, name):
+        digest = _name_digest(name)
+        fingerprint = int.from_bytes(digest[:8], 'little')
+        if self.bloom.add_digest(digest):
+            if self._contains_fingerprint(fingerprint):
+                self.bloom.count -= 1
+                return False
+            self.bloom_false_positives += 1
+        self._recent_fingerprints.add(fingerprint)
+        self.issued += 1
+        if len(self._recent_fingerprints) >= max(FINGERPRINT_MERGE_THRESHOLD, len(self._fingerprints)):
+            self._merge_fingerprints()
+        return True
+
+    def _draw_candidates(self, count):
+        rng = self.rng
+        lengths = rng.choices(range(self.min_syl - 1, self.max_syl), k=count)
+        firsts = rng.choices(NAME_FIRST_SYLLABLES, k=count)
+        rest = rng.choices(NAME_SYLLABLES, k=sum(lengths))
+        titles = rng.choices(NAME_TITLES, k=count)
+        title_rolls = [rng.random() for _ in range(count)]
+        candidates = []
+        offset = 0
+        for i, length in enumerate(lengths):
+            name = firsts[i] + ''.join(rest[offset:offset + length])
+            offset += length
+            if title_rolls[i] < self.title_chance:
+                name = f'{titles[i]} {name}'
+            candidates.append(name)
+        return candidates
+
+    def generate_batch(self, count):
+        names = []
+        while len(names) < count:
+            for name in self._draw_candidates(count - len(names)):
+                if self.reserve(name):
+                    names.append(name)
+                else:
+                    self.duplicates_rejected += 1
+        log_event(f'Wygenerowano {count} unikalnych imion (odrzucone duplikaty: {self.duplicates_rejected}, fałszywe trafienia filtra: {self.bloom_false_positives}).', level='DEBUG')
+        return names
+
+    def generate(self):
+        while True:
+            name = self._draw_candidates(1)[0]
+            if self.reserve(name):
+                return name
+            self.duplicates_rejected += 1
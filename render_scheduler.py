@@ -0,0 +1,42 @@
+from utils import log_event, COLOR_RED
+from metrics import REGISTRY
+RENDER_REQUESTS_TOTAL = REGISTRY.counter('gui_render_requests_total', 'Żądania odświeżenia widoków GUI.')
+RENDER_FRAMES_TOTAL = REGISTRY.counter('gui_render_frames_total', 'Klatki pętli zdarzeń, w których odświeżono widoki GUI.')
+
+class RenderScheduler:
+    # widoki oznaczane jako nieaktualne renderujemy najwyżej raz na klatkę pętli zdarzeń:
+    # kolejne żądania dla tego samego klucza przed after_idle nadpisują tylko argumenty
+
+    def __init__(self, root):
+        self.root = root
+        self._pending = {}
+        self._render_job = None
+
+    @property
+    def pending_count(self):
+        return len(self._pending)
+
+    def request(self, key, callback, *args):
+        RENDER_REQUESTS_TOTAL.inc()
+        self._pending[key] = (callback, args)
+        if self._render_job is None:
+            self._render_job = self.root.after_idle(self.render)
+
+    def render(self):
+        self._render_job = None
+        if not self._pending:
+            return
+        # słownik zachowuje kolejność pierwszego zgłoszenia widoku
+        pending, self._pending = (self._pending, {})
+        RENDER_FRAMES_TOTAL.inc()
+        for key, (callback, args) in pending.items():
+            try:
+                callback(*args)
+            except Exception as e:
+                log_event(f'Błąd podczas renderowania widoku {key}: {e}', level='ERROR', color=COLOR_RED)
+
+    def cancel(self):
+        if self._render_job is not None:
+            self.root.after_cancel(self._render_job)
+            self._render_job = None
+        self._pending.clear()
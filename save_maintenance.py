@@ -0,0 +1,207 @@
+import argparse
+import csv
+import json
+import os
+import shutil
+import sys
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+import utils
+from utils import log_event, safe_nested_get, create_directory_if_not_exists, COLOR_RED, COLOR_GREEN, COLOR_CYAN
+from characters import Player
+from items import ALL_DEFAULT_ITEMS, Weapon, Armor
+from game_logic import SAVE_GAME_DIR, SAVE_FORMAT_VERSION
+from leaderboard import SAVE_FILE_SUFFIX
+EXPORT_COLUMNS = ['username', 'status', 'version', 'name', 'chosen_class', 'level', 'xp', 'gold', 'hp', 'max_hp', 'inventory_size', 'errors']
+PROGRESS_INTERVAL = 2.0
+# podkatalog celu migracji na oryginały zapisów, których nie dało się poprawnie przenieść
+QUARANTINE_DIR = 'quarantine'
+
+def _migrate_1_0(game_state, username):
+    game_state.setdefault('current_location_description', 'Nieznane miejsce.')
+    return game_state
+
+def _migrate_1_1(game_state, username):
+    # ziarno świata wyprowadzone z nazwy użytkownika, żeby migracja była powtarzalna
+    game_state.setdefault('world', {'seed': zlib.crc32(username.encode('utf-8')), 'x': 0, 'y': 0})
+    return game_state
+SAVE_MIGRATIONS = {'1.0': ('1.1', _migrate_1_0), '1.1': ('1.2', _migrate_1_1)}
+
+def migrate_game_state(game_state, username):
+    version = game_state.get('version', '1.0')
+    applied = []
+    while version in SAVE_MIGRATIONS:
+        version, migration = SAVE_MIGRATIONS[version]
+        game_state = migration(game_state, username)
+        game_state['version'] = version
+        applied.append(version)
+    return (game_state, applied)
+
+def validate_player_data(player_data):
+    errors = []
+    if not isinstance(player_data, dict) or not player_data:
+        return ['brak danych gracza']
+    for field in ('hp', 'max_hp', 'gold', 'xp', 'level'):
+        if not isinstance(player_data.get(field), int):
+            errors.append(f'pole {field} nie jest liczbą całkowitą')
+        elif player_data[field] < 0:
+            errors.append(f'pole {field} jest ujemne')
+    if isinstance(player_data.get('hp'), int) and isinstance(player_data.get('max_hp'), int) and player_data['hp'] > player_data['max_hp']:
+        errors.append('hp większe niż max_hp')
+    inventory = player_data.get('inventory', [])
+    if not isinstance(inventory, list):
+        errors.append('ekwipunek nie jest listą')
+        inventory = []
+    for entry in inventory:
+        item_key = safe_nested_get(entry, 'item_key')
+        if item_key not in ALL_DEFAULT_ITEMS:
+            errors.append(f'nieznany przedmiot w ekwipunku: {item_key}')
+        elif not isinstance(safe_nested_get(entry, 'overlay', {}), dict):
+            errors.append(f'nakładka przedmiotu {item_key} nie jest słownikiem')
+    for field, item_type in (('equipped_weapon_key', Weapon), ('equipped_armor_key', Armor)):
+        item_key = player_data.get(field)
+        if item_key is not None and (not isinstance(ALL_DEFAULT_ITEMS.get(item_key), item_type)):
+            errors.append(f'{field} wskazuje na nieprawidłowy przedmiot: {item_key}')
+    return errors
+
+def _init_worker():
+    # ostrzeżenia z Player.from_dict trafiają do kolumny errors, nie na konsolę
+    utils.DEBUG_MODE = False
+    sys.stdout = open(os.devnull, 'w')
+
+def process_save(save_path, mode='validate', target_dir=None):
+    username = os.path.basename(save_path)[:-len(SAVE_FILE_SUFFIX)]
+    row = {'username': username, 'status': 'ok', 'errors': ''}
+    player = None
+    try:
+        with open(save_path, 'r') as f:
+            game_state = json.load(f)
+    except (OSError, ValueError) as e:
+        row.update(status='unreadable', errors=str(e))
+    else:
+        try:
+            game_state, player = _inspect_game_state(game_state, username, row)
+        except Exception as e:
+            # jeden uszkodzony zapis nie może przerwać całego przebiegu
+            row.update(status='invalid', errors=f'{type(e).__name__}: {e}')
+    if mode != 'migrate':
+        return row
+    if row['status'] in ('invalid', 'unreadable'):
+        _quarantine(save_path, target_dir, row)
+    elif player is not None:
+        # zapis przez Player.to_dict normalizuje dane (np. usuwa nieznane przedmioty)
+        game_state['player'] = player.to_dict()
+        try:
+            with open(os.path.join(target_dir, os.path.basename(save_path)), 'w') as f:
+                json.dump(game_state, f, indent=4)
+        except OSError as e:
+            row.update(status='invalid', errors=f'zapis migracji: {e}')
+    return row
+
+def _quarantine(save_path, target_dir, row):
+    quarantine_dir = os.path.join(target_dir, QUARANTINE_DIR)
+    try:
+        os.makedirs(quarantine_dir, exist_ok=True)
+        shutil.copyfile(save_path, os.path.join(quarantine_dir, os.path.basename(save_path)))
+    except OSError as e:
+        row['errors'] = f"{row['errors']}; kwarantanna: {e}"
+
+def _inspect_game_state(game_state, username, row):
+    if not isinstance(game_state, dict):
+        raise ValueError(f'zapis nie jest obiektem JSON ({type(game_state).__name__})')
+    game_state, applied_migrations = migrate_game_state(game_state, username)
+    player_data = safe_nested_get(game_state, 'player', {})
+    errors = validate_player_data(player_data)
+    if game_state.get('version') != SAVE_FORMAT_VERSION:
+        errors.append(f"nieobsługiwana wersja zapisu: {game_state.get('version')}")
+    try:
+        player = Player.from_dict(player_data, ALL_DEFAULT_ITEMS)
+    except Exception as e:
+        errors.append(f'Player.from_dict: {e}')
+        player = None
+    if player is not None:
+        row.update(name=player.name, chosen_class=player.chosen_class, level=player.level, xp=player.xp, gold=player.gold, hp=player.hp, max_hp=player.max_hp, inventory_size=len(player.inventory))
+    row['version'] = game_state.get('version')
+    row['errors'] = '; '.join(errors)
+    if errors:
+        row['status'] = 'invalid'
+    elif applied_migrations:
+        row['status'] = 'migrated'
+    return (game_state, player)
+
+def iter_save_paths(source_dir):
+    with os.scandir(source_dir) as entries:
+        for entry in entries:
+            if entry.is_file() and entry.name.endswith(SAVE_FILE_SUFFIX):
+                yield entry.path
+
+def _future_row(future, save_path):
+    try:
+        return future.result()
+    except Exception as e:
+        # np. proces roboczy zakończony przez system - zapis raportujemy, przebieg trwa dalej
+        return {'username': os.path.basename(save_path)[:-len(SAVE_FILE_SUFFIX)], 'status': 'unreadable', 'errors': f'{type(e).__name__}: {e}'}
+
+def run_maintenance(source_dir=SAVE_GAME_DIR, mode='validate', target_dir=None, csv_path=None, max_workers=None, max_in_flight=None, on_row=None):
+    if mode == 'migrate':
+        if not target_dir or os.path.abspath(target_dir) == os.path.abspath(source_dir):
+            raise ValueError('Migracja wymaga osobnego katalogu docelowego.')
+        create_directory_if_not_exists(target_dir)
+    workers = max_workers or os.cpu_count() or 1
+    max_in_flight = max_in_flight or workers * 8
+    totals = {'processed': 0, 'ok': 0, 'migrated': 0, 'invalid': 0, 'unreadable': 0}
+    csv_file = open(csv_path, 'w', newline='') if csv_path else None
+    writer = csv.DictWriter(csv_file, fieldnames=EXPORT_COLUMNS) if csv_file else None
+    if writer:
+        writer.writeheader()
+    start_time = time.perf_counter()
+    last_report = start_time
+
+    def handle_row(row):
+        nonlocal last_report
+        totals['processed'] += 1
+        totals[row['status']] += 1
+        if writer:
+            writer.writerow(row)
+        if on_row:
+            on_row(row)
+        now = time.perf_counter()
+        if now - last_report >= PROGRESS_INTERVAL:
+            last_report = now
+            log_event(f"Przetworzono {totals['processed']} zapisów ({totals['processed'] / (now - start_time):.0f}/s).", level='INFO', color=COLOR_CYAN)
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+            # ograniczona liczba zadań w locie - pamięć nie rośnie z liczbą zapisów
+            in_flight = {}
+            for save_path in iter_save_paths(source_dir):
+                if len(in_flight) >= max_in_flight:
+                    done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        handle_row(_future_row(future, in_flight.pop(future)))
+                in_flight[pool.submit(process_save, save_path, mode, target_dir)] = save_path
+            for future, save_path in in_flight.items():
+                handle_row(_future_row(future, save_path))
+    finally:
+        if csv_file:
+            csv_file.close()
+    elapsed = time.perf_counter() - start_time
+    totals['elapsed'] = elapsed
+    log_event(f"Zakończono ({mode}): {totals['processed']} zapisów w {elapsed:.1f}s, poprawne: {totals['ok']}, zmigrowane: {totals['migrated']}, błędne: {totals['invalid']}, nieczytelne: {totals['unreadable']}.", level='INFO', color=COLOR_GREEN if not totals['invalid'] + totals['unreadable'] else COLOR_RED)
+    return totals
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Masowa konserwacja zapisów gry: walidacja, migracja i eksport.')
+    parser.add_argument('mode', choices=['validate', 'migrate', 'export'])
+    parser.add_argument('--source', default=SAVE_GAME_DIR, help='katalog z zapisami')
+    parser.add_argument('--target', help='katalog docelowy dla migracji')
+    parser.add_argument('--csv', help='plik CSV z wynikami (wymagany dla export)')
+    parser.add_argument('--workers', type=int, help='liczba procesów roboczych')
+    args = parser.parse_args(argv)
+    if args.mode == 'export' and (not args.csv):
+        parser.error('export wymaga --csv')
+    utils.DEBUG_MODE = False
+    totals = run_maintenance(args.source, args.mode, args.target, args.csv, args.workers)
+    return 0 if not totals['invalid'] + totals['unreadable'] else 1
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,320 @@
+import hashlib
+import os
+import sys
+import tempfile
+import threading
+import time
+from bisect import bisect, insort
+from collections import OrderedDict
+from concurrent.futures import Future
+from itertools import count
+import multiprocessing
+import utils
+from utils import log_event, COLOR_CYAN, COLOR_RED, COLOR_YELLOW
+from messages import render_message
+from game_logic import Game, DEFAULT_ENEMY_DEFINITIONS, SAVE_GAME_DIR
+from leaderboard import Leaderboard, LEADERBOARD_FILE
+from shared_catalog import SharedCatalog, write_catalog
+from metrics import REGISTRY
+VIRTUAL_NODES = 64
+# bezczynne sesje procesu roboczego są zapisywane na dysk i zwalniane; wracają przy następnej komendzie
+WORKER_MAX_SESSIONS = 256
+SESSION_IDLE_SECONDS = 600
+SESSION_EVICTION_INTERVAL = 30
+SESSION_COMMANDS = frozenset({'create_new_player', 'explore', 'player_action_combat', 'flee_combat', 'use_inventory_item', 'save_game', 'load_game', 'show_merchant_stock', 'buy_item', 'sell_item', 'show_recipes', 'craft_item', 'show_leaderboard', 'get_player_status'})
+# spawn także na Linuksie: router ma wątki czytające, a fork procesu z wątkami grozi zakleszczeniem
+_PROCESS_CONTEXT = multiprocessing.get_context('spawn')
+SESSION_MIGRATIONS_TOTAL = REGISTRY.counter('session_migrations_total', 'Liczba sesji przeniesionych między procesami roboczymi.')
+
+def _hash_key(key):
+    return int.from_bytes(hashlib.blake2b(key.encode('utf-8'), digest_size=8).digest(), 'big')
+
+class HashRing:
+    # spójne haszowanie: dodanie lub usunięcie procesu przenosi tylko ok. 1/K sesji
+
+    def __init__(self, nodes=(), virtual_nodes=VIRTUAL_NODES):
+        self.virtual_nodes = virtual_nodes
+        self._points = []
+        self.nodes = set()
+        for node in nodes:
+            self.add(node)
+
+    def add(self, node):
+        self.nodes.add(node)
+        for replica in range(self.virtual_nodes):
+            insort(self._points, (_hash_key(f'{node}#{replica}'), node))
+
+    def remove(self, node):
+        self.nodes.discard(node)
+        self._points = [point for point in self._points if point[1] != node]
+
+    def node_for(self, key):
+        if not self._points:
+            raise LookupError('Brak procesów roboczych w pierścieniu.')
+        index = bisect(self._points, (_hash_key(key),))
+        return self._points[index % len(self._points)][1]
+
+def _ignore_gui_update(*args):
+    pass
+
+class _Session:
+
+    def __init__(self, username, catalog=None, leaderboard=None):
+        self.username = username
+        self.last_used = time.monotonic()
+        self.messages = []
+        # statusu nikt nie wyświetla, więc odroczone renderowanie oszczędza budowania napisów po każdej zmianie
+        self.game = Game(self.messages.append, _ignore_gui_update, _ignore_gui_update, deferred_rendering=True, leaderboard=leaderboard)
+        if catalog is not None:
+            self.game.item_catalog = catalog.items
+            self.game.available_enemies_definitions = catalog.enemies
+
+def _get_session(sessions, evicted, username, catalog=None, leaderboard=None, create=True):
+    session = sessions.get(username)
+    if session is not None:
+        sessions.move_to_end(username)
+    elif username in evicted or create:
+        session = sessions[username] = _Session(username, catalog, leaderboard)
+        if username in evicted:
+            evicted.discard(username)
+            session.game.load_game(username)
+    if session is not None:
+        session.last_used = time.monotonic()
+    return session
+
+def _evict_sessions(sessions, evicted, now=None):
+    # sesje są w kolejności ostatniego użycia; walki nie da się zapisać, więc takie sesje zostają
+    now = time.monotonic() if now is None else now
+    for username in list(sessions):
+        session = sessions[username]
+        if len(sessions) <= WORKER_MAX_SESSIONS and now - session.last_used < SESSION_IDLE_SECONDS:
+            break
+        if session.game.is_in_combat:
+            continue
+        if session.game.player:
+            if not session.game.save_game(username):
+                continue
+            evicted.add(username)
+        del sessions[username]
+        log_event(f'Proces roboczy: zwolniono bezczynną sesję {username}.', level='DEBUG')
+
+def _handle_request(sessions, request, catalog=None, leaderboard=None, evicted=None):
+    operation, username = request[0], request[1]
+    evicted = set() if evicted is None else evicted
+    if operation == 'command':
+        command, args = request[2], request[3]
+        session = _get_session(sessions, evicted, username, catalog, leaderboard)
+        session.messages.clear()
+        result = getattr(session.game, command)(*args)
+        return (result, [render_message(message) for message in session.messages], session.game.is_in_combat)
+    if operation == 'export':
+        force = request[2]
+        session = _get_session(sessions, evicted, username, catalog, leaderboard, create=False)
+        if session is None:
+            return {}
+        if session.game.is_in_combat and (not force):
+            return None
+        del sessions[username]
+        if not session.game.player:
+            return {}
+        return session.game.export_state(username)
+    if operation == 'import':
+        evicted.discard(username)
+        session = sessions[username] = _Session(username, catalog, leaderboard)
+        if request[2]:
+            session.game.import_state(request[2], username)
+        return True
+    if operation == 'stats':
+        return {'pid': os.getpid(), 'sessions': len(sessions), 'evicted_sessions': len(evicted)}
+    raise ValueError(f'Nieznana operacja: {operation}')
+
+def _worker_main(connection, worker_id, catalog_path=None):
+    utils.DEBUG_MODE = False
+    sys.stdout = open(os.devnull, 'w')
+    catalog = SharedCatalog(catalog_path) if catalog_path else None
+    # jeden ranking na proces; zapisy z innych procesów dociąga przyrostowo z dziennika
+    leaderboard = Leaderboard.load(os.path.join(SAVE_GAME_DIR, LEADERBOARD_FILE))
+    sessions = OrderedDict()
+    # nazwy użytkowników, których sesje zapisano na dysk przy zwalnianiu
+    evicted = set()
+    while True:
+        try:
+            if not connection.poll(SESSION_EVICTION_INTERVAL):
+                _evict_sessions(sessions, evicted)
+                continue
+            request_id, request = connection.recv()
+        except EOFError:
+            break
+        if request is None:
+            connection.send((request_id, True, None))
+            break
+        try:
+            connection.send((request_id, True, _handle_request(sessions, request, catalog, leaderboard, evicted)))
+        except Exception as e:
+            connection.send((request_id, False, f'{type(e).__name__}: {e}'))
+        _evict_sessions(sessions, evicted)
+    connection.close()
+    if catalog is not None:
+        sessions.clear()
+        catalog.close()
+
+class _WorkerHandle:
+
+    def __init__(self, worker_id, catalog_path=None):
+        self.worker_id = worker_id
+        self.connection, child_connection = _PROCESS_CONTEXT.Pipe()
+        self.process = _PROCESS_CONTEXT.Process(target=_worker_main, args=(child_connection, worker_id, catalog_path), name=f'GameShard-{worker_id}', daemon=True)
+        self.process.start()
+        child_connection.close()
+        self._request_ids = count()
+        self._pending = {}
+        self._alive = True
+        self._send_lock = threading.Lock()
+        self._reader = threading.Thread(target=self._read_replies, name=f'ShardReader-{worker_id}', daemon=True)
+        self._reader.start()
+
+    def call(self, request):
+        future = Future()
+        with self._send_lock:
+            if not self._alive:
+                # nikt już nie odczyta odpowiedzi - zgłaszamy błąd od razu zamiast czekać w nieskończoność
+                future.set_exception(RuntimeError(f'Proces roboczy {self.worker_id} zakończył działanie.'))
+                return future
+            request_id = next(self._request_ids)
+            self._pending[request_id] = future
+            try:
+                self.connection.send((request_id, request))
+            except (OSError, ValueError) as e:
+                del self._pending[request_id]
+                future.set_exception(RuntimeError(f'Proces roboczy {self.worker_id}: {e}'))
+        return future
+
+    def _read_replies(self):
+        # odpowiedzi przychodzą w kolejności żądań, ale wiązanie po id nie zakłada tego
+        while True:
+            try:
+                request_id, ok, payload = self.connection.recv()
+            except (EOFError, OSError):
+                break
+            with self._send_lock:
+                future = self._pending.pop(request_id)
+            if ok:
+                future.set_result(payload)
+            else:
+                future.set_exception(RuntimeError(f'Proces roboczy {self.worker_id}: {payload}'))
+        with self._send_lock:
+            self._alive = False
+            pending = list(self._pending.values())
+            self._pending.clear()
+        for future in pending:
+            future.set_exception(RuntimeError(f'Proces roboczy {self.worker_id} zakończył działanie.'))
+
+    def stop(self, timeout=5.0):
+        self.call(None).result(timeout)
+        self.process.join(timeout)
+        self.connection.close()
+
+class SessionRouter:
+
+    def __init__(self, workers=None, virtual_nodes=VIRTUAL_NODES, shared_catalog=True):
+        self.ring = HashRing(virtual_nodes=virtual_nodes)
+        # katalog przedmiotów i wrogów zapisany raz i mapowany przez wszystkie procesy robocze
+        self.catalog_path = None
+        if shared_catalog:
+            catalog_fd, self.catalog_path = tempfile.mkstemp(prefix='rpg_catalog_', suffix='.bin')
+            os.close(catalog_fd)
+            write_catalog(self.catalog_path, enemies=DEFAULT_ENEMY_DEFINITIONS)
+        self.workers = {}
+        # proces, który faktycznie trzyma sesję; różni się od pierścienia dla sesji czekających na przeniesienie
+        self._sessions = {}
+        self._pinned = set()
+        self._worker_ids = count()
+        self._routing_lock = threading.RLock()
+        REGISTRY.gauge('router_sessions', 'Sesje obsługiwane przez router.', lambda: len(self._sessions))
+        for _ in range(workers or os.cpu_count() or 1):
+            self.add_worker(rebalance=False)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.shutdown()
+
+    def submit(self, username, command, *args):
+        if command not in SESSION_COMMANDS:
+            raise ValueError(f'Komenda {command} nie jest dostępna przez router.')
+        with self._routing_lock:
+            if username in self._pinned:
+                self._migrate(username, self.ring.node_for(username))
+            worker_id = self._sessions.get(username)
+            if worker_id is None:
+                worker_id = self._sessions[username] = self.ring.node_for(username)
+            return self.workers[worker_id].call(('command', username, command, args))
+
+    def execute(self, username, command, *args):
+        return self.submit(username, command, *args).result()
+
+    def add_worker(self, rebalance=True):
+        with self._routing_lock:
+            worker_id = next(self._worker_ids)
+            self.workers[worker_id] = _WorkerHandle(worker_id, self.catalog_path)
+            self.ring.add(worker_id)
+            log_event(f'Router: uruchomiono proces roboczy {worker_id} (łącznie {len(self.workers)}).', level='INFO', color=COLOR_CYAN)
+            if rebalance:
+                self.rebalance()
+            return worker_id
+
+    def remove_worker(self, worker_id):
+        with self._routing_lock:
+            if len(self.workers) <= 1:
+                raise ValueError('Nie można usunąć ostatniego procesu roboczego.')
+            self.ring.remove(worker_id)
+            # sesje z usuwanego procesu muszą się przenieść, nawet w trakcie walki (walka przepada)
+            for username in [username for username, owner in self._sessions.items() if owner == worker_id]:
+                self._migrate(username, self.ring.node_for(username), force=True)
+            self.workers.pop(worker_id).stop()
+            log_event(f'Router: zatrzymano proces roboczy {worker_id} (pozostało {len(self.workers)}).', level='INFO', color=COLOR_CYAN)
+
+    def rebalance(self):
+        with self._routing_lock:
+            moved = 0
+            for username, owner in list(self._sessions.items()):
+                target = self.ring.node_for(username)
+                if owner != target:
+                    moved += self._migrate(username, target)
+            log_event(f'Router: przeniesiono {moved} sesji, {len(self._pinned)} czeka na koniec walki.', level='INFO', color=COLOR_CYAN)
+            return moved
+
+    def _migrate(self, username, target, force=False):
+        owner = self._sessions.get(username)
+        if owner is None or owner == target:
+            self._pinned.discard(username)
+            return 0
+        # żądania do jednego procesu są wykonywane po kolei, więc eksport widzi skutki wcześniejszych komend
+        state = self.workers[owner].call(('export', username, force)).result()
+        if state is None:
+            self._pinned.add(username)
+            return 0
+        self.workers[target].call(('import', username, state)).result()
+        self._sessions[username] = target
+        self._pinned.discard(username)
+        SESSION_MIGRATIONS_TOTAL.inc()
+        return 1
+
+    def stats(self):
+        with self._routing_lock:
+            return {worker_id: handle.call(('stats', None)).result() for worker_id, handle in self.workers.items()}
+
+    def shutdown(self):
+        with self._routing_lock:
+            for worker_id in list(self.workers):
+                try:
+                    self.workers.pop(worker_id).stop()
+                except Exception as e:
+                    log_event(f'Router: błąd przy zatrzymywaniu procesu {worker_id}: {e}', level='ERROR', color=COLOR_RED)
+            self._sessions.clear()
+            self._pinned.clear()
+            if self.catalog_path:
+                os.remove(self.catalog_path)
+                self.catalog_path = None
+        log_event('Router sesji zatrzymany.', level='INFO', color=COLOR_YELLOW)
@@ -0,0 +1,243 @@
+import json
+import mmap
+import os
+import struct
+from collections.abc import Mapping
+from items import ALL_DEFAULT_ITEMS, Item, Weapon, Armor, Potion
+from dice import compile_dice
+from utils import log_event
+CATALOG_MAGIC = b'RPGK'
+CATALOG_VERSION = 1
+# nagłówek: magia, wersja, liczba przedmiotów, liczba wrogów, początek puli napisów
+_HEADER = struct.Struct('<4sHIII')
+# przedmiot: rodzaj, klucz, nazwa, opis, wartość, statystyka (obrażenia/obrona/leczenie), kość lub efekt (JSON), czas trwania
+_ITEM_RECORD = struct.Struct('<B3xIIIIIIiiIIi')
+# wróg: klucz, definicja (JSON)
+_ENEMY_RECORD = struct.Struct('<IIII')
+_STRING_REF = struct.Struct('<II')
+_KIND_ITEM, _KIND_WEAPON, _KIND_ARMOR, _KIND_POTION = range(4)
+_NO_STRING = (0, 0xFFFFFFFF)
+
+def _item_kind(item):
+    if isinstance(item, Weapon):
+        return _KIND_WEAPON
+    if isinstance(item, Armor):
+        return _KIND_ARMOR
+    if isinstance(item, Potion):
+        return _KIND_POTION
+    return _KIND_ITEM
+
+class _StringPool:
+
+    def __init__(self):
+        self.data = bytearray()
+
+    def add(self, text):
+        if text is None:
+            return _NO_STRING
+        encoded = text.encode('utf-8')
+        offset = len(self.data)
+        self.data += encoded
+        return (offset, len(encoded))
+
+def pack_catalog(items=ALL_DEFAULT_ITEMS, enemies=None):
+    enemies = enemies or {}
+    pool = _StringPool()
+    item_records = bytearray()
+    # rekordy posortowane po kluczu (porządek bajtów UTF-8), więc wyszukiwanie to bisekcja bez słownika
+    for key in sorted(items, key=lambda key: key.encode('utf-8')):
+        item = items[key]
+        kind = _item_kind(item)
+        stat, extra, duration = (0, None, 0)
+        if kind == _KIND_WEAPON:
+            stat, extra = (item.damage, item.damage_dice)
+        elif kind == _KIND_ARMOR:
+            stat = item.defense
+        elif kind == _KIND_POTION:
+            stat, extra, duration = (item.heal_amount, json.dumps(item.effect) if item.effect is not None else None, item.duration)
+        item_records += _ITEM_RECORD.pack(kind, *pool.add(key), *pool.add(item.name), *pool.add(item.description), item.value, stat, *pool.add(extra), duration)
+    enemy_records = bytearray()
+    for key in sorted(enemies, key=lambda key: key.encode('utf-8')):
+        enemy_records += _ENEMY_RECORD.pack(*pool.add(key), *pool.add(json.dumps(enemies[key])))
+    pool_offset = _HEADER.size + len(item_records) + len(enemy_records)
+    return _HEADER.pack(CATALOG_MAGIC, CATALOG_VERSION, len(items), len(enemies), pool_offset) + item_records + enemy_records + pool.data
+
+def write_catalog(path, items=ALL_DEFAULT_ITEMS, enemies=None):
+    data = pack_catalog(items, enemies)
+    temp_path = path + '.tmp'
+    with open(temp_path, 'wb') as f:
+        f.write(data)
+    os.replace(temp_path, path)
+    log_event(f'Zapisano wspólny katalog: {len(items)} przedmiotów, {len(enemies or {})} wrogów, {len(data)} B ({path}).', level='DEBUG')
+    return path
+
+def _plain_item(item_key):
+    return ALL_DEFAULT_ITEMS[item_key]
+
+class _SharedFields:
+    __slots__ = ()
+
+    @property
+    def name(self):
+        return self._catalog._string(self._record[3], self._record[4])
+
+    @property
+    def description(self):
+        return self._catalog._string(self._record[5], self._record[6])
+
+    @property
+    def value(self):
+        return self._record[7]
+
+    @property
+    def key(self):
+        return self._catalog._string(self._record[1], self._record[2])
+
+    def __reduce__(self):
+        # widoki nie przechodzą przez pickle - odtwarzamy zwykły obiekt z katalogu
+        return (_plain_item, (self.key,))
+
+class SharedItem(_SharedFields, Item):
+
+    def __init__(self, catalog, record):
+        self._catalog = catalog
+        self._record = record
+
+class SharedWeapon(_SharedFields, Weapon):
+    __init__ = SharedItem.__init__
+
+    @property
+    def damage(self):
+        return self._record[8]
+
+    @property
+    def damage_dice(self):
+        return self._catalog._string(self._record[9], self._record[10])
+
+    @property
+    def damage_roller(self):
+        expression = self.damage_dice
+        return compile_dice(expression) if expression else None
+
+class SharedArmor(_SharedFields, Armor):
+    __init__ = SharedItem.__init__
+
+    @property
+    def defense(self):
+        return self._record[8]
+
+class SharedPotion(_SharedFields, Potion):
+    __init__ = SharedItem.__init__
+
+    @property
+    def heal_amount(self):
+        return self._record[8]
+
+    @property
+    def effect(self):
+        encoded = self._catalog._string(self._record[9], self._record[10])
+        return json.loads(encoded) if encoded is not None else None
+
+    @property
+    def duration(self):
+        return self._record[11]
+_VIEW_CLASSES = (SharedItem, SharedWeapon, SharedArmor, SharedPotion)
+
+class _RecordMapping(Mapping):
+
+    def __init__(self, catalog, table_offset, record_struct, count):
+        self._catalog = catalog
+        self._table_offset = table_offset
+        self._struct = record_struct
+        self._count = count
+        self._cache = {}
+
+    def _record(self, index):
+        return self._struct.unpack_from(self._catalog._buffer, self._table_offset + index * self._struct.size)
+
+    def _key_bytes(self, index):
+        offset, length = _STRING_REF.unpack_from(self._catalog._buffer, self._table_offset + index * self._struct.size + self._key_position)
+        return self._catalog._bytes(offset, length)
+
+    def _find(self, key):
+        encoded = key.encode('utf-8')
+        lo, hi = (0, self._count)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._key_bytes(mid) < encoded:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self._count and self._key_bytes(lo) == encoded:
+            return lo
+        return None
+
+    def __getitem__(self, key):
+        value = self._cache.get(key)
+        if value is None:
+            index = self._find(key) if isinstance(key, str) else None
+            if index is None:
+                raise KeyError(key)
+            value = self._cache[key] = self._build(self._record(index))
+        return value
+
+    def __contains__(self, key):
+        return key in self._cache or (isinstance(key, str) and self._find(key) is not None)
+
+    def __len__(self):
+        return self._count
+
+    def __iter__(self):
+        for index in range(self._count):
+            yield self._key_bytes(index).decode('utf-8')
+
+class _ItemMapping(_RecordMapping):
+    _key_position = 4
+
+    def _build(self, record):
+        return _VIEW_CLASSES[record[0]](self._catalog, record)
+
+class _EnemyMapping(_RecordMapping):
+    _key_position = 0
+
+    def _build(self, record):
+        definition = json.loads(self._catalog._string(record[2], record[3]))
+        # JSON zamienia krotki tabeli łupów na listy, a listy w tabeli oznaczają podtabele
+        definition['loot_table'] = [tuple(entry) for entry in definition.get('loot_table', [])]
+        return definition
+
+class SharedCatalog:
+    # katalog tylko do odczytu zmapowany z pliku: procesy współdzielą strony pamięci,
+    # a obiekty Pythona powstają dopiero przy odczycie konkretnego przedmiotu
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'rb')
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._buffer = memoryview(self._mmap)
+        magic, version, item_count, enemy_count, self._pool_offset = _HEADER.unpack_from(self._buffer)
+        if magic != CATALOG_MAGIC or version != CATALOG_VERSION:
+            self.close()
+            raise ValueError(f'Nieprawidłowy plik katalogu: {path}')
+        self.items = _ItemMapping(self, _HEADER.size, _ITEM_RECORD, item_count)
+        self.enemies = _EnemyMapping(self, _HEADER.size + item_count * _ITEM_RECORD.size, _ENEMY_RECORD, enemy_count)
+
+    def _bytes(self, offset, length):
+        start = self._pool_offset + offset
+        return self._buffer[start:start + length].tobytes()
+
+    def _string(self, offset, length):
+        if length == _NO_STRING[1]:
+            return None
+        return str(self._buffer[self._pool_offset + offset:self._pool_offset + offset + length], 'utf-8')
+
+    def close(self):
+        self._buffer.release()
+        self._mmap.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.close()
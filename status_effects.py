@@ -0,0 +1,179 @@
+import heapq
+from utils import log_event, COLOR_GREEN
+from messages import GameMessage
+POTION_EFFECTS = {'regeneracja_lekka': {'regen': 5}, 'wszystkie_staty_boost': {'bonuses': {'attack_power': 3, 'defense_power': 3}}, 'cure_mild_poison': {'cures': ('trucizna_slaba',)}, 'cure_strong_poison': {'cures': ('trucizna_slaba', 'trucizna_silna')}}
+
+class StatusEffect:
+    __slots__ = ('name', 'bonuses', 'regen', 'expires_at', 'container', 'active')
+
+    def __init__(self, name, bonuses, regen, expires_at, container):
+        self.name = name
+        self.bonuses = bonuses
+        self.regen = regen
+        self.expires_at = expires_at
+        self.container = container
+        self.active = True
+
+class EffectScheduler:
+
+    def __init__(self, wheel_size=64):
+        self.turn = 0
+        self.wheel_size = wheel_size
+        self.wheel = [[] for _ in range(wheel_size)]
+        self.overflow = []
+        self.ticking = set()
+        self._sequence = 0
+
+    def schedule(self, effect):
+        if effect.regen:
+            self.ticking.add(effect)
+        if effect.expires_at - self.turn < self.wheel_size:
+            self.wheel[effect.expires_at % self.wheel_size].append(effect)
+        else:
+            self._sequence += 1
+            heapq.heappush(self.overflow, (effect.expires_at, self._sequence, effect))
+
+    def cancel(self, effect):
+        # usunięcie leniwe: wpis w kole zostaje, ale jest ignorowany przy wygaśnięciu
+        effect.active = False
+        self.ticking.discard(effect)
+
+    def tick(self):
+        self.turn += 1
+        messages = []
+        for effect in list(self.ticking):
+            message = effect.container.on_tick(effect)
+            if message:
+                messages.append(message)
+        slot_index = self.turn % self.wheel_size
+        expiring = self.wheel[slot_index]
+        self.wheel[slot_index] = []
+        for effect in expiring:
+            if effect.active and effect.expires_at == self.turn:
+                messages.append(effect.container.expire(effect))
+        while self.overflow and self.overflow[0][0] - self.turn < self.wheel_size:
+            _, _, effect = heapq.heappop(self.overflow)
+            if effect.active:
+                self.wheel[effect.expires_at % self.wheel_size].append(effect)
+        return messages
+
+class StatusEffects:
+
+    def __init__(self, owner, scheduler=None):
+        self.owner = owner
+        # własny harmonogram tworzony dopiero przy pierwszym efekcie - postacie w grze i tak dostają wspólny przez bind()
+        self._scheduler = scheduler
+        self.active = {}
+        self.bonuses = {}
+
+    @property
+    def scheduler(self):
+        if self._scheduler is None:
+            self._scheduler = EffectScheduler()
+        return self._scheduler
+
+    def __bool__(self):
+        return bool(self.active)
+
+    def bonus(self, stat):
+        return self.bonuses.get(stat, 0)
+
+    def has(self, name):
+        return name in self.active
+
+    def remaining_turns(self, name):
+        effect = self.active.get(name)
+        return effect.expires_at - self.scheduler.turn if effect else 0
+
+    def apply(self, name, duration, bonuses=None, regen=0):
+        if name in self.active:
+            self._deactivate(self.active[name])
+        effect = StatusEffect(name, bonuses or {}, regen, self.scheduler.turn + max(1, duration), self)
+        self.active[name] = effect
+        for stat, amount in effect.bonuses.items():
+            self.bonuses[stat] = self.bonuses.get(stat, 0) + amount
+        self.scheduler.schedule(effect)
+        log_event(f"Efekt '{name}' nałożony na {self.owner.name} na {duration} tur.", level='DEBUG')
+        return effect
+
+    def remove(self, name):
+        effect = self.active.get(name)
+        if effect:
+            self._deactivate(effect)
+        return effect is not None
+
+    def clear(self):
+        for effect in list(self.active.values()):
+            self._deactivate(effect)
+
+    def snapshot(self):
+        if not self.active:
+            return ()
+        return tuple(((name, effect.bonuses, effect.regen, effect.expires_at - self.scheduler.turn) for name, effect in self.active.items()))
+
+    def restore(self, state):
+        if not state and (not self.active):
+            return
+        self.clear()
+        for name, bonuses, regen, remaining_turns in state:
+            self.apply(name, remaining_turns, bonuses=bonuses, regen=regen)
+
+    def bind(self, scheduler):
+        if scheduler is self._scheduler:
+            return
+        if not self.active:
+            self._scheduler = scheduler
+            return
+        turn_offset = scheduler.turn - self.scheduler.turn
+        moved_effects = []
+        for effect in list(self.active.values()):
+            self.scheduler.cancel(effect)
+            moved_effects.append(StatusEffect(effect.name, effect.bonuses, effect.regen, effect.expires_at + turn_offset, self))
+        self._scheduler = scheduler
+        for effect in moved_effects:
+            self.active[effect.name] = effect
+            scheduler.schedule(effect)
+
+    def _deactivate(self, effect):
+        self.scheduler.cancel(effect)
+        del self.active[effect.name]
+        for stat, amount in effect.bonuses.items():
+            self.bonuses[stat] -= amount
+
+    def expire(self, effect):
+        self._deactivate(effect)
+        log_event(f"Efekt '{effect.name}' na {self.owner.name} wygasł.", level='DEBUG')
+        return GameMessage('effect.expired', effect=effect.name, character=self.owner.name)
+
+    def on_tick(self, effect):
+        if not self.owner.is_alive():
+            return None
+        healed_amount, _ = self.owner.heal(effect.regen)
+        if healed_amount > 0:
+            return GameMessage('effect.regen', character=self.owner.name, amount=healed_amount, effect=effect.name)
+        return None
+
+    def describe(self):
+        return ', '.join((f'{name} ({effect.expires_at - self.scheduler.turn} tur)' for name, effect in self.active.items()))
+
+def apply_potion_effect(target, potion):
+    effect = potion.effect
+    if isinstance(effect, dict):
+        definition = {'bonuses': {effect['stat']: effect['amount']}}
+    else:
+        definition = POTION_EFFECTS.get(effect, {})
+    cured = [name for name in definition.get('cures', ()) if target.status_effects.remove(name)]
+    if 'cures' in definition:
+        if cured:
+            return GameMessage('effect.cured', target=target.name, cured=', '.join(cured))
+        return GameMessage('effect.nothing_to_cure', target=target.name, potion=potion.name)
+    if potion.duration <= 0:
+        return GameMessage('effect.instant', target=target.name, potion=potion.name)
+    target.status_effects.apply(potion.name, potion.duration, bonuses=definition.get('bonuses'), regen=definition.get('regen', 0))
+    details = [f'+{amount} {stat}' for stat, amount in definition.get('bonuses', {}).items()]
+    if definition.get('regen'):
+        details.append(f"regeneracja {definition['regen']} HP/turę")
+    details_text = f" ({', '.join(details)})" if details else ''
+    message = GameMessage('effect.applied', target=target.name, potion=potion.name, details=details_text, duration=potion.duration)
+    log_event(message, level='INFO', color=COLOR_GREEN)
+    return message
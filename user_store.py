@@ -0,0 +1,29 @@
+from journal_store import JournaledStore, COMPACT_THRESHOLD
+from metrics import REGISTRY
+USER_STORE_RELOADS_TOTAL = REGISTRY.counter('user_store_reloads_total', 'Liczba pełnych przeładowań magazynu użytkowników.')
+USER_STORE_INCREMENTAL_TOTAL = REGISTRY.counter('user_store_incremental_reads_total', 'Liczba odczytów samych nowych rekordów z dziennika użytkowników.')
+
+class UserStore(JournaledStore):
+    # users.json (format bez zmian) + dziennik rejestracji; rekordów się nie usuwa ani nie zmienia
+    snapshot_indent = 4
+    reloads_metric = USER_STORE_RELOADS_TOTAL
+    incremental_metric = USER_STORE_INCREMENTAL_TOTAL
+
+    def __init__(self, path, compact_threshold=COMPACT_THRESHOLD):
+        super().__init__(path, compact_threshold)
+
+    @property
+    def users(self):
+        return self.records
+
+    def __contains__(self, username):
+        return self.get(username) is not None
+
+    def _decode_record(self, record):
+        return (record['username'], record['password_hash'])
+
+    def _encode_record(self, username, password_hash):
+        return {'username': username, 'password_hash': password_hash}
+
+    def add(self, username, password_hash):
+        return self.put(username, password_hash, only_if_absent=True)
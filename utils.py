@@ -4,6 +4,7 @@ import math
 import textwrap
 from collections import defaultdict
 import datetime
+from dice import compile_dice
 DEBUG_MODE = True
 COLOR_RED = '\x1b[91m'
 COLOR_GREEN = '\x1b[92m'
@@ -13,9 +14,12 @@ COLOR_MAGENTA = '\x1b[95m'
 COLOR_CYAN = '\x1b[96m'
 COLOR_RESET = '\x1b[0m'
 
-def log_event(message, level='INFO', color=None, timestamp=True):
+def log_event(message, *args, level='INFO', color=None, timestamp=True):
+    # argumenty formatujemy (%) dopiero po sprawdzeniu poziomu - pominięty wpis nic nie kosztuje
     if level.upper() == 'DEBUG' and (not DEBUG_MODE):
         return
+    if args:
+        message = message % args
     time_str = f'[{datetime.datetime.now():%Y-%m-%d %H:%M:%S}] ' if timestamp else ''
     log_prefix = f'[{level.upper()}]'
     full_message = f'{time_str}{log_prefix} {message}'
@@ -23,28 +27,27 @@ def log_event(message, level='INFO', color=None, timestamp=True):
         full_message = f'{color}{full_message}{COLOR_RESET}'
     print(full_message)
 
-def generate_random_syllabic_name(min_syl=2, max_syl=4, title_chance=0.1):
-    vowels = 'aeiouy'
-    consonants = 'bcdfghjklmnprstvwz'
-    titles = ['Sir', 'Lady', 'Lord', 'Dame', 'Elder', 'Captain']
-    name = ''
-    num_syllables = random.randint(min_syl, max_syl)
-    for i in range(num_syllables):
-        syl = ''
-        if random.choice([True, False]):
-            syl += random.choice(consonants)
-            syl += random.choice(vowels)
-            if random.random() < 0.2:
-                syl += random.choice(vowels)
-        else:
-            syl += random.choice(vowels)
-            syl += random.choice(consonants)
-        if i == 0:
-            name += syl.capitalize()
-        else:
-            name += syl
-    if random.random() < title_chance:
-        name = f'{random.choice(titles)} {name}'
+def _build_syllable_table():
+    # każda sylaba powtórzona proporcjonalnie do prawdopodobieństwa z dawnego algorytmu
+    # (CV 40%, CVV 10%, VC 50%), dzięki czemu losowanie to jeden wybór indeksu
+    table = []
+    for consonant in NAME_CONSONANTS:
+        for vowel in NAME_VOWELS:
+            table.extend([consonant + vowel] * 24)
+            table.extend((consonant + vowel + second_vowel for second_vowel in NAME_VOWELS))
+            table.extend([vowel + consonant] * 30)
+    return tuple(table)
+NAME_VOWELS = 'aeiouy'
+NAME_CONSONANTS = 'bcdfghjklmnprstvwz'
+NAME_TITLES = ('Sir', 'Lady', 'Lord', 'Dame', 'Elder', 'Captain')
+NAME_SYLLABLES = _build_syllable_table()
+NAME_FIRST_SYLLABLES = tuple((syllable.capitalize() for syllable in NAME_SYLLABLES))
+
+def generate_random_syllabic_name(min_syl=2, max_syl=4, title_chance=0.1, rng=random):
+    num_syllables = rng.randint(min_syl, max_syl)
+    name = rng.choice(NAME_FIRST_SYLLABLES) + ''.join(rng.choices(NAME_SYLLABLES, k=num_syllables - 1))
+    if rng.random() < title_chance:
+        name = f'{rng.choice(NAME_TITLES)} {name}'
     return name
 
 def truncate_text(text, max_length=100, suffix='...'):
@@ -62,10 +65,10 @@ def text_to_list_of_words(text, lower=False):
         text = text.lower()
     return text.split()
 
-def roll_dice_expression(expression):
+def parse_dice_expression(expression):
     original_expression = expression
     expression = expression.lower().replace(' ', '')
-    match = re.match('(\\d*)d(\\d+)([+-]\\d+)?', expression)
+    match = re.fullmatch('(\\d*)d(\\d+)([+-]\\d+)?', expression)
     if not match:
         raise ValueError(f'Nieprawidłowy format rzutu kostką: {original_expression}')
     num_dice_str, die_type_str, modifier_str = match.groups()
@@ -74,8 +77,14 @@ def roll_dice_expression(expression):
     modifier = int(modifier_str) if modifier_str else 0
     if num_dice <= 0 or die_type <= 0:
         raise ValueError('Liczba kości i typ kości muszą być dodatnie.')
-    total_roll = sum((random.randint(1, die_type) for _ in range(num_dice)))
-    return total_roll + modifier
+    return (num_dice, die_type, modifier)
+
+def roll_dice_expression(expression):
+    # pełna składnia kości (np. 2d6+1d4+3, 4d6kh3, 1d6!, (1d8+2)*2), kompilowana raz i trzymana w cache
+    return compile_dice(expression).roll()
+
+def dice_distribution(expression):
+    return dict(compile_dice(expression).distribution())
 
 def get_percentage_chance(percentage):
     if not 0 <= percentage <= 100:
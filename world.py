@@ -0,0 +1,218 @@
+import os
+import random
+import struct
+import tempfile
+from collections import OrderedDict
+from utils import log_event, create_directory_if_not_exists, COLOR_RED
+CHUNK_SIZE = 32
+CHUNK_TILES = CHUNK_SIZE * CHUNK_SIZE
+CHUNK_MAGIC = b'RPGC'
+CHUNK_FORMAT_VERSION = 2
+# magia, wersja, ziarno świata, współrzędne chunka - plik z innego świata w tym samym katalogu jest odrzucany
+CHUNK_HEADER = struct.Struct('<4sHqii')
+CHUNK_MEMORY_ESTIMATE = CHUNK_TILES + CHUNK_TILES // 8 + 200
+DEFAULT_MEMORY_CAP = 8 * 1024 * 1024
+NOISE_SCALE = 24
+BIOMES = [
+    {"key": "plains", "name": "Równiny", "description": "Rozległe, trawiaste równiny ciągną się po horyzont.", "spawn_weights": {"goblin_scout": 40, "dark_wolf": 20, "orc_grunt": 10, "forest_spider": 5}, "item_weights": {"apple_red": 8, "stale_bread": 6, "waterskin": 3}},
+    {"key": "forest", "name": "Las", "description": "Gęsty las, w którym coś szeleści w poszyciu.", "spawn_weights": {"forest_spider": 40, "dark_wolf": 35, "goblin_scout": 15}, "item_weights": {"herbs_common": 10, "glowing_mushroom": 6, "spider_silk": 4}},
+    {"key": "hills", "name": "Wzgórza", "description": "Kamieniste wzgórza poprzecinane starymi szlakami.", "spawn_weights": {"orc_grunt": 35, "goblin_scout": 30, "dark_wolf": 15}, "item_weights": {"iron_ore": 10, "chipped_gemstone": 4}},
+    {"key": "swamp", "name": "Bagna", "description": "Cuchnące bagna, nad którymi unosi się mgła.", "spawn_weights": {"forest_spider": 45, "goblin_scout": 10, "orc_grunt": 10}, "item_weights": {"glowing_mushroom": 8, "rare_flower_petal": 3}},
+    {"key": "mountains", "name": "Góry", "description": "Surowe, skaliste góry smagane wiatrem.", "spawn_weights": {"orc_grunt": 40, "dark_wolf": 25}, "item_weights": {"iron_ore": 12, "flawed_ruby": 2, "sapphire_small": 1}},
+]
+BIOME_INDEX = {biome['key']: i for i, biome in enumerate(BIOMES)}
+
+def _hash_coordinates(seed, x, y):
+    h = (x * 374761393 + y * 668265263 + seed * 2246822519) & 0xFFFFFFFF
+    h = (h ^ h >> 13) * 1274126177 & 0xFFFFFFFF
+    return (h ^ h >> 16) / 0xFFFFFFFF
+
+def _smoothstep(t):
+    return t * t * (3 - 2 * t)
+
+def _biome_for(height, moisture):
+    if height > 0.72:
+        return BIOME_INDEX['mountains']
+    if height > 0.58:
+        return BIOME_INDEX['hills']
+    if moisture > 0.62:
+        return BIOME_INDEX['swamp'] if height < 0.4 else BIOME_INDEX['forest']
+    if moisture > 0.45:
+        return BIOME_INDEX['forest']
+    return BIOME_INDEX['plains']
+
+class Chunk:
+    __slots__ = ('seed', 'cx', 'cy', 'biomes', 'explored', 'dirty')
+
+    def __init__(self, seed, cx, cy, biomes, explored=None):
+        self.seed = seed
+        self.cx = cx
+        self.cy = cy
+        self.biomes = biomes
+        self.explored = explored if explored is not None else bytearray(CHUNK_TILES // 8)
+        self.dirty = False
+
+    def is_explored(self, local_x, local_y):
+        index = local_y * CHUNK_SIZE + local_x
+        return bool(self.explored[index >> 3] & 1 << (index & 7))
+
+    def mark_explored(self, local_x, local_y):
+        index = local_y * CHUNK_SIZE + local_x
+        if not self.explored[index >> 3] & 1 << (index & 7):
+            self.explored[index >> 3] |= 1 << (index & 7)
+            self.dirty = True
+
+    def to_bytes(self):
+        return CHUNK_HEADER.pack(CHUNK_MAGIC, CHUNK_FORMAT_VERSION, self.seed, self.cx, self.cy) + bytes(self.biomes) + bytes(self.explored)
+
+    @classmethod
+    def from_bytes(cls, data):
+        magic, version = struct.unpack_from('<4sH', data)
+        if magic != CHUNK_MAGIC or version != CHUNK_FORMAT_VERSION:
+            raise ValueError(f'Nieobsługiwany format chunka (wersja {version}).')
+        _, _, seed, cx, cy = CHUNK_HEADER.unpack_from(data)
+        offset = CHUNK_HEADER.size
+        biomes = bytearray(data[offset:offset + CHUNK_TILES])
+        explored = bytearray(data[offset + CHUNK_TILES:offset + CHUNK_TILES + CHUNK_TILES // 8])
+        if len(biomes) != CHUNK_TILES or len(explored) != CHUNK_TILES // 8:
+            raise ValueError('Uszkodzony plik chunka.')
+        return cls(seed, cx, cy, biomes, explored)
+
+class WorldMap:
+
+    def __init__(self, seed=None, save_dir=None, memory_cap=DEFAULT_MEMORY_CAP):
+        self.seed = seed if seed is not None else random.randrange(2 ** 31)
+        self.save_dir = save_dir
+        self.max_cached_chunks = max(4, memory_cap // CHUNK_MEMORY_ESTIMATE)
+        self._cache = OrderedDict()
+        # bez katalogu zapisu wyrzucane z pamięci zmienione chunki trafiają do tymczasowego katalogu,
+        # a w pamięci zostają tylko ich współrzędne - limit pamięci obowiązuje także przed pierwszym zapisem
+        self._spill_dir = None
+        self._spilled = set()
+        self.chunks_generated = 0
+        self.chunks_loaded = 0
+
+    def _chunk_path(self, cx, cy, directory=None):
+        return os.path.join(directory or self.save_dir, f'{cx}_{cy}.chunk')
+
+    def get_chunk(self, cx, cy):
+        key = (cx, cy)
+        chunk = self._cache.get(key)
+        if chunk is not None:
+            self._cache.move_to_end(key)
+            return chunk
+        chunk = self._load_chunk(cx, cy) or self._generate_chunk(cx, cy)
+        self._cache[key] = chunk
+        if len(self._cache) > self.max_cached_chunks:
+            _, evicted = self._cache.popitem(last=False)
+            if evicted.dirty:
+                self._store_chunk(evicted)
+        return chunk
+
+    def _generate_chunk(self, cx, cy):
+        base_x = cx * CHUNK_SIZE
+        base_y = cy * CHUNK_SIZE
+        lattice_x0 = base_x // NOISE_SCALE
+        lattice_y0 = base_y // NOISE_SCALE
+        lattice_span = CHUNK_SIZE // NOISE_SCALE + 2
+        height_seed = self.seed
+        moisture_seed = self.seed ^ 0x5F3759DF
+        height_lattice = [[_hash_coordinates(height_seed, lattice_x0 + i, lattice_y0 + j) for i in range(lattice_span + 1)] for j in range(lattice_span + 1)]
+        moisture_lattice = [[_hash_coordinates(moisture_seed, lattice_x0 + i, lattice_y0 + j) for i in range(lattice_span + 1)] for j in range(lattice_span + 1)]
+        biomes = bytearray(CHUNK_TILES)
+        for local_y in range(CHUNK_SIZE):
+            world_y = base_y + local_y
+            j = world_y // NOISE_SCALE - lattice_y0
+            ty = _smoothstep(world_y % NOISE_SCALE / NOISE_SCALE)
+            for local_x in range(CHUNK_SIZE):
+                world_x = base_x + local_x
+                i = world_x // NOISE_SCALE - lattice_x0
+                tx = _smoothstep(world_x % NOISE_SCALE / NOISE_SCALE)
+                values = []
+                for lattice in (height_lattice, moisture_lattice):
+                    top = lattice[j][i] + (lattice[j][i + 1] - lattice[j][i]) * tx
+                    bottom = lattice[j + 1][i] + (lattice[j + 1][i + 1] - lattice[j + 1][i]) * tx
+                    values.append(top + (bottom - top) * ty)
+                biomes[local_y * CHUNK_SIZE + local_x] = _biome_for(values[0], values[1])
+        self.chunks_generated += 1
+        return Chunk(self.seed, cx, cy, biomes)
+
+    def _load_chunk(self, cx, cy):
+        if (cx, cy) in self._spilled:
+            chunk = self._read_chunk(self._chunk_path(cx, cy, self._spill_dir.name))
+            if chunk is not None:
+                # nadal niezapisany w katalogu gry
+                chunk.dirty = True
+                return chunk
+        if not self.save_dir:
+            return None
+        path = self._chunk_path(cx, cy)
+        if not os.path.exists(path):
+            return None
+        chunk = self._read_chunk(path)
+        if chunk is not None:
+            self.chunks_loaded += 1
+        return chunk
+
+    def _read_chunk(self, path):
+        try:
+            with open(path, 'rb') as f:
+                chunk = Chunk.from_bytes(f.read())
+        except (OSError, ValueError, struct.error) as e:
+            log_event(f'Błąd podczas wczytywania chunka {path}: {e}', level='ERROR', color=COLOR_RED)
+            return None
+        if chunk.seed != self.seed:
+            log_event(f'Pominięto chunk {path} z innego świata (ziarno {chunk.seed}, oczekiwane {self.seed}).', level='DEBUG')
+            return None
+        return chunk
+
+    def _store_chunk(self, chunk):
+        if not self.save_dir:
+            if self._spill_dir is None:
+                self._spill_dir = tempfile.TemporaryDirectory(prefix='rpg_world_')
+            if self._write_chunk(chunk, self._spill_dir.name):
+                self._spilled.add((chunk.cx, chunk.cy))
+            return
+        if self._write_chunk(chunk, self.save_dir):
+            chunk.dirty = False
+
+    def _write_chunk(self, chunk, directory):
+        try:
+            with open(self._chunk_path(chunk.cx, chunk.cy, directory), 'wb') as f:
+                f.write(chunk.to_bytes())
+            return True
+        except OSError as e:
+            log_event(f'Błąd podczas zapisu chunka ({chunk.cx}, {chunk.cy}): {e}', level='ERROR', color=COLOR_RED)
+            return False
+
+    def flush(self, save_dir=None):
+        if save_dir:
+            self.save_dir = save_dir
+        if not self.save_dir or not create_directory_if_not_exists(self.save_dir):
+            return 0
+        dirty_chunks = [chunk for chunk in self._cache.values() if chunk.dirty]
+        # chunki z katalogu tymczasowego przenosimy po jednym, bez wczytywania wszystkich naraz
+        spilled = [key for key in self._spilled if key not in self._cache]
+        for cx, cy in spilled:
+            chunk = self._read_chunk(self._chunk_path(cx, cy, self._spill_dir.name))
+            if chunk is not None:
+                self._store_chunk(chunk)
+        if self._spill_dir is not None:
+            self._spill_dir.cleanup()
+            self._spill_dir = None
+            self._spilled.clear()
+        for chunk in dirty_chunks:
+            self._store_chunk(chunk)
+        dirty_chunks += spilled
+        log_event(f'Zapisano {len(dirty_chunks)} chunków świata do {self.save_dir}.', level='DEBUG')
+        return len(dirty_chunks)
+
+    def biome_at(self, x, y):
+        chunk = self.get_chunk(x // CHUNK_SIZE, y // CHUNK_SIZE)
+        return BIOMES[chunk.biomes[y % CHUNK_SIZE * CHUNK_SIZE + x % CHUNK_SIZE]]
+
+    def is_explored(self, x, y):
+        return self.get_chunk(x // CHUNK_SIZE, y // CHUNK_SIZE).is_explored(x % CHUNK_SIZE, y % CHUNK_SIZE)
+
+    def mark_explored(self, x, y):
+        self.get_chunk(x // CHUNK_SIZE, y // CHUNK_SIZE).mark_explored(x % CHUNK_SIZE, y % CHUNK_SIZE)